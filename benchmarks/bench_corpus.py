@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Reproducible conversion benchmark over the bundled rule corpus (sigma-rules/).
+
+Converts every rule for every installed backend (one SIEM name per backend) and
+reports:
+  - cold latency: the first pass in this fresh process, including pySigma plugin
+    discovery, backend/pipeline construction and rule parsing
+  - warm latency: the following passes, with backends and parsed rules cached
+  - throughput: warm conversions per second, and with --jobs N the end-to-end
+    throughput of the worker pool
+  - peak RSS of this process (and of pool workers)
+  - breakdowns per category (top-level directory of the corpus) and per SIEM
+
+The on-disk result cache is bypassed so every sample is a real conversion. Write
+the results with --out and compare two runs with benchmarks/compare_results.py.
+
+Usage (from repo root):
+  python benchmarks/bench_corpus.py --out bench.json
+  python benchmarks/bench_corpus.py -s splunk -s kusto --passes 5 --jobs 4 --out bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Allow importing sigmaforge when run from repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sigmaforge import __version__
+from sigmaforge.batch import ConversionUnit, group_siems, zip_units
+from sigmaforge.converter import convert_sigma_to_siem
+from sigmaforge.engine import backend_package_version, has_backend
+from sigmaforge.result_cache import pysigma_version
+from sigmaforge.rules import iter_rule_paths
+from sigmaforge.siem_backends import SIEM_BACKENDS, SIEM_DISPLAY_ORDER
+
+
+def load_corpus(corpus: Path) -> list[tuple[str, str, str]]:
+    """Return [(category, rule path, content)] in a stable order."""
+    rules = []
+    for path in iter_rule_paths(str(corpus)):
+        rel = path.relative_to(corpus)
+        category = rel.parts[0] if len(rel.parts) > 1 else "(root)"
+        rules.append((category, str(path), path.read_text(encoding="utf-8")))
+    return rules
+
+
+def installed_siems() -> list[str]:
+    """One SIEM name per installed backend, in display order."""
+    return [group[0] for group in group_siems(SIEM_DISPLAY_ORDER) if has_backend(SIEM_BACKENDS[group[0]][0])]
+
+
+def summarize(samples_ms: list[float]) -> dict:
+    if not samples_ms:
+        return {"n": 0}
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "max_ms": round(ordered[-1], 3),
+        "total_ms": round(sum(ordered), 3),
+    }
+
+
+def peak_rss_mb(who: int) -> float:
+    """Peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_pass(rules, siems, pipeline, engine) -> tuple[list[tuple[str, str, float]], int, float]:
+    """Convert the corpus once. Returns ([(category, siem, ms)], failures, wall seconds)."""
+    samples = []
+    failures = 0
+    start = time.perf_counter()
+    for category, path, content in rules:
+        for siem in siems:
+            t0 = time.perf_counter()
+            ok, _ = convert_sigma_to_siem(content, siem, pipeline=pipeline, engine=engine, use_cache=False)
+            samples.append((category, siem, (time.perf_counter() - t0) * 1000))
+            failures += not ok
+    return samples, failures, time.perf_counter() - start
+
+
+def run_pool(rules, siems, pipeline, engine, jobs) -> float:
+    """End-to-end conversions per second through the worker pool (fresh workers)."""
+    units = (
+        ConversionUnit(path, siem, content, pipeline=pipeline, engine=engine, use_cache=False, rule_index=i)
+        for i, (_, path, content) in enumerate(rules)
+        for siem in siems
+    )
+    start = time.perf_counter()
+    count = sum(1 for _ in zip_units(units, jobs))
+    return count / (time.perf_counter() - start)
+
+
+def breakdown(cold, warm, key) -> dict:
+    groups = sorted({key(s) for s in cold + warm})
+    return {
+        g: {
+            "cold": summarize([s[2] for s in cold if key(s) == g]),
+            "warm": summarize([s[2] for s in warm if key(s) == g]),
+        }
+        for g in groups
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SigmaForage over the bundled rule corpus")
+    parser.add_argument("--corpus", default="sigma-rules", help="Rule directory (default: sigma-rules)")
+    parser.add_argument(
+        "-s", "--siem",
+        dest="siems",
+        action="append",
+        help="SIEM to benchmark (repeatable; default: one per installed backend)",
+    )
+    parser.add_argument("-p", "--pipeline", default="sysmon", help="Sigma pipeline (default: sysmon)")
+    parser.add_argument("--engine", default="inprocess", help="Conversion engine (default: inprocess)")
+    parser.add_argument("--passes", type=int, default=3, help="Warm passes after the cold pass (default: 3)")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Also measure worker pool throughput with N jobs")
+    parser.add_argument("--out", metavar="FILE", help="Write results as JSON")
+    args = parser.parse_args()
+
+    corpus = Path(args.corpus)
+    rules = load_corpus(corpus)
+    if not rules:
+        print(f"Error: No rules found under {corpus}", file=sys.stderr)
+        return 2
+    siems = args.siems or installed_siems()
+    if not siems:
+        print("Error: No pySigma backends installed; pass -s to benchmark the subprocess engine.", file=sys.stderr)
+        return 2
+
+    print(f"Corpus: {corpus} ({len(rules)} rules)  SIEMs: {', '.join(siems)}  Engine: {args.engine}")
+    cold, failures, _ = run_pass(rules, siems, args.pipeline, args.engine)
+    warm, warm_seconds = [], 0.0
+    for _ in range(args.passes):
+        samples, _, seconds = run_pass(rules, siems, args.pipeline, args.engine)
+        warm.extend(samples)
+        warm_seconds += seconds
+    pool_throughput = run_pool(rules, siems, args.pipeline, args.engine, args.jobs) if args.jobs > 1 else None
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "sigmaforge": __version__,
+            "pysigma": pysigma_version(),
+            "backends": {s: backend_package_version(SIEM_BACKENDS[s][0]) for s in siems if s in SIEM_BACKENDS},
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "corpus": str(corpus),
+            "rules": len(rules),
+            "siems": siems,
+            "pipeline": args.pipeline,
+            "engine": args.engine,
+            "passes": args.passes,
+        },
+        "failures": failures,
+        "cold": summarize([ms for *_, ms in cold]),
+        "warm": summarize([ms for *_, ms in warm]),
+        "throughput_per_sec": round(len(warm) / warm_seconds, 1) if warm_seconds else None,
+        "pool": {"jobs": args.jobs, "throughput_per_sec": round(pool_throughput, 1)} if pool_throughput else None,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "categories": breakdown(cold, warm, lambda s: s[0]),
+        "siems": breakdown(cold, warm, lambda s: s[1]),
+    }
+
+    print(f"\n{'':<14} {'n':>6} {'median ms':>10} {'p95 ms':>10} {'max ms':>10} {'total ms':>10}")
+    print("-" * 65)
+    for label in ("cold", "warm"):
+        s = results[label]
+        if s["n"]:
+            print(f"{label:<14} {s['n']:>6} {s['median_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['max_ms']:>10.1f} {s['total_ms']:>10.1f}")
+    for section, label in (("categories", "category"), ("siems", "SIEM")):
+        print(f"\nWarm by {label}:")
+        for name, entry in results[section].items():
+            s = entry["warm"]
+            if s["n"]:
+                print(f"  {name:<12} {s['n']:>6} {s['median_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['max_ms']:>10.1f}")
+    print(f"\nThroughput (warm, serial): {results['throughput_per_sec']} conversions/s")
+    if results["pool"]:
+        print(f"Throughput (pool, {args.jobs} jobs): {results['pool']['throughput_per_sec']} conversions/s")
+    print(f"Peak RSS: {results['peak_rss_mb']} MB (workers: {results['children_peak_rss_mb']} MB)")
+    if failures:
+        print(f"Failed conversions per pass: {failures}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
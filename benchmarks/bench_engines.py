@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-conversion latency of the in-process and subprocess engines.
+
+Converts the same rule repeatedly with each engine and reports min/median/mean/max
+latency per conversion. The first in-process conversion (plugin discovery and
+imports) is reported separately as the cold start.
+
+Usage (from repo root):
+  python benchmarks/bench_engines.py
+  python benchmarks/bench_engines.py --rule sigma-rules/Linux/proc_creation_lnx_curl_usage.yml -s kusto -n 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Allow importing sigmaforge when run from repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sigmaforge.converter import convert_sigma_to_siem
+
+
+def _time_engine(sigma_content: str, siem: str, pipeline: str, engine: str, runs: int) -> tuple[float, list[float]]:
+    """Return (first conversion seconds, [seconds for each of the following runs])."""
+    samples = []
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        ok, out = convert_sigma_to_siem(sigma_content, siem, pipeline=pipeline, engine=engine)
+        samples.append(time.perf_counter() - start)
+        if not ok:
+            raise RuntimeError(f"{engine} conversion failed: {out.splitlines()[0] if out else out}")
+    return samples[0], samples[1:]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SigmaForage conversion engines")
+    parser.add_argument(
+        "--rule",
+        default="sigma-rules/Windows/proc_creation_win_curl_execution.yml",
+        help="Path to Sigma rule YAML",
+    )
+    parser.add_argument("-s", "--siem", default="splunk", help="Target SIEM (default: splunk)")
+    parser.add_argument("-p", "--pipeline", default="sysmon", help="Sigma pipeline (default: sysmon)")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Timed runs per engine (default: 10)")
+    args = parser.parse_args()
+
+    rule_path = Path(args.rule)
+    if not rule_path.exists():
+        print(f"Error: Rule file not found: {rule_path}", file=sys.stderr)
+        return 2
+    sigma_content = rule_path.read_text(encoding="utf-8")
+
+    print(f"Rule: {rule_path}")
+    print(f"SIEM: {args.siem}  Pipeline: {args.pipeline}  Runs: {args.runs}\n")
+    print(f"{'Engine':<12} {'first ms':>10} {'min ms':>10} {'median ms':>10} {'mean ms':>10} {'max ms':>10}")
+    print("-" * 67)
+
+    medians = {}
+    for engine in ("inprocess", "subprocess"):
+        try:
+            first, samples = _time_engine(sigma_content, args.siem, args.pipeline, engine, args.runs)
+        except RuntimeError as e:
+            print(f"{engine:<12} {e}")
+            continue
+        ms = [s * 1000 for s in samples]
+        medians[engine] = statistics.median(ms)
+        print(
+            f"{engine:<12} {first * 1000:>10.1f} {min(ms):>10.1f} {statistics.median(ms):>10.1f} "
+            f"{statistics.mean(ms):>10.1f} {max(ms):>10.1f}"
+        )
+
+    print("-" * 67)
+    if len(medians) == 2 and medians["inprocess"] > 0:
+        print(f"Speedup (median): {medians['subprocess'] / medians['inprocess']:.1f}x")
+    return 0 if medians else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
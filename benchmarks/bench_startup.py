@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Startup-time regression check for the cheap CLI commands.
+
+Runs `sigmaforage --version`, `--list-siem` and `--list-pipelines` in fresh
+interpreters under `python -X importtime` and adds up the import time each command
+causes on top of interpreter startup (everything imported after `site`). It fails
+(exit 1) when the median import time of a command exceeds the budget, or when a
+command loads any of the heavy modules that only conversions need.
+
+Usage (from repo root):
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --budget-ms 20 -n 9
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = (["--version"], ["--list-siem"], ["--list-pipelines"])
+
+# Modules the listing commands must not import (prefix match on dotted names)
+HEAVY_MODULES = (
+    "sigma.",
+    "sigmaforge.batch",
+    "sigmaforge.converter",
+    "sigmaforge.daemon",
+    "sigmaforge.engine",
+    "sigmaforge.result_cache",
+    "sigmaforge.watch",
+    "certifi",
+    "concurrent.futures",
+    "http.server",
+    "multiprocessing",
+    "yaml",
+)
+
+DEFAULT_BUDGET_MS = 30.0
+
+# Imports main(argv) and reports the modules it loaded as the last stdout line
+RUNNER = """
+import json, sys
+before = set(sys.modules)
+from sigmaforge.cli import main
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+print()
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+
+def parse_importtime(stderr: str) -> float:
+    """Microseconds spent in top-level imports made after `site` finished."""
+    total = 0
+    after_site = False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level import (nested ones are indented further)
+            if after_site:
+                total += int(cumulative)
+            elif name.strip() == "site":
+                after_site = True
+    return total
+
+
+def measure(argv: list[str]) -> tuple[float, list[str]]:
+    """Return (import milliseconds, newly loaded modules) for one cold run of the CLI."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER, *argv],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=env,
+        check=True,
+    )
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return parse_importtime(proc.stderr) / 1000, loaded
+
+
+def heavy(modules: list[str]) -> list[str]:
+    return [m for m in modules if m == "sigma" or m.startswith(HEAVY_MODULES)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check SigmaForage CLI cold-start import time")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ.get("SIGMAFORGE_STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)),
+        help=f"Max median import time per command (default: {DEFAULT_BUDGET_MS:g}, or $SIGMAFORGE_STARTUP_BUDGET_MS)",
+    )
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Cold runs per command (default: 5)")
+    args = parser.parse_args()
+
+    # warm-up: write .pyc files so compilation is not timed, and cache backend discovery for --list-siem
+    measure(["--list-siem"])
+    failures = []
+    print(f"{'Command':<18} {'median ms':>10} {'max ms':>10}  heavy modules")
+    print("-" * 60)
+    for argv in COMMANDS:
+        samples, loaded = [], set()
+        for _ in range(args.runs):
+            ms, modules = measure(argv)
+            samples.append(ms)
+            loaded.update(modules)
+        median = statistics.median(samples)
+        bad = heavy(sorted(loaded))
+        print(f"{' '.join(argv):<18} {median:>10.1f} {max(samples):>10.1f}  {', '.join(bad) or '-'}")
+        if median > args.budget_ms:
+            failures.append(f"{' '.join(argv)}: {median:.1f} ms > budget {args.budget_ms:g} ms")
+        if bad:
+            failures.append(f"{' '.join(argv)}: imports {', '.join(bad)}")
+
+    if failures:
+        print("\nFAIL\n  " + "\n  ".join(failures))
+        return 1
+    print(f"\nOK (budget {args.budget_ms:g} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare two bench_corpus.py result files and flag regressions.
+
+A metric regresses when it is worse than the baseline by more than --threshold
+(relative) and, for latencies, by more than --min-delta-ms (absolute, so sub-
+millisecond jitter is not reported). Exits 1 if anything regressed, so it can
+gate CI.
+
+Usage (from repo root):
+  python benchmarks/compare_results.py baseline.json bench.json
+  python benchmarks/compare_results.py baseline.json bench.json --threshold 0.2
+"""
+
+import argparse
+import json
+import sys
+
+# (path into the results, higher_is_better)
+TOP_LEVEL_METRICS = (
+    ("cold.median_ms", False),
+    ("cold.total_ms", False),
+    ("warm.median_ms", False),
+    ("warm.p95_ms", False),
+    ("throughput_per_sec", True),
+    ("pool.throughput_per_sec", True),
+    ("peak_rss_mb", False),
+)
+BREAKDOWN_METRICS = (("warm.median_ms", False), ("warm.p95_ms", False))
+
+
+def lookup(results: dict, path: str):
+    value = results
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def metric_paths(baseline: dict, current: dict):
+    """Yield (path, higher_is_better) for every metric present in both runs."""
+    yield from TOP_LEVEL_METRICS
+    for section in ("categories", "siems"):
+        for name in sorted(set(baseline.get(section, {})) & set(current.get(section, {}))):
+            for metric, higher in BREAKDOWN_METRICS:
+                yield f"{section}.{name}.{metric}", higher
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float) -> list[tuple]:
+    """Return [(path, base, current, relative change, regressed)] for metrics present in both runs."""
+    rows = []
+    for path, higher_is_better in metric_paths(baseline, current):
+        base, new = lookup(baseline, path), lookup(current, path)
+        if not isinstance(base, (int, float)) or not isinstance(new, (int, float)) or base == 0:
+            continue
+        change = (new - base) / base
+        worse = -change if higher_is_better else change
+        regressed = worse > threshold
+        if regressed and path.endswith("_ms") and abs(new - base) < min_delta_ms:
+            regressed = False
+        rows.append((path, base, new, change, regressed))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two SigmaForage benchmark result files")
+    parser.add_argument("baseline", help="Baseline results JSON")
+    parser.add_argument("current", help="New results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative regression threshold (default: 0.10)")
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=0.5,
+        help="Ignore latency regressions smaller than this many ms (default: 0.5)",
+    )
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    for key in ("pysigma", "backends", "python", "cpus", "engine", "siems", "rules"):
+        if baseline.get("meta", {}).get(key) != current.get("meta", {}).get(key):
+            print(f"Note: {key} differs: {baseline['meta'].get(key)} -> {current['meta'].get(key)}")
+
+    rows = compare(baseline, current, args.threshold, args.min_delta_ms)
+    print(f"\n{'Metric':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    print("-" * 72)
+    for path, base, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{path:<40} {base:>10.2f} {new:>10.2f} {change:>+7.1%}{flag}")
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}.")
+        return 1
+    print(f"\nNo regressions above {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
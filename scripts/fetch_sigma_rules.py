@@ -1,12 +1,32 @@
 #!/usr/bin/env python3
 """
 Fetch Sigma rules from SigmaHQ/sigma (rules-threat-hunting and rules) into sigma-rules/.
-Usage: python scripts/fetch_sigma_rules.py
+
+Downloads run concurrently (--jobs) over keep-alive connections, one per worker
+thread and host. A manifest (sigma-rules/.manifest.json) records each file's ETag,
+Last-Modified and SHA-256, so later runs send conditional requests and leave
+unchanged rules alone: a 304, or a 200 with identical content, does not touch the
+file. Files are written atomically (temp file + rename). A local file whose content
+no longer matches the manifest is downloaded again unconditionally.
+
+Usage:
+  python scripts/fetch_sigma_rules.py
+  python scripts/fetch_sigma_rules.py --jobs 16 --force
+  python scripts/fetch_sigma_rules.py --base-url http://127.0.0.1:8000 --out /tmp/rules
 """
+import argparse
+import hashlib
+import http.client
+import json
 import os
 import ssl
-import urllib.request
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urljoin, urlsplit
 
 try:
     import certifi
@@ -14,8 +34,11 @@ try:
 except ImportError:
     SSL_CTX = ssl.create_default_context()
 
-BASE = "https://raw.githubusercontent.com/SigmaHQ/sigma/master"
+BASE = os.environ.get("SIGMAFORGE_RULES_URL", "https://raw.githubusercontent.com/SigmaHQ/sigma/master")
 RULES_DIR = Path(__file__).resolve().parent.parent / "sigma-rules"
+MANIFEST_NAME = ".manifest.json"
+USER_AGENT = "SigmaForge/1.0"
+MAX_REDIRECTS = 3
 
 # (subpath on GitHub, local folder name)
 RULES = {
@@ -94,29 +117,154 @@ RULES = {
 }
 
 
-def fetch(url: str) -> str:
-    req = urllib.request.Request(url, headers={"User-Agent": "SigmaForge/1.0"})
-    with urllib.request.urlopen(req, timeout=30, context=SSL_CTX) as r:
-        return r.read().decode("utf-8")
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections, one per (thread, scheme, host)."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self, scheme: str, netloc: str, fresh: bool = False):
+        conns = self.local.__dict__.setdefault("conns", {})
+        key = (scheme, netloc)
+        if fresh and key in conns:
+            conns.pop(key).close()
+        if key not in conns:
+            if scheme == "https":
+                conns[key] = http.client.HTTPSConnection(netloc, timeout=self.timeout, context=SSL_CTX)
+            else:
+                conns[key] = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        return conns[key]
+
+    def get(self, url: str, headers: dict) -> tuple[int, dict, bytes]:
+        """GET url (following redirects). Returns (status, lower-cased headers, body)."""
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            target = parts.path + (f"?{parts.query}" if parts.query else "")
+            for attempt in range(2):
+                conn = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+                try:
+                    conn.request("GET", target, headers={"User-Agent": USER_AGENT, **headers})
+                    response = conn.getresponse()
+                    body = response.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionError, http.client.CannotSendRequest):
+                    if attempt:  # a reused keep-alive connection may have been closed by the server
+                        raise
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.status in (301, 302, 303, 307, 308) and "location" in response_headers:
+                url = urljoin(url, response_headers["location"])
+                continue
+            return response.status, response_headers, body
+        raise OSError(f"Too many redirects: {url}")
+
+
+def atomic_write(dest: Path, content: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
+    try:
+        with open(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dest)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def sha256_file(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
 
 
-def main():
-    RULES_DIR.mkdir(parents=True, exist_ok=True)
+def sync_one(pool: ConnectionPool, url: str, dest: Path, entry: dict | None) -> tuple[str, dict | None, str]:
+    """Bring dest up to date with url. Returns (status word, new manifest entry, detail)."""
+    headers = {}
+    local_hash = sha256_file(dest)
+    if entry and entry.get("url") == url and local_hash and local_hash == entry.get("sha256"):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    status, response_headers, body = pool.get(url, headers)
+    if status == 304:
+        return "UNCHANGED", entry, ""
+    if status != 200:
+        return "SKIP", entry, f"HTTP {status}"
+    digest = hashlib.sha256(body).hexdigest()
+    new_entry = {
+        "url": url,
+        "etag": response_headers.get("etag"),
+        "last_modified": response_headers.get("last-modified"),
+        "sha256": digest,
+    }
+    if digest == local_hash:
+        return "UNCHANGED", new_entry, ""
+    atomic_write(dest, body)
+    return "OK", new_entry, ""
+
+
+def load_manifest(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fetch the bundled Sigma rules from SigmaHQ")
+    parser.add_argument(
+        "--base-url",
+        default=BASE,
+        help="Base URL of the sigma repository contents (default: $SIGMAFORGE_RULES_URL or SigmaHQ/sigma master)",
+    )
+    parser.add_argument("--out", type=Path, default=RULES_DIR, help="Destination directory (default: sigma-rules/)")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Concurrent downloads (default: 8)")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds (default: 30)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and download every rule")
+    args = parser.parse_args()
+
+    base = args.base_url.rstrip("/")
+    manifest_path = args.out / MANIFEST_NAME
+    manifest = {} if args.force else load_manifest(manifest_path)
+    jobs = []
     for folder, paths in RULES.items():
-        out_dir = RULES_DIR / folder
-        out_dir.mkdir(parents=True, exist_ok=True)
+        (args.out / folder).mkdir(parents=True, exist_ok=True)
         for subpath in paths:
-            name = os.path.basename(subpath)
-            url = f"{BASE}/{subpath}"
-            dest = out_dir / name
-            try:
-                content = fetch(url)
-                dest.write_text(content, encoding="utf-8")
-                print(f"OK {folder}/{name}")
-            except Exception as e:
-                print(f"SKIP {folder}/{name}: {e}")
-    print("Done. Rules in", RULES_DIR)
+            name = f"{folder}/{os.path.basename(subpath)}"
+            jobs.append((name, f"{base}/{subpath}", args.out / name))
+
+    pool = ConnectionPool(args.timeout)
+
+    def run(job):
+        name, url, dest = job
+        try:
+            return name, *sync_one(pool, url, dest, manifest.get(name))
+        except Exception as e:
+            return name, "SKIP", manifest.get(name), str(e)
+
+    start = time.perf_counter()
+    counts = {"OK": 0, "UNCHANGED": 0, "SKIP": 0}
+    new_manifest = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        for name, status, entry, detail in executor.map(run, jobs):
+            counts[status] += 1
+            if entry:
+                new_manifest[name] = entry
+            if status != "UNCHANGED":
+                print(f"{status} {name}" + (f": {detail}" if detail else ""))
+
+    fd, tmp = tempfile.mkstemp(dir=args.out, prefix=f".{MANIFEST_NAME}.", suffix=".tmp")
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump({"base_url": base, "files": new_manifest}, f, indent=2, sort_keys=True)
+    os.replace(tmp, manifest_path)
+    print(
+        f"Done in {time.perf_counter() - start:.1f} s: {counts['OK']} updated, "
+        f"{counts['UNCHANGED']} unchanged, {counts['SKIP']} skipped. Rules in {args.out}"
+    )
+    return 1 if counts["SKIP"] else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,71 +1,324 @@
 #!/usr/bin/env python3
 """
-Validate SIEM query outputs: run conversion for each supported SIEM and report
-success/failure. Use this after installing backends (sigma plugin install <backend>)
-to verify which SIEMs produce valid output.
+Validate SIEM query outputs: convert every rule for every SIEM (the rule x SIEM
+matrix) and report which cells succeed. Use this after installing backends (sigma
+plugin install <backend>) and before a release to verify the whole corpus.
+
+Conversions run through a sigmaforge.Converter session on a worker pool (--jobs),
+each backend once per rule even when several SIEM names share it. Cell results are
+remembered in a state file keyed by the result cache key (rule content, backend,
+pipelines and package versions), so unchanged cells, failures included, are not
+converted again; --no-cache reruns everything. Runs scoped with -s or --rule keep
+the other cells; cells unused for DEFAULT_MAX_AGE_DAYS are dropped. SIEMs whose
+backend is not installed fail without being run.
+
+Reports: a per-SIEM summary with timings and the slowest cells on stdout, and with
+--junit / --json a JUnit XML (one testsuite per SIEM, one testcase per rule) or
+JSON report with per-cell timing.
 
 Usage (from repo root):
   python scripts/validate_siem_outputs.py
   python scripts/validate_siem_outputs.py --rule sigma-rules/Windows/proc_creation_win_curl_execution.yml
+  python scripts/validate_siem_outputs.py -i sigma-rules/ -j 8 --junit validate.xml --json validate.json
+  python scripts/validate_siem_outputs.py -i sigma-rules/ -s splunk -s kusto --no-cache
 """
 
 import argparse
+import json
+import os
 import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
 from pathlib import Path
 
 # Allow importing sigmaforge when run from repo root
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from sigmaforge.converter import convert_sigma_to_siem
-from sigmaforge.siem_backends import SIEM_DISPLAY_ORDER
+from sigmaforge.batch import default_jobs, group_siems
+from sigmaforge.converter import cache_engine
+from sigmaforge.defaults import DEFAULT_MAX_AGE_DAYS
+from sigmaforge.discovery import missing_backends
+from sigmaforge.engine import BACKEND_CACHE
+from sigmaforge.result_cache import cache_key, default_cache_dir
+from sigmaforge.rules import RuleSource, is_bulk_input, iter_rule_paths
+from sigmaforge.session import Converter
+from sigmaforge.siem_backends import SIEM_BACKENDS, SIEM_DISPLAY_ORDER
+
+DEFAULT_RULE = "sigma-rules/Windows/proc_creation_win_curl_execution.yml"
+STATE_FORMAT = 1
+
+
+class Progress:
+    """One self-updating status line on stderr (only when it is a terminal)."""
+
+    def __init__(self, total: int, enabled: bool):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.enabled = enabled and sys.stderr.isatty()
+        self.start = time.perf_counter()
+        self.last = 0.0
+
+    def update(self, ok: bool) -> None:
+        self.done += 1
+        self.failed += not ok
+        now = time.perf_counter()
+        if self.enabled and (now - self.last > 0.1 or self.done == self.total):
+            self.last = now
+            rate = self.done / max(now - self.start, 1e-9)
+            eta = (self.total - self.done) / rate if rate else 0
+            print(
+                f"\r[{self.done}/{self.total}] {100 * self.done / max(self.total, 1):3.0f}%  "
+                f"{self.failed} failed  {rate:.1f} cells/s  ETA {eta:.0f}s ",
+                end="",
+                file=sys.stderr,
+                flush=True,
+            )
+
+    def close(self) -> None:
+        if self.enabled:
+            print(file=sys.stderr)
+
+
+def load_state(path: Path) -> dict:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state.get("cells", {}) if state.get("format") == STATE_FORMAT else {}
+
+
+def save_state(path: Path, cells: dict, used: dict) -> None:
+    """
+    Store the cells used by this run (marked with the time) on top of the loaded
+    ones, dropping cells no run has used for DEFAULT_MAX_AGE_DAYS.
+    """
+    now = int(time.time())
+    cutoff = now - DEFAULT_MAX_AGE_DAYS * 86400
+    cells = {key: cell for key, cell in cells.items() if cell.get("used", now) >= cutoff}
+    cells.update((key, {**outcome, "used": now}) for key, outcome in used.items())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps({"format": STATE_FORMAT, "cells": cells}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def run_matrix(rule_paths, siems, args, progress_enabled=True) -> tuple[list[dict], Counter]:
+    """
+    Convert (or recall) every rule x SIEM cell. Returns one dict per cell (rule-major)
+    and the cache counters summed over the workers.
+    """
+    state_path = Path(args.state) if args.state else default_cache_dir() / "validate-matrix.json"
+    state = {} if args.no_cache else load_state(state_path)
+    missing = missing_backends({SIEM_BACKENDS[s][0] for s in siems}, args.engine) or set()
+    groups = group_siems(siems, args.pipeline)
+    cells: list[dict] = []
+    new_state: dict = {}
+    pending: dict[tuple[int, str], dict] = {}  # (rule index, SIEM) -> cell waiting for a conversion
+    # Rules to convert, grouped by the SIEMs still to convert for them (usually one group)
+    todo: dict[tuple[str, ...], list[tuple[int, RuleSource]]] = defaultdict(list)
+    for rule_index, path in enumerate(rule_paths):
+        try:
+            content = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            content, read_error = None, str(e)
+        todo_siems = []
+        for group in groups:
+            backend_id, pkg = SIEM_BACKENDS[group[0]]
+            base = {"rule": str(path), "backend": backend_id, "cached": False, "seconds": 0.0}
+            if content is None or backend_id in missing:
+                error = read_error if content is None else f"Backend not installed: pip install {pkg}"
+                cells += [{**base, "siem": s, "ok": False, "error": error, "snippet": None} for s in group]
+                continue
+            key = cache_key(content, backend_id, args.pipeline, cache_engine(args.engine, backend_id))
+            if key in state:
+                outcome = {k: v for k, v in state[key].items() if k != "used"}
+                new_state[key] = outcome
+                cells += [{**base, "siem": s, **outcome, "cached": True} for s in group]
+                continue
+            for s in group:
+                cell = {**base, "siem": s, "key": key}
+                pending[(rule_index, s)] = cell
+                cells.append(cell)
+                todo_siems.append(s)
+        if todo_siems:
+            todo[tuple(todo_siems)].append((rule_index, RuleSource(str(path), content)))
+
+    progress = Progress(len(cells), progress_enabled and not args.no_progress)
+    for cell in cells:
+        if "key" not in cell:
+            progress.update(cell["ok"])
+    converter = Converter(pipeline=args.pipeline, engine=args.engine, jobs=args.jobs, use_cache=not args.no_cache)
+    try:
+        for siem_set, rules in todo.items():
+            for result in converter.convert_many((source for _, source in rules), siem_set):
+                cell = pending.pop((rules[result.rule_index][0], result.siem))
+                outcome = {
+                    "ok": result.ok,
+                    "error": result.error,
+                    "snippet": result.text.replace("\n", " ").strip()[:80] if result.ok else None,
+                    "seconds": round(result.seconds, 6),
+                }
+                new_state[cell.pop("key")] = outcome
+                cell.update(outcome)
+                progress.update(result.ok)
+    finally:
+        converter.close()
+        progress.close()
+        if not args.no_cache:
+            save_state(state_path, state, new_state)
+    return cells, converter.counters
+
+
+def summarize(cells: list[dict], siems: list[str]) -> dict:
+    by_siem = defaultdict(list)
+    for cell in cells:
+        by_siem[cell["siem"]].append(cell)
+    summary = {}
+    for siem in siems:
+        group = by_siem.get(siem, [])
+        ran = sorted(c["seconds"] for c in group if c["seconds"])
+        summary[siem] = {
+            "passed": sum(c["ok"] for c in group),
+            "failed": sum(not c["ok"] for c in group),
+            "cached": sum(c["cached"] for c in group),
+            "seconds": round(sum(ran), 6),
+            "median_ms": round(1000 * ran[len(ran) // 2], 3) if ran else None,
+            "max_ms": round(1000 * ran[-1], 3) if ran else None,
+        }
+    return summary
+
+
+def write_junit(path: str, cells: list[dict], siems: list[str]) -> None:
+    root = ET.Element("testsuites", name="sigmaforage-validate")
+    by_siem = defaultdict(list)
+    for cell in cells:
+        by_siem[cell["siem"]].append(cell)
+    for siem in siems:
+        group = by_siem.get(siem, [])
+        suite = ET.SubElement(
+            root,
+            "testsuite",
+            name=siem,
+            tests=str(len(group)),
+            failures=str(sum(not c["ok"] for c in group)),
+            time=f"{sum(c['seconds'] for c in group):.6f}",
+        )
+        for cell in group:
+            case = ET.SubElement(suite, "testcase", classname=siem, name=cell["rule"], time=f"{cell['seconds']:.6f}")
+            if not cell["ok"]:
+                error = cell["error"] or ""
+                ET.SubElement(case, "failure", message=error.splitlines()[0] if error else "").text = error
+    ET.indent(root)
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
 
 
 def main() -> int:
-    parser = argparse.ArgumentParser(description="Validate SigmaForage SIEM conversions")
+    parser = argparse.ArgumentParser(description="Validate SigmaForage SIEM conversions over a rule x SIEM matrix")
+    parser.add_argument(
+        "-i", "--input",
+        help="Rule file, directory (recursive), quoted glob or @listfile (default: --rule)",
+    )
     parser.add_argument(
         "--rule",
-        default="sigma-rules/Windows/proc_creation_win_curl_execution.yml",
-        help="Path to Sigma rule YAML",
+        default=DEFAULT_RULE,
+        help="Path to a single Sigma rule YAML, used when -i is not given",
+    )
+    parser.add_argument(
+        "-s", "--siem",
+        dest="siems",
+        action="append",
+        help="SIEM to validate (repeatable; default: all supported)",
     )
     parser.add_argument(
         "--pipeline",
         default="sysmon",
         help="Sigma pipeline (default: sysmon)",
     )
+    parser.add_argument("--engine", default=None, help="Conversion engine: auto, inprocess or subprocess")
+    parser.add_argument("-j", "--jobs", type=int, default=default_jobs(), help="Worker processes (default: number of CPUs)")
+    parser.add_argument(
+        "--backend-cache-size",
+        type=int,
+        help="Max number of warm backend/pipeline objects kept in memory (default: 32)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Convert every cell, ignoring remembered results")
+    parser.add_argument("--state", metavar="FILE", help="Cell state file (default: validate-matrix.json in the cache directory)")
+    parser.add_argument("--no-progress", action="store_true", help="Do not show the progress line")
+    parser.add_argument("--junit", metavar="FILE", help="Write a JUnit XML report")
+    parser.add_argument("--json", metavar="FILE", help="Write a JSON report with per-cell timing")
+    parser.add_argument("--slowest", type=int, default=10, help="Show the N slowest cells (default: 10)")
     args = parser.parse_args()
+    if args.backend_cache_size is not None:
+        BACKEND_CACHE.resize(args.backend_cache_size)
 
-    rule_path = Path(args.rule)
-    if not rule_path.exists():
-        print(f"Error: Rule file not found: {rule_path}", file=sys.stderr)
+    spec = args.input or args.rule
+    if not is_bulk_input(spec) and not Path(spec).exists():
+        print(f"Error: Rule file not found: {spec}", file=sys.stderr)
+        return 2
+    rule_paths = list(iter_rule_paths(spec))
+    if not rule_paths:
+        print(f"Error: No Sigma rules found for input: {spec}", file=sys.stderr)
         return 2
+    siems = list(dict.fromkeys(s.lower() for s in args.siems)) if args.siems else list(dict.fromkeys(SIEM_DISPLAY_ORDER))
+    unknown = [s for s in siems if s not in SIEM_BACKENDS]
+    if unknown:
+        print(f"Error: Unknown SIEM: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    print(f"Rules: {spec} ({len(rule_paths)})")
+    print(f"SIEMs: {len(siems)}  Pipeline: {args.pipeline}  Jobs: {args.jobs}\n")
+    start = time.perf_counter()
+    cells, counters = run_matrix(rule_paths, siems, args)
+    elapsed = time.perf_counter() - start
 
-    sigma_content = rule_path.read_text(encoding="utf-8")
-    print(f"Rule: {rule_path}")
-    print(f"Pipeline: {args.pipeline}\n")
-    print(f"{'SIEM':<22} {'Status':<6} Output (first 80 chars)")
-    print("-" * 100)
-
-    passed = 0
-    failed = 0
-    for siem in SIEM_DISPLAY_ORDER:
-        ok, out = convert_sigma_to_siem(
-            sigma_content,
-            siem,
-            pipeline=args.pipeline,
-            rule_path=str(rule_path),
+    if len(rule_paths) == 1:
+        print(f"{'SIEM':<22} {'Status':<6} Output (first 80 chars)")
+        print("-" * 100)
+        for cell in sorted(cells, key=lambda c: siems.index(c["siem"])):
+            snippet = cell["snippet"] if cell["ok"] else (cell["error"] or "").split("\n")[0].strip()[:80]
+            print(f"{cell['siem']:<22} {'OK' if cell['ok'] else 'FAIL':<6} {snippet}")
+        print("-" * 100)
+
+    summary = summarize(cells, siems)
+    print(f"{'SIEM':<22} {'passed':>7} {'failed':>7} {'cached':>7} {'total s':>9} {'median ms':>10} {'max ms':>9}")
+    print("-" * 76)
+    for siem, row in summary.items():
+        median = f"{row['median_ms']:.1f}" if row["median_ms"] is not None else "-"
+        worst = f"{row['max_ms']:.1f}" if row["max_ms"] is not None else "-"
+        print(
+            f"{siem:<22} {row['passed']:>7} {row['failed']:>7} {row['cached']:>7} "
+            f"{row['seconds']:>9.2f} {median:>10} {worst:>9}"
         )
-        if ok:
-            status = "OK"
-            passed += 1
-            snippet = (out or "").replace("\n", " ").strip()[:80]
-        else:
-            status = "FAIL"
-            failed += 1
-            snippet = (out or "").split("\n")[0].strip()[:80]
-        print(f"{siem:<22} {status:<6} {snippet}")
-
-    print("-" * 100)
-    print(f"Passed: {passed}  Failed: {failed}")
+    slowest = sorted((c for c in cells if c["seconds"]), key=lambda c: c["seconds"], reverse=True)[: args.slowest]
+    if slowest and len(rule_paths) > 1:
+        print("\nSlowest cells:")
+        for cell in slowest:
+            print(f"  {1000 * cell['seconds']:>9.1f} ms  {cell['siem']:<20} {cell['rule']}")
+
+    passed = sum(c["ok"] for c in cells)
+    failed = len(cells) - passed
+    print(f"\nPassed: {passed}  Failed: {failed}  Cells: {len(cells)}  Wall time: {elapsed:.1f} s")
+    print(
+        f"Backend cache: {counters['backend_hits']} hit(s), {counters['backend_misses']} miss(es); "
+        f"result cache: {counters['result_hits']} hit(s), {counters['result_misses']} miss(es)"
+    )
+
+    if args.junit:
+        write_junit(args.junit, cells, siems)
+        print(f"Wrote {args.junit}")
+    if args.json:
+        report = {
+            "rules": len(rule_paths),
+            "siems": siems,
+            "pipeline": args.pipeline,
+            "wall_seconds": round(elapsed, 3),
+            "summary": summary,
+            "cells": cells,
+        }
+        Path(args.json).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.json}")
     if failed > 0:
         print("\nInstall missing backends: sigma plugin install <backend>  (e.g. splunk, elasticsearch, kusto)")
     return 0 if failed == 0 else 1
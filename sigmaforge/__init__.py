@@ -6,3 +6,20 @@ Built for Detection Engineers and DFIR teams.
 """
 
 __version__ = "0.1.0"
+
+# The Python API is loaded on first use, so `import sigmaforge` (and the CLI's
+# listing commands) do not pay for the conversion machinery
+_LAZY = {
+    "Converter": "session",
+    "ConversionResult": "session",
+}
+
+__all__ = ["ConversionResult", "Converter", "__version__"]
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        from importlib import import_module
+
+        return getattr(import_module(f".{_LAZY[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
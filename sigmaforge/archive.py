@@ -0,0 +1,113 @@
+"""
+Rules read straight out of rule archives (SigmaHQ release zips, source tarballs).
+
+`sigmaforage import-archive sigma_all_rules.zip` converts or indexes the rules in
+an archive without unpacking it: members are read one at a time, in archive order,
+and nothing is written to disk. Tarballs (plain, gzip, bzip2 or xz) are read as a
+stream; zip members are read through the central directory, so for zips only the
+members that are actually needed get decompressed.
+
+A rule inside an archive is named <archive>!<member>, e.g.
+sigma_all_rules.zip!rules-threat-hunting/windows/x.yml; the rule index stores it
+under the absolute archive path.
+"""
+
+import os
+import tarfile
+import time
+import zipfile
+from collections.abc import Iterable, Iterator
+
+from .index import IndexEntry
+from .rules import RULE_SUFFIXES, RuleSource
+
+ARCHIVE_MEMBER_SEP = "!"
+
+
+class ArchiveError(Exception):
+    """The archive cannot be opened or is corrupt."""
+
+
+def member_name(archive: str, member: str) -> str:
+    return f"{archive}{ARCHIVE_MEMBER_SEP}{member}"
+
+
+# What reading a corrupt or truncated archive raises
+_READ_ERRORS = (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError)
+
+
+def _read(archive: str, member: str, read) -> bytes:
+    try:
+        return read()
+    except _READ_ERRORS as e:
+        raise ArchiveError(f"Cannot read {member_name(archive, member)}: {e}") from e
+
+
+def _wanted(name: str, prefixes: tuple[str, ...]) -> bool:
+    return name.lower().endswith(RULE_SUFFIXES) and (not prefixes or name.startswith(prefixes))
+
+
+def _zip_mtime_ns(info: zipfile.ZipInfo) -> int:
+    return int(time.mktime(info.date_time + (0, 0, -1))) * 1_000_000_000
+
+
+def iter_members(archive: str, prefixes: Iterable[str] = ()) -> Iterator[IndexEntry]:
+    """
+    Yield the rule files in archive whose member path starts with one of prefixes
+    (all rule files if none), as IndexEntry(member path, mtime, size, read). For
+    tarballs, read() only works until the next member is requested. Raises
+    ArchiveError if the archive cannot be read.
+    """
+    prefixes = tuple(prefixes)
+    try:
+        if zipfile.is_zipfile(archive):
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir() and _wanted(info.filename, prefixes):
+                        yield IndexEntry(
+                            info.filename,
+                            _zip_mtime_ns(info),
+                            info.file_size,
+                            lambda info=info: _read(archive, info.filename, lambda: zf.read(info)),
+                        )
+            return
+        # "r|*": a forward-only stream with transparent decompression, no seeking
+        with tarfile.open(archive, mode="r|*") as tf:
+            for member in tf:
+                name = member.name[2:] if member.name.startswith("./") else member.name  # `tar -C dir .`
+                if member.isfile() and _wanted(name, prefixes):
+                    yield IndexEntry(
+                        name,
+                        int(member.mtime) * 1_000_000_000,
+                        member.size,
+                        lambda member=member, name=name: _read(archive, name, lambda: tf.extractfile(member).read()),
+                    )
+    except _READ_ERRORS as e:
+        raise ArchiveError(f"Cannot read archive {archive}: {e}") from e
+
+
+def iter_archive_sources(
+    archive: str, prefixes: Iterable[str] = (), only: set[str] | None = None
+) -> Iterator[RuleSource]:
+    """
+    One RuleSource per rule file in archive (see iter_members), with its content
+    loaded; only, if given, restricts the members to those paths. Content stays
+    bytes until the rule is converted, so a member that is not UTF-8 fails as that
+    rule's error.
+    """
+    for entry in iter_members(archive, prefixes):
+        if only is None or entry.path in only:
+            yield RuleSource(member_name(archive, entry.path), entry.read())
+
+
+def index_entries(archive: str, prefixes: Iterable[str] = ()) -> Iterator[IndexEntry]:
+    """iter_members with paths turned into rule index keys (<absolute archive path>!<member>)."""
+    root = os.path.abspath(archive)
+    for entry in iter_members(archive, prefixes):
+        yield entry._replace(path=member_name(root, entry.path))
+
+
+def stale_prefixes(archive: str, prefixes: Iterable[str] = ()) -> list[str]:
+    """Index key prefixes covered by one import, for dropping members that left the archive."""
+    root = member_name(os.path.abspath(archive), "")
+    return [root + prefix for prefix in prefixes] or [root]
@@ -0,0 +1,270 @@
+"""
+Batch execution: fan (rule, SIEM) conversions out to a worker pool.
+
+Results always come back in submission order, so parallel runs print exactly what
+the serial loop would. All SIEMs of one rule go to the same worker, which parses
+the rule once and reuses it for every backend. Only a bounded window of work is
+in flight at a time, which keeps memory flat for large corpora.
+"""
+
+import os
+import time
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from itertools import chain
+from typing import NamedTuple, TypeVar
+
+from .converter import convert_sigma_to_siem
+from .engine import BACKEND_CACHE, PARSED_RULE_CACHE, TIMINGS
+from .result_cache import RESULT_CACHE
+from .siem_backends import SIEM_BACKENDS
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Work submitted per worker ahead of the result being consumed
+WINDOW_PER_WORKER = 4
+
+
+class ConversionUnit(NamedTuple):
+    """
+    One (rule, SIEM) conversion. `error` is set instead of `content` when the rule
+    could not be read. `aliases` lists every requested SIEM name that shares this
+    conversion's backend (see group_siems); empty means just siem_id.
+    """
+
+    rule_path: str
+    siem_id: str | None
+    content: str | None
+    pipeline: str = "sysmon"
+    engine: str | None = None
+    from_file: bool = False
+    use_cache: bool = True
+    error: str | None = None
+    rule_index: int = 0
+    aliases: tuple[str, ...] = ()
+    optimize: bool = False
+
+    def targets(self) -> tuple[str, ...]:
+        """SIEM names this unit's result is reported under."""
+        return self.aliases or (self.siem_id,)
+
+
+def group_siems(siem_ids: Iterable[str], pipeline: str = "sysmon") -> list[tuple[str, ...]]:
+    """
+    Group requested SIEM names by (backend_id, pipeline), in order of first appearance.
+
+    Names in one group (e.g. elasticsearch, elk, wazuh, graylog) produce identical
+    queries, so each group is converted once and the result reported under every name.
+    Unknown names get a group of their own.
+    """
+    groups: dict[tuple[str, str], list[str]] = {}
+    for siem_id in siem_ids:
+        backend = SIEM_BACKENDS.get(siem_id)
+        key = (backend[0] if backend else f"?{siem_id}", pipeline)
+        groups.setdefault(key, []).append(siem_id)
+    return [tuple(group) for group in groups.values()]
+
+
+def default_jobs() -> int:
+    """Number of CPUs available to this process."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _peek_two(items: Iterator[T]) -> list[T]:
+    head = []
+    for item in items:
+        head.append(item)
+        if len(head) == 2:
+            break
+    return head
+
+
+def ordered_map(
+    fn: Callable[[T], R], items: Iterable[T], jobs: int = 1, executor: ProcessPoolExecutor | None = None
+) -> Iterator[R]:
+    """
+    Like map(fn, items), run on up to `jobs` worker processes.
+
+    jobs <= 1, or fewer than two items, runs serially in this process (useful for
+    debugging). fn must be a picklable module-level function. A given executor is
+    used (and left running) instead of a pool for this call only.
+    """
+    items = iter(items)
+    if jobs <= 1:
+        yield from map(fn, items)
+        return
+
+    head = _peek_two(items)
+    if len(head) < 2:
+        yield from map(fn, head)
+        return
+
+    items = chain(head, items)
+    window = jobs * WINDOW_PER_WORKER
+    with _pool(jobs, executor) as pool:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+                # Hand back finished results right away (items may come from a slow stream)
+                while pending and pending[0].done():
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def completed_map(
+    fn: Callable[[T], R], items: Iterable[T], jobs: int = 1, executor: ProcessPoolExecutor | None = None
+) -> Iterator[tuple[T, R]]:
+    """
+    Like ordered_map, but yield (item, fn(item)) in completion order, so one slow
+    item does not hold back the results after it.
+    """
+    items = iter(items)
+    if jobs <= 1:
+        yield from ((item, fn(item)) for item in items)
+        return
+
+    head = _peek_two(items)
+    if len(head) < 2:
+        yield from ((item, fn(item)) for item in head)
+        return
+
+    items = chain(head, items)
+    window = jobs * WINDOW_PER_WORKER
+    with _pool(jobs, executor) as pool:
+        pending = {}
+        try:
+            for item in items:
+                pending[pool.submit(fn, item)] = item
+                if len(pending) >= window:
+                    wait(pending, return_when=FIRST_COMPLETED)
+                for future in [f for f in pending if f.done()]:
+                    yield pending.pop(future), future.result()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _pool(jobs: int, executor: ProcessPoolExecutor | None):
+    """A pool for one map call, or the caller's executor (not shut down afterwards)."""
+    return nullcontext(executor) if executor is not None else ProcessPoolExecutor(max_workers=jobs)
+
+
+def cache_counters() -> Counter:
+    """Snapshot of this process's cache counters and per-stage timings (*_seconds)."""
+    backend = BACKEND_CACHE.info()
+    parsed = PARSED_RULE_CACHE.info()
+    return Counter(
+        TIMINGS,
+        backend_hits=backend.hits,
+        backend_misses=backend.misses,
+        parse_hits=parsed.hits,
+        parse_misses=parsed.misses,
+        result_hits=RESULT_CACHE.hits,
+        result_misses=RESULT_CACHE.misses,
+    )
+
+
+def convert_unit(unit: ConversionUnit) -> tuple[bool, str, Counter]:
+    """
+    Worker entry point: convert one (rule, SIEM) unit and report the cache counters it
+    moved, plus its wall time as counters["convert_seconds"].
+    """
+    if unit.error is not None:
+        return False, unit.error, Counter()
+    before = cache_counters()
+    start = time.perf_counter()
+    ok, text = convert_sigma_to_siem(
+        unit.content,
+        unit.siem_id,
+        pipeline=unit.pipeline,
+        rule_path=unit.rule_path if unit.from_file else None,
+        engine=unit.engine,
+        use_cache=unit.use_cache,
+        optimize=unit.optimize,
+    )
+    counters = cache_counters() - before
+    counters["convert_seconds"] = time.perf_counter() - start
+    return ok, text, counters
+
+
+def convert_rule_units(units: list[ConversionUnit]) -> list[tuple[bool, str, Counter]]:
+    """Worker entry point: convert all units of one rule, so the parsed rule is reused across SIEMs."""
+    return [convert_unit(unit) for unit in units]
+
+
+def group_by_rule(units: Iterable[ConversionUnit]) -> Iterator[list[ConversionUnit]]:
+    """Group consecutive units that share a rule_index."""
+    group: list[ConversionUnit] = []
+    for unit in units:
+        if group and unit.rule_index != group[-1].rule_index:
+            yield group
+            group = []
+        group.append(unit)
+    if group:
+        yield group
+
+
+def zip_units(units, jobs: int, executor: ProcessPoolExecutor | None = None, ordered: bool = True):
+    """
+    Yield (unit, (ok, text, counters)) in unit order, converting on up to `jobs`
+    processes (or the given executor's). With ordered=False rules are yielded as
+    they finish; the units of one rule still come out together.
+    """
+    if not ordered:
+        for group, results in completed_map(convert_rule_units, group_by_rule(units), jobs, executor):
+            yield from zip(group, results)
+        return
+
+    pending = deque()
+
+    def submitted():
+        for group in group_by_rule(units):
+            pending.append(group)
+            yield group
+
+    for results in ordered_map(convert_rule_units, submitted(), jobs, executor):
+        yield from zip(pending.popleft(), results)
+
+
+def fan_out(results, siem_ids: list[str]):
+    """
+    Expand (unit, result) pairs of aliased units (see group_siems) into one pair per
+    requested SIEM, in siem_ids order within each rule. Error units pass through.
+    """
+    rule: list = []
+
+    def flush():
+        by_siem = {}
+        for unit, (ok, text, counters) in rule:
+            for siem_id in unit.targets():
+                # Cache counters belong to the one conversion, not to each name it is reported under
+                by_siem[siem_id] = (unit._replace(siem_id=siem_id, aliases=()), (ok, text, counters))
+                counters = Counter(convert_seconds=counters["convert_seconds"])
+        rule.clear()
+        return [by_siem[siem_id] for siem_id in siem_ids if siem_id in by_siem]
+
+    for unit, result in results:
+        if rule and unit.rule_index != rule[-1][0].rule_index:
+            yield from flush()
+        if unit.error is not None:
+            yield unit, result
+        else:
+            rule.append((unit, result))
+    yield from flush()
@@ -1,15 +1,35 @@
 """
 SigmaForage CLI - Convert Sigma rules to SIEM queries.
+
+Only cheap modules are imported at load time: the conversion machinery (pySigma,
+backends, worker pool, daemon client, certifi) is imported inside the commands
+that use it, so --version, --list-siem and --list-pipelines start fast. Run
+benchmarks/bench_startup.py to check.
 """
 
 import argparse
+import json
+import os
 import sys
+import time
+from collections import Counter
+from itertools import chain, islice
 from pathlib import Path
 
 from . import __version__
-from .converter import convert_sigma_to_siem
+from .defaults import (
+    DEFAULT_DEBOUNCE,
+    DEFAULT_MAX_AGE_DAYS,
+    DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_SIZE_MB,
+    DEFAULT_POLL_INTERVAL,
+    ENGINES,
+    METRICS_FORMATS,
+)
 from .siem_backends import SIEM_BACKENDS, SIEM_DISPLAY_ORDER
 
+OUTPUT_FORMATS = ("text", "ndjson")
+
 # Simple banner shown when the tool launches
 BANNER = r"""
 Sigma Forage
@@ -17,9 +37,159 @@ One Sigma rule. Every SIEM.
 """
 
 
-def print_banner() -> None:
+def print_banner(file=None) -> None:
     """Print Sigma Forage banner when the CLI launches."""
-    print(BANNER)
+    print(BANNER, file=file)
+
+
+def _machine_output(argv: list[str]) -> bool:
+    """True if stdout carries machine-readable records (the banner then goes to stderr)."""
+    return "--format=ndjson" in argv or any(
+        a == "--format" and b == "ndjson" for a, b in zip(argv, argv[1:])
+    )
+
+
+def add_selection_arguments(parser: argparse.ArgumentParser) -> None:
+    """Rule filters resolved from the rule index (see sigmaforge/index.py)."""
+    parser.add_argument(
+        "--tag",
+        dest="tags",
+        action="append",
+        metavar="TAG",
+        help="Only rules with this tag or a sub-technique of it (e.g. attack.t1071). Repeat for any of several.",
+    )
+    parser.add_argument(
+        "--logsource",
+        action="append",
+        metavar="FIELD=VALUE",
+        help="Only rules with this logsource product, category or service (e.g. category=dns). Repeatable.",
+    )
+    parser.add_argument(
+        "--level",
+        metavar="LEVEL",
+        help="Only rules of this level, 'LEVEL+' for that level or higher, or a comma-separated list (e.g. high+).",
+    )
+    parser.add_argument(
+        "--index",
+        metavar="FILE",
+        default=None,
+        help="Rule index used by the filters (default: index.sqlite3 in the cache directory).",
+    )
+
+
+def add_conversion_arguments(parser: argparse.ArgumentParser) -> None:
+    """Target, filter, output and execution options shared by conversions from -i and from archives."""
+    parser.add_argument(
+        "-s", "--siem",
+        dest="siems",
+        action="append",
+        metavar="SIEM",
+        help="Target SIEM platform(s). Repeat for multiple (e.g. -s splunk -s elasticsearch). Use 'all' for all supported.",
+    )
+    parser.add_argument(
+        "-p", "--pipeline",
+        default="sysmon",
+        help="Processing pipeline (default: sysmon). Use --list-pipelines to see options.",
+    )
+    add_selection_arguments(parser)
+    parser.add_argument(
+        "-o", "--output",
+        metavar="FILE",
+        help="Write output to file. By default prints to stdout.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="text",
+        help="Output format: text (query blocks with headers) or ndjson (one JSON record per rule and SIEM, "
+        "streamed as each conversion finishes).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=None,
+        help="Conversion engine: inprocess (pySigma in this process), subprocess (sigma-cli per conversion) "
+        "or auto (in-process with sigma-cli fallback; default, or $SIGMAFORGE_ENGINE).",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        metavar="N",
+        help="Convert (rule, SIEM) pairs on N worker processes (default: number of CPUs). "
+        "Use --jobs 1 for serial, in-process conversion (debugging).",
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Rewrite each query so the SIEM evaluates it more cheaply without changing what it matches: "
+        "merge OR chains into IN/in~/field:(...) sets, drop redundant wildcard alternatives and put "
+        "cheap indexed filters first (Splunk, KQL and Lucene outputs).",
+    )
+    parser.add_argument(
+        "--consolidate",
+        action="store_true",
+        help="Emit one search per logsource instead of one per rule (Splunk and KQL): the rules' queries are "
+        "OR-ed and each matching event is labelled with the rule id and level. Other SIEMs keep one search per rule.",
+    )
+    parser.add_argument(
+        "--lookup-threshold",
+        type=int,
+        metavar="N",
+        help="Move value lists with more than N values into lookup files in --lookup-dir and reference them from "
+        "the query: Splunk lookup CSVs (inputlookup), Sentinel watchlist CSVs (_GetWatchlist) and Elastic "
+        "terms-lookup documents. Identical lists share one file.",
+    )
+    parser.add_argument(
+        "--lookup-dir",
+        default="lookups",
+        metavar="DIR",
+        help="Directory for the files written by --lookup-threshold (default: lookups).",
+    )
+    parser.add_argument(
+        "--backend-cache-size",
+        type=int,
+        metavar="N",
+        help="Max number of warm backend/pipeline objects kept in memory "
+        "(default: 32, or $SIGMAFORGE_BACKEND_CACHE_SIZE).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the on-disk conversion result cache.",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Convert in this process even if a `sigmaforage serve` daemon is running.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print cache statistics and parse vs. backend time to stderr when the run finishes "
+        "(result cache hit rates are always printed for bulk runs).",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print p50/p95/max time per SIEM and stage (read, cache, setup, parse, backend, subprocess, total, write) "
+        "to stderr when the run finishes.",
+    )
+    parser.add_argument(
+        "--metrics-out",
+        metavar="FILE",
+        help="Write per-stage timings and cache counters to FILE: Prometheus text format for *.prom "
+        "(node exporter textfile collector), JSON otherwise.",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=METRICS_FORMATS,
+        help="Format for --metrics-out (default: from the file extension).",
+    )
+    parser.add_argument(
+        "--no-header",
+        action="store_true",
+        help="Do not print SIEM name headers in output (useful when single SIEM).",
+    )
 
 
 def get_parser() -> argparse.ArgumentParser:
@@ -34,9 +204,21 @@ Examples:
   sigmaforage -i sigma-rules/Windows/proc_creation_win_curl_execution.yml -s splunk -s elasticsearch
   sigmaforage -i /path/to/your/sigma_rule.yml -s azure-sentinel -o splunk_query.txt
   sigmaforage -i rule.yml -s all -o queries.txt
+  sigmaforage -i sigma-rules/ -s splunk -o splunk_queries.txt
+  sigmaforage -i 'sigma-rules/**/proc_creation_*.yml' -s kusto
+  sigmaforage -i @rules.txt -s splunk -s elasticsearch
+  sigmaforage -i sigma-rules/ --tag attack.t1071 --logsource category=dns --level high+ -s splunk
   sigmaforage --interactive
   sigmaforage --list-siem
   sigmaforage --list-pipelines
+  sigmaforage serve -s splunk -s elasticsearch
+  sigmaforage watch -i sigma-rules/ -s splunk -s elasticsearch -o out/
+  sigmaforage cache stats
+  sigmaforage cache prune --max-size 100 --max-age 7
+  sigmaforage index build -i sigma-rules/
+  sigmaforage import-archive sigma_all_rules.zip --prefix rules-threat-hunting/ -s splunk -o hunting.txt
+  sigmaforage lint --cost -i sigma-rules/ -s splunk -s kusto --threshold 100
+  sigmaforage hunt -i sigma-rules/Windows --events sysmon.jsonl
   sigmaforage --help
         """,
     )
@@ -48,25 +230,10 @@ Examples:
     parser.add_argument(
         "-i", "--input",
         metavar="PATH",
-        help="Path to Sigma rule file (YAML). Absolute or relative. Use '-' to read from stdin.",
-    )
-    parser.add_argument(
-        "-s", "--siem",
-        dest="siems",
-        action="append",
-        metavar="SIEM",
-        help="Target SIEM platform(s). Repeat for multiple (e.g. -s splunk -s elasticsearch). Use 'all' for all supported.",
-    )
-    parser.add_argument(
-        "-p", "--pipeline",
-        default="sysmon",
-        help="Processing pipeline (default: sysmon). Use --list-pipelines to see options.",
-    )
-    parser.add_argument(
-        "-o", "--output",
-        metavar="FILE",
-        help="Write output to file. By default prints to stdout.",
+        help="Sigma rule file (YAML), directory (recursive), quoted glob (e.g. 'sigma-rules/**/*.yml') "
+        "or @listfile with one path/glob per line. Use '-' to read from stdin.",
     )
+    add_conversion_arguments(parser)
     parser.add_argument(
         "--list-siem",
         action="store_true",
@@ -77,11 +244,6 @@ Examples:
         action="store_true",
         help="List available Sigma processing pipelines and exit.",
     )
-    parser.add_argument(
-        "--no-header",
-        action="store_true",
-        help="Do not print SIEM name headers in output (useful when single SIEM).",
-    )
     parser.add_argument(
         "--interactive",
         action="store_true",
@@ -90,7 +252,36 @@ Examples:
     return parser
 
 
-def list_siem() -> None:
+def drop_missing_backends(siem_ids: list[str], engine: str | None, requested_all: bool) -> tuple[list[str], list[str]]:
+    """
+    Check once, before any conversion is scheduled, which SIEMs have an installed backend.
+    Returns (SIEMs to convert, error lines). SIEMs that only came from "-s all" are
+    dropped with a single note; explicitly requested ones get one error each instead
+    of one failed conversion per rule.
+    """
+    from .discovery import missing_backends
+
+    missing = missing_backends({SIEM_BACKENDS[s][0] for s in siem_ids}, engine)
+    if not missing:
+        return siem_ids, []
+    absent = [s for s in siem_ids if SIEM_BACKENDS[s][0] in missing]
+    errors = []
+    if requested_all:
+        print(f"Skipping {len(absent)} SIEM(s) without an installed backend: {', '.join(absent)}", file=sys.stderr)
+    else:
+        for siem_id in absent:
+            backend_id, pkg = SIEM_BACKENDS[siem_id]
+            errors.append(
+                f"Backend not installed for SIEM {siem_id}: {backend_id}. "
+                f"Install it: sigma plugin install {backend_id} (or: pip install {pkg})"
+            )
+    return [s for s in siem_ids if s not in absent], errors
+
+
+def list_siem(engine: str | None = None) -> None:
+    from .discovery import missing_backends
+
+    missing = missing_backends({backend_id for backend_id, _ in SIEM_BACKENDS.values()}, engine)
     print("Supported SIEM / XDR platforms (use -s <id>):\n")
     seen = set()
     for key in SIEM_DISPLAY_ORDER:
@@ -100,7 +291,8 @@ def list_siem() -> None:
         if key not in SIEM_BACKENDS:
             continue
         backend_id, pkg = SIEM_BACKENDS[key]
-        print(f"  {key:<22} -> backend: {backend_id}")
+        status = "" if missing is None else "  not installed" if backend_id in missing else "  installed"
+        print(f"  {key:<22} -> backend: {backend_id:<16}{status}".rstrip())
     print("\nAliases: elk (elasticsearch), microsoft-sentinel (azure-sentinel), helix (trellix-helix),")
     print("        wazuh/graylog (use elasticsearch backend).")
     print("\nInstall backends: sigma plugin install <backend_id>")
@@ -166,7 +358,88 @@ def prompt_siem_choice() -> list[str]:
     return list(dict.fromkeys(chosen))
 
 
+def _hit_rate(label: str, hits: int, misses: int) -> str:
+    lookups = hits + misses
+    rate = f" ({100 * hits / lookups:.0f}% hit rate)" if lookups else ""
+    return f"{label}: {hits} hit(s), {misses} miss(es){rate}"
+
+
+def print_stats(counters: Counter, backend_cache: bool = True) -> None:
+    """Print cache hit/miss counters and parse/backend time (summed over all workers) to stderr."""
+    if backend_cache:
+        print(_hit_rate("Backend cache", counters["backend_hits"], counters["backend_misses"]), file=sys.stderr)
+        print(
+            f"Rule parsing: {counters['parse_misses']} parse(s) reused {counters['parse_hits']} time(s), "
+            f"{1000 * counters['parse_seconds']:.1f} ms; "
+            f"backend conversion: {1000 * counters['backend_seconds']:.1f} ms",
+            file=sys.stderr,
+        )
+    print(_hit_rate("Result cache", counters["result_hits"], counters["result_misses"]), file=sys.stderr)
+
+
+def ndjson_record(result) -> str:
+    """One --format ndjson line for a session.ConversionResult."""
+    record = {"rule": result.rule, "rule_id": result.rule_id, "siem": result.siem, "ok": result.ok}
+    record["query" if result.ok else "error"] = result.text
+    record["duration_ms"] = round(1000 * result.seconds, 3)
+    return json.dumps(record)
+
+
+class TextOutput:
+    """
+    Text output (to stdout or -o), written as results arrive so memory stays flat on
+    large inputs. The bytes match printing "\n".join(lines).strip() at the end: blank
+    lines are held back until more text follows, and an -o file is only created once
+    there is something to write.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.file = None
+        self.blank_lines = 0
+        self.written = False
+        self.closed = False
+
+    def _open(self):
+        if self.file is None:
+            self.file = open(self.path, "w", encoding="utf-8") if self.path else sys.stdout
+        return self.file
+
+    def add(self, line: str) -> None:
+        if not line.strip():
+            self.blank_lines += self.written
+            return
+        f = self._open()
+        f.write("\n" * (1 + self.blank_lines) + line if self.written else line.lstrip())
+        self.blank_lines = 0
+        self.written = True
+
+    def flush(self) -> None:
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self, create: bool = True) -> bool:
+        """
+        Terminate the output; with nothing written, only create it if asked. Returns
+        whether there is output. Closing again is a no-op.
+        """
+        if self.closed:
+            return self.written
+        self.closed = True
+        if create and not self.written:
+            self.written = True
+            self._open()
+        if self.written:
+            self.file.write("\n")
+            self.file.flush()
+        if self.file is not None and self.file is not sys.stdout:
+            self.file.close()
+        return self.written
+
+
 def run_convert(args: argparse.Namespace) -> int:
+    from .rules import RuleSource, is_bulk_input, iter_stream_sources
+
     sigma_content = None
     siem_ids_from_interactive = None
 
@@ -188,14 +461,61 @@ def run_convert(args: argparse.Namespace) -> int:
         print("Error: -i/--input is required (or use --list-siem / --list-pipelines).", file=sys.stderr)
         return 2
 
+    bulk = args.input != "-" and is_bulk_input(args.input)
     if args.input == "-":
-        sigma_content = sigma_content if sigma_content is not None else sys.stdin.read()
+        if args.tags or args.logsource or args.level:
+            print("Error: --tag/--logsource/--level need a file, directory, glob or @listfile input.", file=sys.stderr)
+            return 2
+        # A stream of ---separated rules, converted as each one arrives
+        lines = sigma_content.splitlines(keepends=True) if sigma_content is not None else sys.stdin
+        sources = iter_stream_sources(lines)
+        head = list(islice(sources, 2))
+        if len(head) > 1:
+            bulk = True
+            sources = chain(head, sources)
+        else:
+            sources = iter([RuleSource("-", head[0].content if head else "")])
     else:
-        path = Path(args.input)
-        if not path.exists():
-            print(f"Error: File not found: {path}", file=sys.stderr)
+        try:
+            sources = file_sources(args)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
             return 2
-        sigma_content = path.read_text(encoding="utf-8")
+
+    return convert_sources(args, sources, bulk)
+
+
+def file_sources(args: argparse.Namespace):
+    """
+    RuleSources for a file, directory, glob or @listfile -i, narrowed down by
+    --tag/--logsource/--level. Raises ValueError (with the message to print) for a
+    missing input, invalid filters or an empty selection.
+    """
+    from .rules import RuleSource, is_bulk_input, iter_rule_sources
+
+    if args.input.startswith("@") and not Path(args.input[1:]).is_file():
+        raise ValueError(f"List file not found: {args.input[1:]}")
+    if not is_bulk_input(args.input) and not Path(args.input).exists():
+        raise ValueError(f"File not found: {Path(args.input)}")
+    if args.tags or args.logsource or args.level:
+        selected = select_rule_paths(args)
+        if not selected:
+            raise ValueError(f"No rules under {args.input} match the selection.")
+        return (RuleSource(str(path)) for path in selected)
+    if is_bulk_input(args.input):
+        return iter_rule_sources(args.input)
+    return iter([RuleSource(str(Path(args.input)))])
+
+
+def convert_sources(args: argparse.Namespace, sources, bulk: bool) -> int:
+    """
+    Convert rule sources to every requested SIEM and write the results (text or
+    ndjson, to stdout or -o) as they arrive. args carries the conversion options
+    (see add_conversion_arguments) and args.input names the input in messages.
+    """
+    from .batch import default_jobs
+    from .daemon import DaemonError, find_daemon
+    from .session import Converter
 
     if not args.siems:
         if getattr(args, "interactive", False):
@@ -215,49 +535,898 @@ def run_convert(args: argparse.Namespace) -> int:
     else:
         siem_ids = list(dict.fromkeys(s.lower() for s in args.siems))
 
-    out_lines = []
-    errors = []
-    for siem_id in siem_ids:
-        if siem_id not in SIEM_BACKENDS:
-            errors.append(f"Unknown SIEM: {siem_id}")
-            continue
-        ok, text = convert_sigma_to_siem(
-            sigma_content,
-            siem_id,
-            pipeline=args.pipeline,
-            rule_path=args.input if args.input != "-" else None,
-        )
-        if not ok:
-            errors.append(f"{siem_id}: {text}")
-            continue
-        if not args.no_header:
-            out_lines.append(f"# --- {siem_id.upper()} ---")
-        out_lines.append(text)
-        out_lines.append("")
+    jobs = args.jobs if args.jobs is not None else default_jobs()
+    if jobs < 1:
+        print("Error: --jobs must be at least 1.", file=sys.stderr)
+        return 2
 
-    if errors:
-        for e in errors:
+    errors = [f"Unknown SIEM: {siem_id}" for siem_id in siem_ids if siem_id not in SIEM_BACKENDS]
+    siem_ids = [siem_id for siem_id in siem_ids if siem_id in SIEM_BACKENDS]
+    siem_ids, missing = drop_missing_backends(siem_ids, args.engine, "all" in args.siems)
+    errors += missing
+    if not siem_ids:
+        # Nothing can be converted: fail before reading any rule
+        for e in errors or ["Error: No installed backend for any SIEM. See --list-siem."]:
             print(e, file=sys.stderr)
-        if not out_lines:
-            return 1
+        return 1
+    lookups = None
+    if args.lookup_threshold is not None:
+        from .lookups import LookupWriter
 
-    output = "\n".join(out_lines).strip()
-    if args.output:
-        Path(args.output).write_text(output + "\n", encoding="utf-8")
-        print(f"Wrote {len(siem_ids)} conversion(s) to {args.output}.", file=sys.stderr)
+        try:
+            lookups = LookupWriter(args.lookup_dir, args.lookup_threshold)
+        except ValueError as e:
+            print(f"Error: {e}.", file=sys.stderr)
+            return 2
+    if args.consolidate:
+        return convert_consolidated(args, sources, siem_ids, jobs, errors, bulk, lookups)
+    rules_seen = 0
+    converted = 0
+    failed = 0
+    # Output is written as results arrive, nothing is accumulated
+    text_output = None
+    stream = None
+    if args.format == "text":
+        text_output = TextOutput(args.output)
     else:
-        print(output)
+        try:
+            stream = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        except OSError as e:
+            print(f"Error: Cannot write {args.output}: {e}", file=sys.stderr)
+            return 2
+    # Per-stage timings are only collected when asked for
+    timings = stage_timings(args)
+    converter = Converter(
+        pipeline=args.pipeline,
+        engine=args.engine,
+        jobs=jobs,
+        use_cache=not args.no_cache,
+        optimize=args.optimize,
+        backend_cache_size=args.backend_cache_size,
+        daemon=None if args.no_daemon else find_daemon(),
+        timings=timings,
+    )
+    client = converter.daemon
+    try:
+        for result in converter.convert_many(sources, siem_ids):
+            if lookups is not None and result.ok:
+                result = result._replace(text=lookups.rewrite(result.text, SIEM_BACKENDS[result.siem][0]))
+            # In bulk mode every message is prefixed with the rule path so errors stay per-rule
+            prefix = f"{result.rule}: " if bulk else ""
+            if result.rule_index == rules_seen:
+                rules_seen += 1
+                if bulk and not args.no_header and result.siem is not None and stream is None:
+                    text_output.add(f"# === {result.rule} ===")
+            if stream is not None:
+                start = time.perf_counter()
+                stream.write(ndjson_record(result) + "\n")
+                stream.flush()
+                if timings is not None:
+                    timings.record("*", "write", time.perf_counter() - start)
+                converted += result.ok
+                failed += not result.ok
+                continue
+            if result.siem is None:
+                errors.append(f"{prefix}{result.text}")
+                continue
+            if not result.ok:
+                errors.append(f"{prefix}{result.siem}: {result.text}")
+                continue
+            converted += 1
+            start = time.perf_counter()
+            if not args.no_header:
+                text_output.add(f"# --- {result.siem.upper()} ---")
+            text_output.add(result.text)
+            text_output.add("")
+            text_output.flush()
+            if timings is not None:
+                timings.record("*", "write", time.perf_counter() - start)
+        if text_output is not None:
+            # Error-only runs, and inputs without any rule, print nothing
+            written = text_output.close(create=not errors and (rules_seen > 0 or not bulk))
+    except DaemonError as e:
+        print(f"Error: {e}. Rerun with --no-daemon to convert locally.", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`): stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        converter.close()
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+        if text_output is not None:
+            text_output.close(create=False)
+    counters = converter.counters
+
+    if bulk and rules_seen == 0:
+        print(f"Error: No Sigma rules found for input: {args.input}", file=sys.stderr)
+        return 2
+
+    if client:
+        if args.stats:
+            print(f"Conversions served by daemon at {client.address}.", file=sys.stderr)
+    elif args.stats:
+        print_stats(counters)
+    elif bulk and not args.no_cache:
+        print_stats(counters, backend_cache=False)
+
+    for e in errors:
+        print(e, file=sys.stderr)
+    if stream is not None:
+        if args.output:
+            print(f"Wrote {converted + failed} record(s) ({failed} failed) to {args.output}.", file=sys.stderr)
+        code = 0 if not (errors or failed) else 1
+    else:
+        if args.output and written:
+            print(f"Wrote {converted} conversion(s) to {args.output}.", file=sys.stderr)
+        code = 0 if not errors else 1
+    if lookups is not None and lookups.written:
+        print(f"Wrote {len(lookups.written)} lookup file(s) to {args.lookup_dir}.", file=sys.stderr)
+
+    if timings is not None and not report_timings(args, timings, counters):
+        return 1
+    return code
+
 
+def stage_timings(args: argparse.Namespace):
+    """A metrics.StageTimings when --timings or --metrics-out asks for one, else None."""
+    if not (args.timings or args.metrics_out):
+        return None
+    from .metrics import StageTimings
+
+    return StageTimings()
+
+
+def report_timings(args: argparse.Namespace, timings, counters) -> bool:
+    """Print (--timings) and write (--metrics-out) the collected timings; False if writing failed."""
+    if args.timings:
+        print(timings.format_table(), file=sys.stderr)
+    if args.metrics_out:
+        try:
+            timings.write(args.metrics_out, args.metrics_format, counters)
+        except OSError as e:
+            print(f"Error: Cannot write metrics to {args.metrics_out}: {e}", file=sys.stderr)
+            return False
+    return True
+
+
+def convert_consolidated(
+    args: argparse.Namespace, sources, siem_ids: list[str], jobs: int, errors: list[str], bulk: bool, lookups=None
+) -> int:
+    """
+    --consolidate: convert every rule, then write one search per (logsource, SIEM)
+    group (see consolidate.py) instead of one per rule. Unlike plain conversion this
+    needs all results before writing anything. Queries referencing lookups
+    (--lookup-threshold) contain pipes and stay separate searches.
+    """
+    from .consolidate import RuleQuery, consolidate, describe_group, group_key
+    from .daemon import DaemonError, find_daemon
+    from .index import rule_metadata
+    from .rules import RuleSource
+    from .session import Converter
+
+    loaded = []
+    keys = []
+    for source in sources:
+        try:
+            content = source.read()
+        except (OSError, UnicodeDecodeError):
+            loaded.append(source)  # reported by the converter
+            keys.append(None)
+            continue
+        try:
+            metadata = rule_metadata(content)
+        except Exception:  # unparsable YAML fails to convert anyway
+            metadata = None
+        loaded.append(RuleSource(source.path, content))
+        keys.append(metadata)
+    if bulk and not loaded:
+        print(f"Error: No Sigma rules found for input: {args.input}", file=sys.stderr)
+        return 2
+
+    # {logsource: {siem: [RuleQuery]}}, in order of first appearance
+    groups: dict = {}
+    timings = stage_timings(args)
+    converter = Converter(
+        pipeline=args.pipeline,
+        engine=args.engine,
+        jobs=jobs,
+        use_cache=not args.no_cache,
+        optimize=args.optimize,
+        backend_cache_size=args.backend_cache_size,
+        daemon=None if args.no_daemon else find_daemon(),
+        timings=timings,
+    )
+    try:
+        with converter:
+            for result in converter.convert_many(loaded, siem_ids):
+                if not result.ok:
+                    siem = f"{result.siem}: " if result.siem else ""
+                    errors.append(f"{result.rule}: {siem}{result.text}")
+                    continue
+                metadata = keys[result.rule_index] or {}
+                label = result.rule_id or metadata.get("title") or Path(result.rule).stem
+                text = result.text
+                if lookups is not None:
+                    text = lookups.rewrite(text, SIEM_BACKENDS[result.siem][0])
+                rule = RuleQuery(result.rule, label, metadata.get("level"), text)
+                groups.setdefault(group_key(metadata), {}).setdefault(result.siem, []).append(rule)
+    except DaemonError as e:
+        print(f"Error: {e}. Rerun with --no-daemon to convert locally.", file=sys.stderr)
+        return 1
+
+    searches = 0
+    start = time.perf_counter()
+    try:
+        text_output = TextOutput(args.output) if args.format == "text" else None
+        stream = None if text_output else open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    except OSError as e:
+        print(f"Error: Cannot write {args.output}: {e}", file=sys.stderr)
+        return 2
+    try:
+        for key, by_siem in groups.items():
+            for siem_id, rules in by_siem.items():
+                combined, separate = consolidate(SIEM_BACKENDS[siem_id][0], rules)
+                blocks = [(c.query, c.rules, True) for c in combined] + [(r.query, [r], False) for r in separate]
+                for query, members, is_combined in blocks:
+                    searches += 1
+                    if stream is not None:
+                        record = {
+                            "logsource": dict(key),
+                            "pipeline": args.pipeline,
+                            "siem": siem_id,
+                            "consolidated": is_combined,
+                            "rules": [{"rule": r.rule, "rule_id": r.label, "level": r.level} for r in members],
+                            "query": query,
+                        }
+                        stream.write(json.dumps(record) + "\n")
+                        continue
+                    if not args.no_header:
+                        kind = f"{len(members)} rule(s)" if is_combined else "separate search"
+                        text_output.add(f"# === {describe_group(key)}, pipeline {args.pipeline} ({kind}) ===")
+                        text_output.add("\n".join(f"#   {r.label} [{r.level or '-'}] {r.rule}" for r in members))
+                        text_output.add(f"# --- {siem_id.upper()} ---")
+                    text_output.add(query)
+                    text_output.add("")
+    finally:
+        if text_output is not None:
+            text_output.close(create=not errors)
+        elif stream is not sys.stdout:
+            stream.close()
+    if timings is not None:
+        timings.record("*", "write", time.perf_counter() - start)
+
+    for e in errors:
+        print(e, file=sys.stderr)
+    if args.output and searches:
+        print(f"Wrote {searches} search(es) for {len(loaded)} rule(s) to {args.output}.", file=sys.stderr)
+    if lookups is not None and lookups.written:
+        print(f"Wrote {len(lookups.written)} lookup file(s) to {args.lookup_dir}.", file=sys.stderr)
+    if timings is not None and not report_timings(args, timings, converter.counters):
+        return 1
     return 0 if not errors else 1
 
 
-def main() -> int:
-    print_banner()
+def rule_selection(args: argparse.Namespace):
+    """The index.RuleSelection for --tag/--logsource/--level; ValueError for invalid values."""
+    from .index import RuleSelection, parse_level, parse_logsource
+
+    return RuleSelection(
+        tags=tuple(tag.lower() for tag in args.tags or ()),
+        logsource=tuple(parse_logsource(spec) for spec in args.logsource or ()),
+        levels=parse_level(args.level) if args.level else (),
+    )
+
+
+def select_rule_paths(args: argparse.Namespace) -> list[Path]:
+    """
+    Rule files under -i matching --tag/--logsource/--level, in input order. The index
+    is refreshed first, which only opens files that changed since the last update.
+    """
+    from .index import RuleIndex
+    from .rules import iter_rule_paths
+
+    selection = rule_selection(args)
+    paths = list(iter_rule_paths(args.input))
+    roots = [Path(args.input)] if Path(args.input).is_dir() else []
+    with RuleIndex(args.index) as index:
+        index.update(paths, roots)
+        selected = {row["path"] for row in index.select(selection, paths)}
+    return [path for path in paths if os.path.abspath(path) in selected]
+
+
+def get_index_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sigmaforage index",
+        description="Maintain the SQLite rule index used by --tag, --logsource and --level.",
+    )
+    sub = parser.add_subparsers(dest="action", required=True)
+    build = sub.add_parser(
+        "build",
+        help="Index rule metadata; only new or changed files are read, removed files are dropped.",
+    )
+    build.add_argument(
+        "-i", "--input",
+        dest="inputs",
+        action="append",
+        required=True,
+        metavar="PATH",
+        help="Rule file, directory, quoted glob or @listfile to index. Repeatable.",
+    )
+    build.add_argument("--index", metavar="FILE", default=None, help="Index file (default: index.sqlite3 in the cache directory).")
+    list_ = sub.add_parser("list", help="List the indexed rules under -i that match the filters.")
+    list_.add_argument("-i", "--input", required=True, metavar="PATH", help="Rule file, directory, quoted glob or @listfile.")
+    add_selection_arguments(list_)
+    return parser
+
+
+def run_index(argv: list[str]) -> int:
+    from .index import IndexStats, RuleIndex
+    from .rules import iter_rule_paths
+
+    args = get_index_parser().parse_args(argv)
+    if args.action == "list":
+        try:
+            selected = select_rule_paths(args)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        for path in selected:
+            print(path)
+        print(f"{len(selected)} rule(s) selected.", file=sys.stderr)
+        return 0
+
+    start = time.perf_counter()
+    with RuleIndex(args.index) as index:
+        total = IndexStats(0, 0, 0, 0, 0)
+        for spec in args.inputs:
+            stats = index.update(iter_rule_paths(spec), [Path(spec)] if Path(spec).is_dir() else [])
+            total = IndexStats(*(a + b for a, b in zip(total, stats)))
+        count = index.count()
+        path = index.path
+    print(
+        f"Indexed {count} rule(s) in {path}: {total.added} added, {total.updated} updated, "
+        f"{total.removed} removed, {total.unchanged} unchanged ({time.perf_counter() - start:.2f} s).",
+        file=sys.stderr,
+    )
+    if total.errors:
+        print(f"{total.errors} file(s) could not be parsed and will not be selected.", file=sys.stderr)
+    return 0
+
+
+def get_import_archive_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sigmaforage import-archive",
+        description="Convert or index the rules in a rule archive (zip, tar, tar.gz/tgz, tar.bz2, tar.xz), "
+        "e.g. a SigmaHQ release, reading them straight out of the archive without unpacking it. "
+        "With -s the rules are converted; without, they are added to the rule index.",
+    )
+    parser.add_argument("archive", metavar="ARCHIVE", help="Archive file.")
+    parser.add_argument(
+        "--prefix",
+        dest="prefixes",
+        action="append",
+        metavar="PATH",
+        help="Only rules under this path inside the archive (e.g. rules-threat-hunting/). Repeatable.",
+    )
+    add_conversion_arguments(parser)
+    return parser
+
+
+def run_import_archive(argv: list[str]) -> int:
+    from .archive import ArchiveError, index_entries, iter_archive_sources, member_name, stale_prefixes
+    from .index import RuleIndex
+
+    args = get_import_archive_parser().parse_args(argv)
+    args.input = args.archive
+    if not Path(args.archive).is_file():
+        print(f"Error: Archive not found: {args.archive}", file=sys.stderr)
+        return 2
+    prefixes = args.prefixes or ()
+    try:
+        selection = rule_selection(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        only = None
+        if selection or not args.siems:
+            # The filters are answered by the index, so the archive is indexed first
+            start = time.perf_counter()
+            covered = tuple(stale_prefixes(args.archive, prefixes))
+            with RuleIndex(args.index) as index:
+                stats = index.update_entries(index_entries(args.archive, prefixes), covered)
+                if selection:
+                    root = member_name(os.path.abspath(args.archive), "")
+                    only = {row["path"][len(root):] for row in index.select(selection) if row["path"].startswith(covered)}
+                path = index.path
+            if not args.siems:
+                print(
+                    f"Indexed {stats.added + stats.updated + stats.unchanged} rule(s) from {args.archive} in {path}: "
+                    f"{stats.added} added, {stats.updated} updated, {stats.removed} removed, "
+                    f"{stats.unchanged} unchanged ({time.perf_counter() - start:.2f} s).",
+                    file=sys.stderr,
+                )
+                if stats.errors:
+                    print(f"{stats.errors} file(s) could not be parsed and will not be selected.", file=sys.stderr)
+                for member in sorted(only or ()):
+                    print(member)
+                return 0
+            if not only:
+                print(f"Error: No rules in {args.archive} match the selection.", file=sys.stderr)
+                return 2
+        return convert_sources(args, iter_archive_sources(args.archive, prefixes, only), bulk=True)
+    except ArchiveError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def get_cache_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sigmaforage cache",
+        description="Inspect or prune the on-disk conversion result cache "
+        "($SIGMAFORGE_CACHE_DIR, default ~/.cache/sigmaforage).",
+    )
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("stats", help="Show cache location, entry count and size.")
+    prune = sub.add_parser("prune", help="Evict old entries, then least recently used ones over the size limit.")
+    prune.add_argument(
+        "--max-size",
+        type=float,
+        default=DEFAULT_MAX_SIZE_MB,
+        metavar="MB",
+        help=f"Keep the cache at most this many megabytes (default: {DEFAULT_MAX_SIZE_MB}).",
+    )
+    prune.add_argument(
+        "--max-age",
+        type=float,
+        default=DEFAULT_MAX_AGE_DAYS,
+        metavar="DAYS",
+        help=f"Evict entries not used for this many days (default: {DEFAULT_MAX_AGE_DAYS}).",
+    )
+    sub.add_parser("clear", help="Delete every cache entry.")
+    return parser
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1000:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} GB"
+
+
+def run_cache(argv: list[str]) -> int:
+    from datetime import datetime
+
+    from .result_cache import RESULT_CACHE
+
+    args = get_cache_parser().parse_args(argv)
+    if args.action == "stats":
+        stats = RESULT_CACHE.stats()
+        print(f"Directory: {stats.directory}")
+        print(f"Entries:   {stats.entries}")
+        print(f"Size:      {_format_bytes(stats.total_bytes)}")
+        if stats.entries:
+            print(f"Oldest:    {datetime.fromtimestamp(stats.oldest):%Y-%m-%d %H:%M:%S}")
+            print(f"Newest:    {datetime.fromtimestamp(stats.newest):%Y-%m-%d %H:%M:%S}")
+        return 0
+    if args.action == "prune":
+        removed, freed = RESULT_CACHE.prune(max_bytes=int(args.max_size * 1_000_000), max_age_days=args.max_age)
+    else:
+        removed, freed = RESULT_CACHE.clear()
+    print(f"Removed {removed} entr{'y' if removed == 1 else 'ies'} ({_format_bytes(freed)}).")
+    return 0
+
+
+def get_serve_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sigmaforage serve",
+        description="Run a conversion daemon that keeps backends and pipelines warm. "
+        "Other sigmaforage invocations use it automatically while it runs.",
+    )
+    parser.add_argument(
+        "--address",
+        default=None,
+        help="Unix socket path or localhost HOST:PORT (default: $SIGMAFORGE_DAEMON, "
+        "else $XDG_RUNTIME_DIR/sigmaforage.sock or ~/.cache/sigmaforage/daemon.sock).",
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT,
+        metavar="N",
+        help=f"Conversion requests served at once; others wait (default: {DEFAULT_MAX_CONCURRENT}).",
+    )
+    parser.add_argument(
+        "-s", "--siem",
+        dest="siems",
+        action="append",
+        metavar="SIEM",
+        help="Preload the backend for SIEM at startup. Repeat for multiple.",
+    )
+    parser.add_argument("-p", "--pipeline", default="sysmon", help="Pipeline to preload (default: sysmon).")
+    parser.add_argument("--backend-cache-size", type=int, metavar="N", help="Max warm backend/pipeline objects.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request to stderr.")
+    parser.add_argument("--status", action="store_true", help="Show whether a daemon is running, then exit.")
+    parser.add_argument("--stop", action="store_true", help="Ask a running daemon to shut down gracefully, then exit.")
+    return parser
+
+
+def run_serve(argv: list[str]) -> int:
+    from .daemon import DaemonClient, DaemonError, default_address, serve
+    from .engine import BACKEND_CACHE
+
+    args = get_serve_parser().parse_args(argv)
+    address = args.address or default_address()
+    if args.status or args.stop:
+        client = DaemonClient(address)
+        try:
+            health = client.health()
+            if args.stop:
+                client.shutdown()
+        except DaemonError:
+            print(f"No daemon running at {address}.", file=sys.stderr)
+            return 1
+        finally:
+            client.close()
+        if args.stop:
+            print(f"Stopping daemon (pid {health['pid']}) at {address}.")
+        else:
+            stats = health.get("stats", {})
+            print(f"Daemon {health['version']} (pid {health['pid']}) listening at {address}")
+            print(f"Conversions: {stats.get('conversions', 0)}")
+            print(_hit_rate("Backend cache", stats.get("backend_hits", 0), stats.get("backend_misses", 0)))
+            print(_hit_rate("Result cache", stats.get("result_hits", 0), stats.get("result_misses", 0)))
+        return 0
+
+    if args.max_concurrent < 1:
+        print("Error: --max-concurrent must be at least 1.", file=sys.stderr)
+        return 2
+    if args.backend_cache_size is not None:
+        BACKEND_CACHE.resize(args.backend_cache_size)
+    try:
+        return serve(address, args.max_concurrent, args.siems, args.pipeline, verbose=args.verbose)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+
+def get_watch_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sigmaforage watch",
+        description="Watch a rule directory and reconvert only changed rules into per-rule output files "
+        "(<output>/<rule dir>/<rule stem>.<siem>.txt).",
+    )
+    parser.add_argument("-i", "--input", required=True, metavar="DIR", help="Directory of Sigma rules to watch.")
+    parser.add_argument(
+        "-s", "--siem",
+        dest="siems",
+        action="append",
+        required=True,
+        metavar="SIEM",
+        help="Target SIEM platform(s). Repeat for multiple. Use 'all' for all supported.",
+    )
+    parser.add_argument("-o", "--output", required=True, metavar="DIR", help="Directory for converted queries.")
+    parser.add_argument("-p", "--pipeline", default="sysmon", help="Processing pipeline(s), comma-separated (default: sysmon).")
+    parser.add_argument("--engine", choices=ENGINES, default=None, help="Conversion engine (default: auto).")
+    parser.add_argument("-j", "--jobs", type=int, metavar="N", help="Worker processes for rebuilds (default: number of CPUs).")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the on-disk result cache.")
+    parser.add_argument("--optimize", action="store_true", help="Optimize the queries (see convert --optimize).")
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        metavar="SECONDS",
+        help=f"Wait for this much quiet after a change before converting (default: {DEFAULT_DEBOUNCE}).",
+    )
+    parser.add_argument("--poll", action="store_true", help="Poll for changes instead of using inotify.")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        metavar="SECONDS",
+        help=f"Polling interval (default: {DEFAULT_POLL_INTERVAL}).",
+    )
+    parser.add_argument("--once", action="store_true", help="Bring outputs up to date once and exit (no watching).")
+    return parser
+
+
+def run_watch(argv: list[str]) -> int:
+    from .batch import default_jobs
+    from .watch import RuleWatcher
+
+    args = get_watch_parser().parse_args(argv)
+    if not Path(args.input).is_dir():
+        print(f"Error: Not a directory: {args.input}", file=sys.stderr)
+        return 2
+    if "all" in args.siems:
+        siem_ids = list(dict.fromkeys(SIEM_DISPLAY_ORDER))
+    else:
+        siem_ids = list(dict.fromkeys(s.lower() for s in args.siems))
+    unknown = [s for s in siem_ids if s not in SIEM_BACKENDS]
+    if unknown:
+        print(f"Error: Unknown SIEM: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    siem_ids, missing = drop_missing_backends(siem_ids, args.engine, "all" in args.siems)
+    if missing or not siem_ids:
+        for e in missing or ["Error: No installed backend for any SIEM. See --list-siem."]:
+            print(e, file=sys.stderr)
+        return 2
+
+    watcher = RuleWatcher(
+        args.input,
+        args.output,
+        siem_ids,
+        pipeline=args.pipeline,
+        engine=args.engine,
+        jobs=args.jobs if args.jobs is not None else default_jobs(),
+        use_cache=not args.no_cache,
+        optimize=args.optimize,
+    )
+    try:
+        if args.once:
+            watcher.load_state()
+            converted, removed, failed = watcher.sync()
+            print(f"{converted} converted, {removed} removed, {failed} failed.", file=sys.stderr)
+            return 0 if not failed else 1
+        print(f"Watching {args.input} -> {args.output} (Ctrl+C to stop)", file=sys.stderr)
+        try:
+            watcher.watch(debounce=args.debounce, poll=args.poll, poll_interval=args.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    finally:
+        watcher.close()
+
+
+def get_lint_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sigmaforage lint",
+        description="Convert rules and report queries that will be expensive to run, most expensive first.",
+    )
+    parser.add_argument(
+        "--cost",
+        action="store_true",
+        help="Score each query for leading wildcards, unanchored regexes, unindexed fields, large OR fan-out "
+        "and missing index/sourcetype/table scoping (the default, and currently only, check).",
+    )
+    parser.add_argument("-i", "--input", required=True, metavar="PATH", help="Rule file, directory, quoted glob or @listfile.")
+    parser.add_argument(
+        "-s", "--siem",
+        dest="siems",
+        action="append",
+        required=True,
+        metavar="SIEM",
+        help="Target SIEM platform(s). Repeat for multiple. Use 'all' for all supported.",
+    )
+    parser.add_argument("-p", "--pipeline", default="sysmon", help="Processing pipeline(s), comma-separated (default: sysmon).")
+    add_selection_arguments(parser)
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        metavar="SCORE",
+        help="Exit with status 1 if any query scores above SCORE (for CI).",
+    )
+    parser.add_argument("--top", type=int, metavar="N", help="Only list the N most expensive queries.")
+    parser.add_argument(
+        "--indexed-field",
+        dest="indexed_fields",
+        action="append",
+        metavar="FIELD",
+        help="Treat FIELD as indexed; repeat for several. Replaces the default (Splunk: index, sourcetype, "
+        "source, host) and enables the unindexed-field check for other SIEMs.",
+    )
+    parser.add_argument("--optimize", action="store_true", help="Score the queries as --optimize writes them.")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Report format (default: text).")
+    parser.add_argument("--engine", choices=ENGINES, default=None, help="Conversion engine (default: auto).")
+    parser.add_argument("-j", "--jobs", type=int, metavar="N", help="Worker processes (default: number of CPUs).")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the on-disk result cache.")
+    parser.add_argument("--no-daemon", action="store_true", help="Convert in this process even if a daemon is running.")
+    return parser
+
+
+def run_lint(argv: list[str]) -> int:
+    from .batch import default_jobs
+    from .cost import format_finding, query_cost
+    from .daemon import find_daemon
+    from .session import Converter
+
+    args = get_lint_parser().parse_args(argv)
+    if "all" in args.siems:
+        siem_ids = list(dict.fromkeys(SIEM_DISPLAY_ORDER))
+    else:
+        siem_ids = list(dict.fromkeys(s.lower() for s in args.siems))
+    unknown = [s for s in siem_ids if s not in SIEM_BACKENDS]
+    if unknown:
+        print(f"Error: Unknown SIEM: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    jobs = args.jobs if args.jobs is not None else default_jobs()
+    if jobs < 1:
+        print("Error: --jobs must be at least 1.", file=sys.stderr)
+        return 2
+    try:
+        sources = file_sources(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    siem_ids, missing = drop_missing_backends(siem_ids, args.engine, "all" in args.siems)
+    if missing or not siem_ids:
+        for e in missing or ["Error: No installed backend for any SIEM. See --list-siem."]:
+            print(e, file=sys.stderr)
+        return 2
+
+    costs = []
+    failed = 0
+    converter = Converter(
+        pipeline=args.pipeline,
+        engine=args.engine,
+        jobs=jobs,
+        use_cache=not args.no_cache,
+        optimize=args.optimize,
+        daemon=None if args.no_daemon else find_daemon(),
+    )
+    with converter:
+        for result in converter.convert_many(sources, siem_ids):
+            if not result.ok:
+                failed += 1
+                siem = f"{result.siem}: " if result.siem else ""
+                print(f"{result.rule}: {siem}{result.error}", file=sys.stderr)
+                continue
+            backend_id = SIEM_BACKENDS[result.siem][0]
+            costs.append(query_cost(result.rule, result.siem, result.text, backend_id, args.indexed_fields))
+
+    costs.sort(key=lambda c: (-c.score, c.rule, c.siem))
+    over = [c for c in costs if args.threshold is not None and c.score > args.threshold]
+    shown = costs[: args.top] if args.top is not None else costs
+    if args.format == "ndjson":
+        for c in shown:
+            record = {
+                "rule": c.rule,
+                "siem": c.siem,
+                "score": c.score,
+                "findings": [f._asdict() for f in c.findings],
+            }
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    elif shown:
+        width = max(len(c.siem) for c in shown)
+        print(f"{'SCORE':>5}  {'SIEM':<{width}}  RULE")
+        for c in shown:
+            print(f"{c.score:>5}  {c.siem:<{width}}  {c.rule}")
+            for finding in c.findings:
+                print(f"{'':>5}  {'':<{width}}    {format_finding(finding)}")
+
+    summary = f"{len(costs)} quer{'y' if len(costs) == 1 else 'ies'} scored"
+    if costs:
+        summary += f", highest {costs[0].score}"
+    if args.threshold is not None:
+        summary += f"; {len(over)} above the threshold of {args.threshold}"
+    if failed:
+        summary += f"; {failed} conversion(s) failed"
+    print(summary + ".", file=sys.stderr)
+    return 1 if over or failed else 0
+
+
+def get_hunt_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sigmaforage hunt",
+        description="Run rules over exported events (JSONL or a JSON array, e.g. evtx_dump -o jsonl) without a SIEM "
+        "and report the hits per rule. Field names are matched as they appear in the events; no pipeline is applied.",
+    )
+    parser.add_argument("-i", "--input", required=True, metavar="PATH", help="Rule file, directory, quoted glob or @listfile.")
+    parser.add_argument(
+        "--events",
+        action="append",
+        required=True,
+        metavar="FILE",
+        help="Event file (JSON object per line, or one JSON array); '-' reads stdin. Repeat for several.",
+    )
+    add_selection_arguments(parser)
+    parser.add_argument(
+        "--max-events",
+        type=int,
+        default=5,
+        metavar="N",
+        help="Matched events listed per rule (default: 5; 0 for counts only).",
+    )
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text", help="Report format (default: text).")
+    return parser
+
+
+def run_hunt(argv: list[str]) -> int:
+    from .hunt import Hunter, RuleError, compile_rule, iter_events
+
+    args = get_hunt_parser().parse_args(argv)
+    try:
+        sources = file_sources(args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    rules = []
+    failed = 0
+    for source in sources:
+        try:
+            rules.append(compile_rule(source.read(), source.path))
+        except (OSError, UnicodeDecodeError, RuleError) as e:
+            failed += 1
+            print(f"{source.path}: {e}", file=sys.stderr)
+    if not rules:
+        print(f"Error: No rule under {args.input} can be evaluated.", file=sys.stderr)
+        return 2
+
+    hunter = Hunter(rules)
+    hits = [0] * len(rules)
+    shown: list[list] = [[] for _ in rules]
+    invalid: list[str] = []
+    start = time.perf_counter()
+    try:
+        for path in args.events:
+            for match in hunter.hunt(iter_events(path, invalid)):
+                hits[match.rule] += 1
+                if len(shown[match.rule]) < args.max_events:
+                    shown[match.rule].append(match)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    seconds = time.perf_counter() - start
+
+    ranked = sorted((i for i in range(len(rules)) if hits[i]), key=lambda i: (-hits[i], rules[i].path))
+    if args.format == "ndjson":
+        for i in ranked:
+            record = {
+                "rule": rules[i].path,
+                "rule_id": rules[i].rule_id,
+                "title": rules[i].title,
+                "level": rules[i].level,
+                "hits": hits[i],
+                "events": [{"source": m.source, "line": m.line, "event": m.event} for m in shown[i]],
+            }
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    elif ranked:
+        print(f"{'HITS':>6}  RULE")
+        for i in ranked:
+            print(f"{hits[i]:>6}  {rules[i].title} ({rules[i].path})")
+            for m in shown[i]:
+                print(f"{'':>6}    {m.source}:{m.line} {json.dumps(m.event, ensure_ascii=False)}")
+
+    rate = hunter.events / seconds if seconds else 0.0
+    summary = (
+        f"{hunter.events} event(s) against {len(rules)} rule(s) in {seconds:.2f}s ({rate:.0f} events/s): "
+        f"{sum(hits)} hit(s) for {len(ranked)} rule(s); the prefilter skipped {hunter.skipped():.0%} of rule evaluations"
+    )
+    if invalid:
+        summary += f"; {len(invalid)} line(s) skipped, not JSON objects (first: {invalid[0]})"
+    if failed:
+        summary += f"; {failed} rule(s) could not be compiled"
+    print(summary + ".", file=sys.stderr)
+    return 1 if failed else 0
+
+
+# sigmaforage <command> ...: subcommands with their own argument parsers
+SUBCOMMANDS = {
+    "cache": run_cache,
+    "hunt": run_hunt,
+    "import-archive": run_import_archive,
+    "index": run_index,
+    "lint": run_lint,
+    "serve": run_serve,
+    "watch": run_watch,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    print_banner(file=sys.stderr if _machine_output(argv) else None)
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
+
     parser = get_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.list_siem:
-        list_siem()
+        list_siem(args.engine)
         return 0
     if args.list_pipelines:
         list_pipelines()
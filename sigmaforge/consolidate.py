@@ -0,0 +1,126 @@
+"""
+Consolidated searches (--consolidate): one search per logsource instead of one per rule.
+
+Every converted rule is normally its own scheduled search, so a few hundred
+process_creation rules read the same events a few hundred times per interval. With
+--consolidate, rules are grouped by logsource (product, category, service) and
+pipeline, and each group becomes one search over the OR of its rules' queries,
+followed by a step that labels every event with each rule it matches (one result
+row per event and rule) and that rule's level:
+
+    Splunk  (q1) OR (q2)
+            | eval sigma_rule_id=mvappend(if(searchmatch("q1"), "id1", null()), ...)
+            | mvexpand sigma_rule_id
+            | eval sigma_level=case(sigma_rule_id="id1", "high", ...)
+
+    KQL     Table
+            | where (q1) or (q2)
+            | extend RuleId = pack_array(iff((q1), "id1", ""), ...)
+            | mv-expand RuleId to typeof(string)
+            | where RuleId != ""
+            | extend RuleLevel = case(RuleId == "id1", "high", ..., "")
+
+KQL queries are grouped by the table they start from as well (`Table | where ...`).
+Queries that cannot be embedded stay separate searches: Splunk queries with pipe
+commands, KQL queries with other operators or without a table (a bare `where` is
+not a query on its own), backends returning several queries, and SIEMs other than
+Splunk and KQL.
+"""
+
+import re
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from .index import LOGSOURCE_FIELDS
+
+_KUSTO_TABLE = re.compile(r"\s*([A-Za-z_]\w*)\s*\|\s*where\s+", re.S)
+
+
+class RuleQuery(NamedTuple):
+    """One rule's converted query. label is the rule id (title or path without one)."""
+
+    rule: str
+    label: str
+    level: str | None
+    query: str
+
+
+class Consolidated(NamedTuple):
+    """One combined search and the rules it covers."""
+
+    query: str
+    rules: list[RuleQuery]
+
+
+def group_key(metadata: dict | None) -> tuple[tuple[str, str], ...]:
+    """The logsource a rule is grouped under, e.g. (("product", "windows"), ("category", "process_creation"))."""
+    metadata = metadata or {}
+    return tuple((field, metadata[field]) for field in LOGSOURCE_FIELDS if metadata.get(field))
+
+
+def describe_group(key: tuple[tuple[str, str], ...]) -> str:
+    return " ".join(f"{field}={value}" for field, value in key) or "no logsource"
+
+
+def _string(value: str) -> str:
+    """A double-quoted string literal (SPL eval and KQL use the same escapes)."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _splunk(rules: list[RuleQuery]) -> str:
+    search = " OR ".join(f"({r.query})" for r in rules)
+    labels = ", ".join(f"if(searchmatch({_string(r.query)}), {_string(r.label)}, null())" for r in rules)
+    levels = ", ".join(f"sigma_rule_id={_string(r.label)}, {_string(r.level or '')}" for r in rules)
+    return (
+        f"{search}\n"
+        f"| eval sigma_rule_id=mvappend({labels})\n"
+        "| mvexpand sigma_rule_id\n"
+        f"| eval sigma_level=case({levels})"
+    )
+
+
+def _kusto(table: str, rules: list[RuleQuery]) -> str:
+    condition = " or ".join(f"({r.query})" for r in rules)
+    labels = ", ".join(f"iff(({r.query}), {_string(r.label)}, \"\")" for r in rules)
+    levels = ", ".join(f"RuleId == {_string(r.label)}, {_string(r.level or '')}" for r in rules)
+    return (
+        f"{table}\n| where {condition}\n"
+        f"| extend RuleId = pack_array({labels})\n"
+        "| mv-expand RuleId to typeof(string)\n"
+        '| where RuleId != ""\n'
+        f"| extend RuleLevel = case({levels}, \"\")"
+    )
+
+
+def consolidate(backend_id: str, rules: Iterable[RuleQuery]) -> tuple[list[Consolidated], list[RuleQuery]]:
+    """
+    Combine the queries of one logsource group for backend_id. Returns the combined
+    searches and the rules that have to stay separate searches.
+    """
+    rules = list(rules)
+    if backend_id == "splunk":
+        embeddable = [r for r in rules if _splunk_search_only(r.query)]
+        combined = [Consolidated(_splunk(embeddable), embeddable)] if embeddable else []
+        return combined, [r for r in rules if r not in embeddable]
+    if backend_id == "kusto":
+        tables: dict[str, list[RuleQuery]] = {}
+        separate = []
+        for r in rules:
+            m = _KUSTO_TABLE.match(r.query)
+            expression = r.query[m.end():] if m else ""
+            if not m or "\n" in expression or "|" in _unquoted(expression):
+                separate.append(r)
+            else:
+                tables.setdefault(m.group(1), []).append(r._replace(query=expression))
+        return [Consolidated(_kusto(table, members), members) for table, members in tables.items()], separate
+    return [], rules
+
+
+def _unquoted(query: str) -> str:
+    """query with its double-quoted string literals removed (pipes inside values are fine)."""
+    return re.sub(r'"(?:[^"\\]|\\.)*"', '""', query)
+
+
+def _splunk_search_only(query: str) -> bool:
+    """True for a plain search expression (no pipe commands, no multiple queries)."""
+    return "\n" not in query and "|" not in _unquoted(query)
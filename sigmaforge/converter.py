@@ -1,21 +1,29 @@
 """
-Conversion engine: run sigma-cli to convert a Sigma rule to SIEM queries.
+Conversion engine: convert a Sigma rule to SIEM queries.
+
+Conversions run in-process through pySigma (see engine.py) when possible and fall
+back to a sigma-cli subprocess otherwise.
 """
 
+import functools
 import os
 import shutil
 import subprocess
 import sys
-import tempfile
-from pathlib import Path
-
-import certifi
+import time
 
+from .defaults import ENGINES
+from .engine import TIMINGS, EngineUnavailable, convert_in_process, pipeline_names
+from .result_cache import RESULT_CACHE, cache_key
 from .siem_backends import SIEM_BACKENDS
 
+DEFAULT_ENGINE = os.environ.get("SIGMAFORGE_ENGINE", "auto")
+
 
 def _subprocess_env() -> dict[str, str]:
     """Environment for sigma-cli subprocess so SSL uses certifi's CA bundle."""
+    import certifi  # only needed when shelling out to sigma-cli
+
     env = os.environ.copy()
     cert_path = certifi.where()
     env.setdefault("SSL_CERT_FILE", cert_path)
@@ -31,20 +39,83 @@ def _sigma_cmd() -> list[str]:
     return [sys.executable, "-m", "sigma"]
 
 
+def _install_hint(msg: str, siem_id: str, backend_id: str) -> str:
+    """Append backend install instructions to an error that looks like a missing plugin."""
+    if "Unknown target" in msg or "backend" in msg.lower():
+        pkg = SIEM_BACKENDS.get(siem_id.lower(), (None, "pysigma-backend-..."))[1]
+        msg += f"\n\nInstall the backend: sigma plugin install {backend_id}"
+        msg += f"\nOr: pip install {pkg}"
+    return msg
+
+
+def _convert_subprocess(
+    sigma_content: str,
+    backend_id: str,
+    pipeline: str,
+    rule_path: str | None,
+) -> tuple[bool, str]:
+    """
+    Convert by running `sigma convert` in a child process. Inline content (no
+    rule_path) is piped to its stdin, so no temp file is written.
+    """
+    try:
+        cmd = _sigma_cmd() + ["convert", "-t", backend_id]
+        for name in pipeline_names(pipeline):
+            cmd += ["-p", name]
+        cmd.append(rule_path or "-")
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(
+                cmd,
+                input=None if rule_path else sigma_content,
+                capture_output=True,
+                text=True,
+                timeout=60,
+                env=_subprocess_env(),
+            )
+        finally:
+            TIMINGS["subprocess_seconds"] += time.perf_counter() - start
+        out = result.stdout.strip() if result.stdout else ""
+        err = result.stderr.strip() if result.stderr else ""
+
+        if result.returncode != 0:
+            return False, err or out or f"sigma convert exited with code {result.returncode}"
+        return True, out or "(no output)"
+    except FileNotFoundError:
+        return False, (
+            "sigma-cli not found. Install it with: pip install sigma-cli\n"
+            "Then install backends: sigma plugin install splunk  (etc.)"
+        )
+    except subprocess.TimeoutExpired:
+        return False, "Conversion timed out."
+    except Exception as e:
+        return False, str(e)
+
+
 def convert_sigma_to_siem(
     sigma_content: str,
     siem_id: str,
     pipeline: str = "sysmon",
     rule_path: str | None = None,
+    engine: str | None = None,
+    use_cache: bool = True,
+    optimize: bool = False,
 ) -> tuple[bool, str]:
     """
-    Convert Sigma rule content to a SIEM query using sigma-cli.
+    Convert Sigma rule content to a SIEM query.
 
     Args:
         sigma_content: Full YAML content of the Sigma rule.
         siem_id: SIEM identifier (e.g. 'splunk', 'elasticsearch').
-        pipeline: Processing pipeline (e.g. 'sysmon', 'windows').
-        rule_path: If provided, use this path for the rule file; otherwise use a temp file.
+        pipeline: Processing pipeline(s), comma-separated (e.g. 'sysmon', 'sysmon,fields.yml').
+        rule_path: If provided, the subprocess engine reads the rule from this path
+            instead of reading sigma_content from its stdin.
+        engine: 'inprocess' (pySigma in this interpreter), 'subprocess' (sigma-cli child
+            process) or 'auto' (in-process, falling back to sigma-cli when pySigma or the
+            backend is not installed here). Defaults to $SIGMAFORGE_ENGINE or 'auto'.
+        use_cache: Look the result up in (and store it to) the on-disk result cache.
+        optimize: Apply the optimize.py rewrite passes to the query. The cache keeps
+            the backend's output, so toggling this never needs a cache flush.
 
     Returns:
         (success: bool, output_or_error: str)
@@ -53,51 +124,69 @@ def convert_sigma_to_siem(
     if not backend_id:
         return False, f"Unknown SIEM: {siem_id}. Use --list-siem to see supported platforms."
 
-    use_temp = rule_path is None
-    if use_temp:
-        fd, rule_path = tempfile.mkstemp(suffix=".yml", prefix="sigma_")
-        try:
-            with open(fd, "w", encoding="utf-8") as f:
-                f.write(sigma_content)
-        except Exception as e:
-            return False, f"Failed to write temp rule file: {e}"
+    engine = (engine or DEFAULT_ENGINE).lower()
+    if engine not in ENGINES:
+        return False, f"Unknown engine: {engine}. Choose one of: {', '.join(ENGINES)}."
 
-    try:
-        cmd = _sigma_cmd() + [
-            "convert",
-            "-t",
-            backend_id,
-            "-p",
-            pipeline,
-            rule_path,
-        ]
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60,
-            env=_subprocess_env(),
-        )
-        out = result.stdout.strip() if result.stdout else ""
-        err = result.stderr.strip() if result.stderr else ""
+    key = None
+    if use_cache:
+        start = time.perf_counter()
+        key = cache_key(sigma_content, backend_id, pipeline, cache_engine(engine, backend_id))
+        cached = RESULT_CACHE.get(key)
+        TIMINGS["cache_seconds"] += time.perf_counter() - start
+        if cached is not None:
+            return True, _optimized(cached, backend_id) if optimize else cached
 
-        if result.returncode != 0:
-            msg = err or out or f"sigma convert exited with code {result.returncode}"
-            if "Unknown target" in msg or "backend" in msg.lower():
-                pkg = SIEM_BACKENDS.get(siem_id.lower(), (None, "pysigma-backend-..."))[1]
-                msg += f"\n\nInstall the backend: sigma plugin install {backend_id}"
-                msg += f"\nOr: pip install {pkg}"
-            return False, msg
-        return True, out or "(no output)"
-    except FileNotFoundError:
-        return False, (
-            "sigma-cli not found. Install it with: pip install sigma-cli\n"
-            "Then install backends: sigma plugin install splunk  (etc.)"
-        )
-    except subprocess.TimeoutExpired:
-        return False, "Conversion timed out."
-    except Exception as e:
-        return False, str(e)
-    finally:
-        if use_temp and rule_path and Path(rule_path).exists():
-            Path(rule_path).unlink(missing_ok=True)
+    ok, text, used = _convert(sigma_content, siem_id, backend_id, pipeline, rule_path, engine)
+    if ok and key is not None:
+        if used != cache_engine(engine, backend_id):  # auto fell back although discovery found the backend
+            key = cache_key(sigma_content, backend_id, pipeline, used)
+        RESULT_CACHE.put(key, text)
+    if ok and optimize:
+        text = _optimized(text, backend_id)
+    return ok, text
+
+
+def cache_engine(engine: str | None, backend_id: str) -> str:
+    """The engine ('inprocess' or 'subprocess') a conversion will run on, for its result cache key."""
+    engine = (engine or DEFAULT_ENGINE).lower()
+    return _auto_engine(backend_id) if engine == "auto" else engine
+
+
+@functools.lru_cache(maxsize=None)
+def _auto_engine(backend_id: str) -> str:
+    from .discovery import inprocess_targets
+
+    targets = inprocess_targets()
+    return "inprocess" if targets is not None and backend_id in targets else "subprocess"
+
+
+def _optimized(query: str, backend_id: str) -> str:
+    from .optimize import optimize_query
+
+    start = time.perf_counter()
+    query = optimize_query(query, backend_id)
+    TIMINGS["optimize_seconds"] += time.perf_counter() - start
+    return query
+
+
+def _convert(
+    sigma_content: str,
+    siem_id: str,
+    backend_id: str,
+    pipeline: str,
+    rule_path: str | None,
+    engine: str,
+) -> tuple[bool, str, str]:
+    """Run one conversion with the selected engine (no result caching); also returns the engine used."""
+    if engine != "subprocess":
+        try:
+            return (*convert_in_process(sigma_content, backend_id, pipeline), "inprocess")
+        except EngineUnavailable as e:
+            if engine == "inprocess":
+                return False, _install_hint(str(e), siem_id, backend_id), "inprocess"
+
+    ok, text = _convert_subprocess(sigma_content, backend_id, pipeline, rule_path)
+    if not ok:
+        text = _install_hint(text, siem_id, backend_id)
+    return ok, text, "subprocess"
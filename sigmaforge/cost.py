@@ -0,0 +1,238 @@
+"""
+Static cost lint for converted queries (`sigmaforage lint --cost`).
+
+Each query is scored for constructs that make a SIEM scan instead of using its
+indexes. Every check adds points per occurrence (see WEIGHTS):
+
+    leading-wildcard   values starting with a wildcard (`*foo`, `*foo*`) and the KQL
+                       operators that imply one (contains, endswith): no index or
+                       term lookup can serve them
+    unanchored-regex   regexes without a leading `^` (Splunk `| regex`, KQL
+                       `matches regex`) or, for Lucene, starting with `.*`
+    unindexed-field    distinct fields filtered on that are not indexed: for Splunk
+                       everything but index/sourcetype/source/host, elsewhere only
+                       when the indexed fields are given (--indexed-field)
+    or-fanout          an OR (or value list) over more than FANOUT_LIMIT alternatives,
+                       one point per FANOUT_STEP alternatives
+    unscoped           Splunk searches not restricted to an index, sourcetype or
+                       source, and KQL queries not starting from a table; Lucene
+                       queries are scoped by the index pattern they run against
+
+Queries are read with the optimize.py parsers; when one cannot be parsed, a
+textual fallback still counts wildcards, regexes and scoping.
+"""
+
+import re
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from .optimize import DIALECTS, SPLUNK_INDEXED_FIELDS, Group, KustoDialect, Not, Term, Unsupported
+
+WEIGHTS = {
+    "leading-wildcard": 10,
+    "unanchored-regex": 15,
+    "unindexed-field": 2,
+    "or-fanout": 1,
+    "unscoped": 20,
+}
+FANOUT_LIMIT = 20
+FANOUT_STEP = 5
+EXAMPLE_WIDTH = 60
+
+SPLUNK_SCOPE_FIELDS = frozenset({"index", "sourcetype", "source"})
+KUSTO_SCAN_OPS = frozenset(
+    {"contains", "!contains", "contains_cs", "!contains_cs", "endswith", "!endswith", "endswith_cs", "!endswith_cs"}
+)
+
+_SPLUNK_REGEX_CMD = re.compile(r'\| regex (?:[\w."-]+\s*!?=\s*)?"((?:[^"\\]|\\.)*)"')
+_KUSTO_TABLE = re.compile(r"\s*[A-Za-z_]\w*\s*\|\s*where\s+", re.S)
+_KUSTO_REGEX = re.compile(r'matches regex\s+(@?"(?:[^"\\]|\\.)*")')
+_SPLUNK_LEADING = re.compile(r'(?:=|IN \(|, )"?\*')
+_LUCENE_LEADING = re.compile(r"[:(]\s*\*|\sOR \*")
+
+
+class Finding(NamedTuple):
+    """One check that fired for a query: how often, its points and a sample offender."""
+
+    check: str
+    count: int
+    points: int
+    example: str
+
+
+class QueryCost(NamedTuple):
+    rule: str
+    siem: str
+    score: int
+    findings: list[Finding]
+
+
+class _Tally:
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self.examples: dict[str, str] = {}
+
+    def add(self, check: str, example: str, count: int = 1) -> None:
+        self.counts[check] = self.counts.get(check, 0) + count
+        self.examples.setdefault(check, example)
+
+    def findings(self) -> list[Finding]:
+        findings = []
+        for check, count in self.counts.items():
+            if check == "or-fanout":
+                points = count // FANOUT_STEP * WEIGHTS[check]
+            else:
+                points = count * WEIGHTS[check]
+            findings.append(Finding(check, count, points, self.examples[check]))
+        return sorted(findings, key=lambda f: -f.points)
+
+
+def _terms(node) -> Iterable[Term]:
+    if isinstance(node, Not):
+        yield from _terms(node.child)
+    elif isinstance(node, Group):
+        for child in node.children:
+            yield from _terms(child)
+    else:
+        yield node
+
+
+def _field(term: Term) -> str:
+    return (term.field or "").strip("\"'")
+
+
+def _scoped(node, fields: frozenset) -> bool:
+    """True if every event the query matches must satisfy a filter on one of fields."""
+    if isinstance(node, Term):
+        return _field(node).lower() in fields and node.op in ("=", "in")
+    if isinstance(node, Group):
+        combine = any if node.op == "and" else all
+        return combine(_scoped(child, fields) for child in node.children)
+    return False
+
+
+def _fanouts(node) -> Iterable[tuple[int, str]]:
+    """(alternatives, example) for every OR and value list in the tree."""
+    if isinstance(node, Not):
+        yield from _fanouts(node.child)
+    elif isinstance(node, Group):
+        if node.op == "or":
+            alternatives = sum(len(c.values) if isinstance(c, Term) and c.values else 1 for c in node.children)
+            yield alternatives, _example(node.children[0])
+        for child in node.children:
+            yield from _fanouts(child)
+    elif len(node.values) > 1:
+        yield len(node.values), node.text
+
+
+def _example(node) -> str:
+    return next(iter(_terms(node))).text
+
+
+def _leading_wildcard(term: Term, backend_id: str) -> int:
+    if isinstance(DIALECTS[backend_id], KustoDialect):
+        return int(term.op in KUSTO_SCAN_OPS)
+    return sum(value.lstrip('"').startswith("*") for value in term.values)
+
+
+def _unanchored(pattern: str, backend_id: str) -> bool:
+    if backend_id in ("splunk", "kusto"):
+        return not pattern.startswith("^")
+    return pattern.startswith(".*")
+
+
+def _score_tree(tree, backend_id: str, indexed: frozenset | None, tally: _Tally) -> None:
+    fields = []
+    for term in _terms(tree):
+        leading = _leading_wildcard(term, backend_id)
+        if leading:
+            tally.add("leading-wildcard", term.text, leading)
+        if term.op == "matches regex":
+            literal = KustoDialect.literal(term.values[0])
+            if literal is not None and _unanchored(literal, backend_id):
+                tally.add("unanchored-regex", term.text)
+        for value in term.values:
+            if value.startswith("/") and _unanchored(value[1:-1], backend_id):
+                tally.add("unanchored-regex", term.text)
+        if term.field and _field(term) != "_exists_":
+            fields.append(_field(term))
+    if indexed is not None:
+        for field in dict.fromkeys(fields):
+            if field.lower() not in indexed:
+                tally.add("unindexed-field", field)
+    for alternatives, example in _fanouts(tree):
+        if alternatives > FANOUT_LIMIT:
+            tally.add("or-fanout", example, alternatives)
+    if backend_id == "splunk" and not _scoped(tree, SPLUNK_SCOPE_FIELDS):
+        tally.add("unscoped", "no index, sourcetype or source filter")
+
+
+def _score_text(expression: str, backend_id: str, tally: _Tally) -> None:
+    """Fallback for expressions the parser does not understand."""
+    if backend_id == "kusto":
+        for m in re.finditer(r"\s(!?(?:contains|endswith)(?:_cs)?)\s", expression):
+            tally.add("leading-wildcard", m.group(1))
+        for m in _KUSTO_REGEX.finditer(expression):
+            literal = KustoDialect.literal(m.group(1))
+            if literal is not None and _unanchored(literal, backend_id):
+                tally.add("unanchored-regex", m.group(0))
+        return
+    leading = (_SPLUNK_LEADING if backend_id == "splunk" else _LUCENE_LEADING).findall(expression)
+    if leading:
+        tally.add("leading-wildcard", leading[0], len(leading))
+    if backend_id == "splunk" and not re.search(r"(?:^|[\s(])(?:index|sourcetype|source)=", expression):
+        tally.add("unscoped", "no index, sourcetype or source filter")
+
+
+def score_query(query: str, backend_id: str, indexed_fields: Iterable[str] | None = None) -> list[Finding]:
+    """
+    Findings for one converted query (as produced for backend_id), most expensive
+    first. indexed_fields overrides the fields treated as indexed; without it only
+    Splunk's unindexed fields are reported. Backends without a parser score zero.
+    """
+    if backend_id not in DIALECTS:
+        return []
+    if indexed_fields is not None:
+        indexed = frozenset(f.lower() for f in indexed_fields)
+    else:
+        indexed = SPLUNK_INDEXED_FIELDS if backend_id == "splunk" else None
+    dialect = DIALECTS[backend_id]
+    tally = _Tally()
+    for part in query.split("\n\n"):  # backends returning several queries
+        expression = part
+        if backend_id == "splunk":
+            for m in _SPLUNK_REGEX_CMD.finditer(part):
+                if _unanchored(m.group(1), backend_id):
+                    tally.add("unanchored-regex", m.group(0))
+            lines = part.split("\n")
+            search = [line[len("| search "):] for line in lines if line.startswith("| search ")]
+            expression = search[0] if search else ("" if lines[0].startswith("|") else lines[0])
+        elif backend_id == "kusto":
+            m = _KUSTO_TABLE.match(part)
+            if m:
+                expression = part[m.end():]
+            else:
+                tally.add("unscoped", "no table")
+        if not expression.strip():
+            continue
+        try:
+            tree = dialect.parse(expression)
+        except Unsupported:
+            _score_text(expression, backend_id, tally)
+            continue
+        _score_tree(tree, backend_id, indexed, tally)
+    return tally.findings()
+
+
+def query_cost(rule: str, siem: str, query: str, backend_id: str, indexed_fields=None) -> QueryCost:
+    findings = score_query(query, backend_id, indexed_fields)
+    return QueryCost(rule, siem, sum(f.points for f in findings), findings)
+
+
+def format_finding(finding: Finding) -> str:
+    """e.g. `leading-wildcard x2 (+20): query="*.stage.123456.*"`"""
+    count = f" x{finding.count}" if finding.count > 1 else ""
+    example = finding.example
+    if len(example) > EXAMPLE_WIDTH:
+        example = example[: EXAMPLE_WIDTH - 3] + "..."
+    return f"{finding.check}{count} (+{finding.points}): {example}"
@@ -0,0 +1,368 @@
+"""
+Conversion daemon: keep backends, pipelines and caches warm between CLI calls.
+
+`sigmaforage serve` answers a small JSON-over-HTTP API on a Unix socket (default)
+or a localhost TCP port:
+
+    GET  /health    -> {"ok": true, "version": ..., "pid": ..., "stats": {...}}
+    POST /convert   -> {"results": [{"rule": path, "siem": id, "ok": bool, "text": str}, ...]}
+                       body: {"rules": [{"path": ..., "content": ...}], "siems": [...],
+                              "pipeline": "sysmon", "engine": null, "use_cache": true,
+                              "optimize": false}
+    POST /shutdown  -> stop accepting requests, finish in-flight ones and exit
+
+Results are returned rule by rule, SIEM by SIEM, in request order. `main()` uses a
+running daemon automatically (see find_daemon); --no-daemon or SIGMAFORGE_NO_DAEMON=1
+turns that off.
+"""
+
+import http.client
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from . import __version__
+from .batch import ConversionUnit, cache_counters, convert_unit, group_siems
+from .defaults import DEFAULT_MAX_CONCURRENT
+from .engine import BACKEND_CACHE, pipeline_names
+from .result_cache import default_cache_dir
+from .siem_backends import SIEM_BACKENDS
+
+# Seconds a request waits for a free slot before the daemon answers 503
+DEFAULT_QUEUE_TIMEOUT = 30.0
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+# Rules sent per /convert request when the CLI streams a batch through the daemon
+CLIENT_BATCH_RULES = 32
+
+
+def default_address() -> str:
+    """$SIGMAFORGE_DAEMON, else a Unix socket in $XDG_RUNTIME_DIR or the cache directory."""
+    if os.environ.get("SIGMAFORGE_DAEMON"):
+        return os.environ["SIGMAFORGE_DAEMON"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "sigmaforage.sock")
+    return str(default_cache_dir() / "daemon.sock")
+
+
+def parse_address(address: str) -> tuple[str, int] | str:
+    """'http://host:port' or 'host:port' -> (host, port); anything else is a Unix socket path."""
+    spec = address[len("http://"):] if address.startswith("http://") else address
+    host, sep, port = spec.rpartition(":")
+    if sep and port.isdigit() and "/" not in spec:
+        return host.strip("[]") or "127.0.0.1", int(port)
+    return address
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class DaemonError(Exception):
+    """The daemon could not be reached or rejected a request."""
+
+
+def absolute_pipeline(pipeline: str) -> str:
+    """The pipeline spec with pipeline files made absolute: the daemon resolves paths in its own directory."""
+    return ",".join(os.path.abspath(name) if os.path.isfile(name) else name for name in pipeline_names(pipeline))
+
+
+class DaemonClient:
+    """Thin client for a running `sigmaforage serve`."""
+
+    def __init__(self, address: str, timeout: float = 300.0):
+        self.address = address
+        self.timeout = timeout
+        self._conn = None
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        target = parse_address(self.address)
+        if isinstance(target, tuple):
+            return http.client.HTTPConnection(target[0], target[1], timeout=timeout)
+        return _UnixHTTPConnection(target, timeout)
+
+    def _request(self, method: str, path: str, payload: dict | None = None, timeout: float | None = None) -> dict:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if self._conn is None:
+            self._conn = self._connection(self.timeout)
+        # The connection is reused (keep-alive), so apply this request's timeout each time
+        self._conn.timeout = timeout or self.timeout
+        if self._conn.sock is not None:
+            self._conn.sock.settimeout(self._conn.timeout)
+        try:
+            self._conn.request(method, path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            data = json.loads(response.read() or b"{}")
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self.close()
+            raise DaemonError(f"daemon at {self.address} unavailable: {e}") from e
+        if response.status != 200:
+            raise DaemonError(data.get("error") or f"daemon returned HTTP {response.status}")
+        return data
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def health(self, timeout: float = 0.5) -> dict:
+        return self._request("GET", "/health", timeout=timeout)
+
+    def shutdown(self) -> dict:
+        return self._request("POST", "/shutdown")
+
+    def convert(
+        self,
+        rules: list[dict],
+        siems: list[str],
+        pipeline: str = "sysmon",
+        engine: str | None = None,
+        use_cache: bool = True,
+        optimize: bool = False,
+    ) -> list[dict]:
+        """Convert rules ([{"path", "content"}]) to every SIEM; results in rule-major order."""
+        payload = {
+            "rules": rules,
+            "siems": siems,
+            "pipeline": absolute_pipeline(pipeline),
+            "engine": engine,
+            "use_cache": use_cache,
+            "optimize": optimize,
+        }
+        return self._request("POST", "/convert", payload)["results"]
+
+    def zip_units(self, units):
+        """
+        Drop-in for batch.zip_units: yield (unit, (ok, text, counters)) in order.
+
+        Consecutive units of the same rule are sent together, CLIENT_BATCH_RULES rules
+        per request. All units must share siems/pipeline/engine/optimize (as run_convert's do).
+        """
+        chunk: list[list[ConversionUnit]] = []
+        for unit in units:
+            if unit.error is not None or not chunk or chunk[-1][0].rule_index != unit.rule_index:
+                if len(chunk) >= CLIENT_BATCH_RULES:
+                    yield from self._send(chunk)
+                    chunk = []
+                chunk.append([unit])
+            else:
+                chunk[-1].append(unit)
+        if chunk:
+            yield from self._send(chunk)
+
+    def _send(self, chunk: list[list[ConversionUnit]]):
+        remote = [group for group in chunk if group[0].error is None]
+        results = iter([])
+        if remote:
+            first = remote[0][0]
+            results = iter(
+                self.convert(
+                    [{"path": group[0].rule_path, "content": group[0].content} for group in remote],
+                    [unit.siem_id for unit in remote[0]],
+                    pipeline=first.pipeline,
+                    engine=first.engine,
+                    use_cache=first.use_cache,
+                    optimize=first.optimize,
+                )
+            )
+        for group in chunk:
+            for unit in group:
+                if unit.error is not None:
+                    yield unit, (False, unit.error, Counter())
+                    continue
+                result = next(results)
+                yield unit, (result["ok"], result["text"], Counter(convert_seconds=result.get("seconds", 0.0)))
+
+
+def find_daemon(address: str | None = None) -> DaemonClient | None:
+    """Return a client for a running daemon, or None (quickly) if there is none."""
+    if os.environ.get("SIGMAFORGE_NO_DAEMON"):
+        return None
+    address = address or default_address()
+    target = parse_address(address)
+    if isinstance(target, str) and not os.path.exists(target):
+        return None
+    client = DaemonClient(address)
+    try:
+        client.health()
+    except DaemonError:
+        client.close()
+        return None
+    return client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = f"SigmaForage/{__version__}"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - BaseHTTPRequestHandler signature
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def address_string(self) -> str:
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        self._send(200, {"ok": True, "version": __version__, "pid": os.getpid(), "stats": self.server.stats()})
+
+    def do_POST(self) -> None:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "Request body must be JSON."})
+            return
+        if self.path == "/shutdown":
+            self._send(200, {"ok": True})
+            self.server.request_shutdown()
+        elif self.path == "/convert":
+            self._convert(body)
+        else:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def _convert(self, body: dict) -> None:
+        rules = body.get("rules")
+        siems = [str(s).lower() for s in body.get("siems") or []]
+        if not isinstance(rules, list) or not siems:
+            self._send(400, {"error": "Expected 'rules' (list of {path, content}) and 'siems' (non-empty list)."})
+            return
+        if not self.server.slots.acquire(timeout=self.server.queue_timeout):
+            self._send(503, {"error": "Daemon busy: too many concurrent requests."})
+            return
+        try:
+            pipeline = body.get("pipeline") or "sysmon"
+            groups = group_siems(siems, pipeline)
+            results = []
+            for rule in rules:
+                path = str(rule.get("path") or "-")
+                by_siem = {}
+                for group in groups:
+                    unit = ConversionUnit(
+                        path,
+                        group[0],
+                        str(rule.get("content") or ""),
+                        pipeline=pipeline,
+                        engine=body.get("engine"),
+                        use_cache=bool(body.get("use_cache", True)),
+                        optimize=bool(body.get("optimize", False)),
+                    )
+                    ok, text, counters = convert_unit(unit)
+                    result = {"ok": ok, "text": text, "seconds": counters["convert_seconds"]}
+                    by_siem.update({siem_id: result for siem_id in group})
+                for siem_id in siems:
+                    results.append({"rule": path, "siem": siem_id, **by_siem[siem_id]})
+            self.server.conversions += len(results)
+        finally:
+            self.server.slots.release()
+        self._send(200, {"results": results})
+
+
+class _ServerMixin:
+    daemon_threads = False  # in-flight requests finish on shutdown
+    block_on_close = True
+
+    def setup_state(self, max_concurrent: int, queue_timeout: float, verbose: bool) -> None:
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.queue_timeout = queue_timeout
+        self.verbose = verbose
+        self.conversions = 0
+
+    def stats(self) -> dict:
+        return {"conversions": self.conversions, **cache_counters()}
+
+    def request_shutdown(self) -> None:
+        # shutdown() blocks until serve_forever() returns, so it must run on another thread
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+class _UnixServer(_ServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class _TCPServer(_ServerMixin, socketserver.ThreadingMixIn, HTTPServer):
+    pass
+
+
+def _preload(siems: list[str], pipeline: str) -> None:
+    for siem_id in siems:
+        backend_id = SIEM_BACKENDS.get(siem_id, (None, None))[0]
+        if backend_id is None:
+            continue
+        try:
+            BACKEND_CACHE.get(backend_id, pipeline)
+        except Exception:
+            pass  # Missing backends are reported per request, like in the CLI
+
+
+def serve(
+    address: str | None = None,
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+    preload: list[str] | None = None,
+    pipeline: str = "sysmon",
+    queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+    verbose: bool = False,
+) -> int:
+    """Run the daemon until SIGTERM/SIGINT or POST /shutdown. Returns a process exit code."""
+    address = address or default_address()
+    target = parse_address(address)
+    if isinstance(target, tuple):
+        if target[0] not in LOOPBACK_HOSTS:
+            raise ValueError(f"Refusing to listen on non-loopback address {target[0]}; use 127.0.0.1 or a Unix socket.")
+        server = _TCPServer(target, _Handler)
+    else:
+        if os.path.exists(target):
+            if find_daemon(target) is not None:
+                raise ValueError(f"A daemon is already listening on {target}.")
+            os.unlink(target)  # stale socket from a crashed daemon
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        old_umask = os.umask(0o177)  # socket is private to this user
+        try:
+            server = _UnixServer(target, _Handler)
+        finally:
+            os.umask(old_umask)
+    server.setup_state(max_concurrent, queue_timeout, verbose)
+
+    _preload([s.lower() for s in preload or []], pipeline)
+    print(f"Serving on {address} (Ctrl+C to stop)", file=sys.stderr)
+
+    def _on_signal(signum, frame):
+        server.request_shutdown()
+
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        previous = {sig: signal.signal(sig, _on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()  # waits for in-flight requests (block_on_close)
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        if isinstance(target, str):
+            Path(target).unlink(missing_ok=True)
+    return 0
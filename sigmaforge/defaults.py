@@ -0,0 +1,41 @@
+"""
+Defaults shared by the CLI and the modules that implement each feature.
+
+This module has no imports so that building the argument parser, and the cheap
+commands (--version, --list-siem, --list-pipelines), never load the conversion
+machinery. Feature modules re-export these names.
+"""
+
+# Conversion engines accepted by convert_sigma_to_siem(engine=...)
+ENGINES = ("auto", "inprocess", "subprocess")
+
+DEFAULT_BACKEND_CACHE_SIZE = 32
+
+
+def default_cache_dir():
+    """Cache root (a Path), honouring $SIGMAFORGE_CACHE_DIR and $XDG_CACHE_HOME."""
+    import os
+    from pathlib import Path
+
+    if os.environ.get("SIGMAFORGE_CACHE_DIR"):
+        return Path(os.environ["SIGMAFORGE_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "sigmaforage"
+
+
+# On-disk result cache pruning
+DEFAULT_MAX_SIZE_MB = 256
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Conversion requests a `sigmaforage serve` daemon handles at once
+DEFAULT_MAX_CONCURRENT = 4
+
+# --metrics-out file formats
+METRICS_FORMATS = ("json", "prometheus")
+
+# Watch mode
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Rules of a stdin stream remembered (by id/name) for correlation rules that reference them
+DEFAULT_STREAM_NAMED_RULES = 1000
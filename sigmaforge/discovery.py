@@ -0,0 +1,186 @@
+"""
+Up-front discovery of installed conversion backends.
+
+pySigma plugins do not register entry points, so the installed targets are found
+the way sigma-cli finds them: plugin autodiscovery in this interpreter, and for the
+subprocess engine `sigma list targets`. Both take the better part of a second, so
+the result is cached on disk (under the result cache root, in discovery/) keyed by
+a fingerprint of the environment: the interpreter, and the modification times of
+the sys.path directories, which change whenever a package is installed or removed.
+The sigma-cli probe is additionally keyed by the resolved `sigma` executable and
+the site-packages of the interpreter it runs on (e.g. its pipx venv), so `sigma
+plugin install` invalidates it too. The probes' own modules are imported lazily so
+a warm --list-siem stays cheap.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+from .defaults import default_cache_dir
+
+# Seconds to wait for `sigma list targets`
+PROBE_TIMEOUT = 60
+
+
+def environment_fingerprint() -> str:
+    """Digest that changes when packages are installed into or removed from this interpreter."""
+    h = hashlib.sha256()
+    h.update(f"{sys.executable}\0{sys.version}\0".encode())
+    for entry in sys.path:
+        try:
+            h.update(f"{entry}\0{os.stat(entry or '.').st_mtime_ns}\0".encode())
+        except OSError:
+            continue
+    return h.hexdigest()
+
+
+def discovery_dir() -> Path:
+    return default_cache_dir() / "discovery"
+
+
+def _cached(kind: str, key: str, compute) -> frozenset[str] | None:
+    """Return the cached target set for (kind, key), computing and storing it on a miss."""
+    path = discovery_dir() / f"{kind}-{hashlib.sha256(key.encode()).hexdigest()[:16]}.json"
+    try:
+        return frozenset(json.loads(path.read_text(encoding="utf-8"))["targets"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    targets = compute()
+    if targets is None:
+        return None  # nothing learned; probe again next time
+    try:
+        import tempfile
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "targets": sorted(targets)}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # discovery still works, just uncached
+    return targets
+
+
+def _probe_inprocess() -> frozenset[str] | None:
+    from .engine import EngineUnavailable, _plugins
+
+    try:
+        return frozenset(_plugins().backends)
+    except EngineUnavailable:
+        return None
+
+
+def inprocess_targets() -> frozenset[str] | None:
+    """Targets pySigma can convert to in this interpreter, or None if pySigma is not importable."""
+    return _cached("inprocess", environment_fingerprint(), _probe_inprocess)
+
+
+def parse_target_table(output: str) -> frozenset[str]:
+    """Identifiers from the first column of the `sigma list targets` table."""
+    targets = set()
+    for line in output.splitlines():
+        cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+        if line.lstrip().startswith("|") and cells[0] and cells[0] != "Identifier":
+            targets.add(cells[0])
+    return frozenset(targets)
+
+
+def _probe_cli(sigma_exe: str) -> frozenset[str] | None:
+    import subprocess
+
+    from .converter import _subprocess_env
+
+    try:
+        result = subprocess.run(
+            [sigma_exe, "list", "targets"],
+            capture_output=True,
+            text=True,
+            timeout=PROBE_TIMEOUT,
+            env=_subprocess_env(),
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return parse_target_table(result.stdout)
+
+
+def cli_site_packages(sigma_exe: str) -> list[Path]:
+    """site-packages directories of the interpreter named in the `sigma` script's shebang."""
+    try:
+        with open(sigma_exe, "rb") as f:
+            first = f.readline(1024)
+    except OSError:
+        return []
+    if not first.startswith(b"#!"):
+        return []
+    words = first[2:].decode("utf-8", "replace").split()
+    if words and os.path.basename(words[0]) == "env":  # #!/usr/bin/env python3
+        words = [shutil.which(words[1]) or ""] if len(words) > 1 else []
+    if not words or not words[0]:
+        return []
+    prefix = Path(words[0]).parent.parent  # <prefix>/bin/python, not resolved: venvs link to the base python
+    return sorted([*prefix.glob("lib/python*/site-packages"), *prefix.glob("Lib/site-packages")])
+
+
+def cli_fingerprint(sigma_exe: str) -> str | None:
+    """The resolved `sigma` executable and the mtimes of its site-packages, or None if it is gone."""
+    real = os.path.realpath(sigma_exe)
+    try:
+        key = f"{real}\0{os.stat(real).st_mtime_ns}"
+    except OSError:
+        return None
+    for site in cli_site_packages(sigma_exe):
+        try:
+            key += f"\0{site}\0{site.stat().st_mtime_ns}"
+        except OSError:
+            continue
+    return key
+
+
+def subprocess_fingerprint() -> str:
+    """Digest that changes when packages are installed into the environment the subprocess engine runs in."""
+    sigma_exe = shutil.which("sigma")
+    key = cli_fingerprint(sigma_exe) if sigma_exe else None
+    # without sigma on PATH the subprocess engine runs `python -m sigma`, i.e. this interpreter
+    return hashlib.sha256(key.encode()).hexdigest() if key else environment_fingerprint()
+
+
+def cli_targets() -> frozenset[str] | None:
+    """Targets sigma-cli on PATH can convert to, or None if it is missing or fails."""
+    sigma_exe = shutil.which("sigma")
+    if not sigma_exe:
+        return None  # the subprocess engine falls back to `python -m sigma`, i.e. this interpreter
+    key = cli_fingerprint(sigma_exe)
+    if key is None:
+        return None
+    return _cached("cli", f"{key}\0{environment_fingerprint()}", lambda: _probe_cli(sigma_exe))
+
+
+def missing_backends(backend_ids, engine: str | None = None) -> set[str] | None:
+    """
+    Return the backend ids that no engine can convert to, or None if discovery
+    found nothing at all (then callers should not filter and let conversion report).
+    The auto engine can use either pySigma here or sigma-cli, so it checks both;
+    sigma-cli is only probed when pySigma lacks some of the backends.
+    """
+    engine = (engine or os.environ.get("SIGMAFORGE_ENGINE") or "auto").lower()
+    missing = set(backend_ids)
+    discovered = False
+    if engine != "subprocess":
+        targets = inprocess_targets()
+        if targets is not None:
+            discovered = True
+            missing -= targets
+    if missing and engine != "inprocess":
+        targets = cli_targets()
+        if targets is None and engine == "subprocess":
+            targets = inprocess_targets()  # no sigma on PATH: sigma-cli runs as `python -m sigma` here
+        if targets is not None:
+            discovered = True
+            missing -= targets
+    return missing if discovered else None
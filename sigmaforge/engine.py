@@ -0,0 +1,295 @@
+"""
+In-process conversion engine: call pySigma backends and pipelines directly.
+
+pySigma is imported lazily so that importing this module stays cheap and so that
+callers can fall back to the sigma-cli subprocess when pySigma is not importable
+in the current interpreter (e.g. sigma-cli installed with pipx).
+"""
+
+import copy
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+from .defaults import DEFAULT_BACKEND_CACHE_SIZE
+from .siem_backends import SIEM_BACKENDS
+
+# Same shape as functools.lru_cache().cache_info()
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# A ready-to-use backend (with its processing pipeline) plus a lock, since pySigma
+# backends keep per-conversion state and must not convert two rules at once.
+CachedBackend = namedtuple("CachedBackend", ["backend", "lock"])
+
+DEFAULT_PARSED_RULE_CACHE_SIZE = 64
+
+
+class EngineUnavailable(Exception):
+    """Raised when the in-process engine cannot handle a conversion at all."""
+
+
+@functools.lru_cache(maxsize=None)
+def _plugins():
+    """Discover installed pySigma plugins once per process."""
+    try:
+        from sigma.plugins import InstalledSigmaPlugins
+    except ImportError as e:
+        raise EngineUnavailable(f"pySigma is not importable: {e}") from e
+    return InstalledSigmaPlugins.autodiscover(include_validators=False)
+
+
+def pysigma_available() -> bool:
+    """Return True if pySigma can be imported in this interpreter."""
+    try:
+        _plugins()
+    except EngineUnavailable:
+        return False
+    return True
+
+
+def has_backend(backend_id: str) -> bool:
+    """Return True if the pySigma backend is installed in this interpreter."""
+    try:
+        return backend_id in _plugins().backends
+    except EngineUnavailable:
+        return False
+
+
+def format_result(result) -> str:
+    """Render a backend result the same way `sigma convert` prints it."""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, bytes):
+        return result.decode("utf-8", errors="replace")
+    if isinstance(result, list) and all(isinstance(item, str) for item in result):
+        return "\n\n".join(result)
+    if isinstance(result, list) and all(isinstance(item, dict) for item in result):
+        return "\n".join(json.dumps(item) for item in result)
+    if isinstance(result, dict):
+        return json.dumps(result)
+    raise TypeError(f"Backend returned unexpected format {type(result)}")
+
+
+def pipeline_names(pipeline: str) -> tuple[str, ...]:
+    """Split a pipeline spec ('sysmon' or 'sysmon,my_fields.yml') into pipeline names."""
+    return tuple(name.strip() for name in pipeline.split(",") if name.strip())
+
+
+@functools.lru_cache(maxsize=None)
+def backend_package_version(backend_id: str) -> str:
+    """Installed version of the pip package providing backend_id, or 'unknown'."""
+    from importlib import metadata
+
+    for mapped_id, pkg in SIEM_BACKENDS.values():
+        if mapped_id == backend_id:
+            try:
+                return metadata.version(pkg)
+            except metadata.PackageNotFoundError:
+                break
+    return "unknown"
+
+
+def _pipeline_fingerprint(names: tuple[str, ...]) -> tuple:
+    """Pipeline names plus mtimes of pipeline files, so edited field mappings are picked up."""
+    fingerprint = []
+    for name in names:
+        try:
+            fingerprint.append((name, os.stat(name).st_mtime_ns))
+        except OSError:
+            fingerprint.append((name, None))
+    return tuple(fingerprint)
+
+
+def build_backend(backend_id: str, pipeline: str):
+    """Resolve the processing pipeline(s) and instantiate the backend for backend_id."""
+    from sigma.exceptions import SigmaPipelineNotAllowedForBackendError, SigmaPipelineNotFoundError
+
+    plugins = _plugins()
+    backend_class = plugins.backends.get(backend_id)
+    if backend_class is None:
+        raise EngineUnavailable(f"Unknown target: {backend_id}")
+    try:
+        processing_pipeline = plugins.get_pipeline_resolver().resolve(list(pipeline_names(pipeline)), backend_id)
+    except SigmaPipelineNotFoundError as e:
+        raise ValueError(
+            f"The pipeline '{e.spec}' was not found. List installed pipelines with: sigma list pipelines {backend_id}"
+        ) from e
+    except SigmaPipelineNotAllowedForBackendError as e:
+        raise ValueError(
+            f"The pipeline '{e.wrong_pipeline}' is not intended to be used with the target {backend_id}."
+        ) from e
+    return backend_class(processing_pipeline=processing_pipeline)
+
+
+# Cumulative time (seconds) per conversion stage in this process: setup_seconds
+# (plugin discovery, pipeline resolution, backend construction), parse_seconds,
+# backend_seconds (pipeline application + query generation), and from converter.py
+# cache_seconds (result cache lookup), subprocess_seconds (sigma-cli) and
+# optimize_seconds (--optimize rewrite passes).
+TIMINGS: Counter = Counter()
+
+
+class BackendCache:
+    """
+    Process-wide LRU cache of ready-to-use backend + pipeline objects.
+
+    Keyed by (backend_id, pipeline names and file mtimes, backend package version).
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_BACKEND_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, backend_id: str, pipeline: str) -> CachedBackend:
+        """Return a cached backend for (backend_id, pipeline), building it on a miss."""
+        key = (
+            backend_id,
+            _pipeline_fingerprint(pipeline_names(pipeline)),
+            backend_package_version(backend_id),
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        start = time.perf_counter()
+        try:
+            entry = CachedBackend(build_backend(backend_id, pipeline), threading.Lock())
+        finally:
+            TIMINGS["setup_seconds"] += time.perf_counter() - start
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def resize(self, maxsize: int) -> None:
+        """Change the size limit, evicting least recently used entries if needed."""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self) -> None:
+        """Drop all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def summary(self) -> str:
+        info = self.info()
+        return f"Backend cache: {info.hits} hit(s), {info.misses} miss(es), {info.currsize}/{info.maxsize} entries"
+
+    def _evict(self) -> None:
+        while len(self._entries) > max(self.maxsize, 0):
+            self._entries.popitem(last=False)
+
+
+BACKEND_CACHE = BackendCache(int(os.environ.get("SIGMAFORGE_BACKEND_CACHE_SIZE", DEFAULT_BACKEND_CACHE_SIZE)))
+
+
+class ParsedRuleCache:
+    """
+    Process-wide LRU cache of parsed and validated rules, keyed by rule text.
+
+    A rule converted for many SIEMs is parsed once; each conversion gets its own
+    deep copy because processing pipelines rewrite the rule they are applied to.
+    Parse errors are cached as well, so a broken rule fails fast for every SIEM.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_PARSED_RULE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sigma_content: str):
+        """Return a private copy of the parsed SigmaCollection. Raises SigmaError for invalid rules."""
+        with self._lock:
+            entry = self._entries.get(sigma_content)
+            if entry is not None:
+                self._entries.move_to_end(sigma_content)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            from sigma.collection import SigmaCollection
+            from sigma.exceptions import SigmaError
+
+            start = time.perf_counter()
+            try:
+                entry = SigmaCollection.from_yaml(sigma_content)
+            except SigmaError as e:
+                entry = e
+            TIMINGS["parse_seconds"] += time.perf_counter() - start
+            with self._lock:
+                self._entries[sigma_content] = entry
+                self._evict()
+        if isinstance(entry, Exception):
+            raise entry.with_traceback(None)
+        return copy.deepcopy(entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def _evict(self) -> None:
+        while len(self._entries) > max(self.maxsize, 0):
+            self._entries.popitem(last=False)
+
+
+PARSED_RULE_CACHE = ParsedRuleCache()
+
+
+def convert_in_process(sigma_content: str, backend_id: str, pipeline: str = "sysmon") -> tuple[bool, str]:
+    """
+    Convert Sigma rule content with pySigma in the current interpreter.
+
+    Returns:
+        (success: bool, output_or_error: str)
+
+    Raises:
+        EngineUnavailable: pySigma or the requested backend is not installed here.
+    """
+    try:
+        cached = BACKEND_CACHE.get(backend_id, pipeline)
+    except ValueError as e:
+        return False, str(e)
+
+    from sigma.exceptions import SigmaError
+
+    try:
+        collection = PARSED_RULE_CACHE.get(sigma_content)
+        with cached.lock:
+            start = time.perf_counter()
+            try:
+                result = cached.backend.convert(collection)
+            finally:
+                TIMINGS["backend_seconds"] += time.perf_counter() - start
+        out = format_result(result).strip()
+    except SigmaError as e:
+        return False, f"Error while converting: {e}"
+    except NotImplementedError as e:
+        return False, f"Feature required for conversion of Sigma rule is not supported by backend: {e}"
+    except Exception as e:
+        return False, str(e)
+    return True, out or "(no output)"
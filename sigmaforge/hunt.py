@@ -0,0 +1,593 @@
+"""
+Offline rule evaluation (`sigmaforage hunt`): run Sigma rules over exported events.
+
+Rules are compiled straight from their YAML (no backend, no pipeline), so field
+names must be the ones in the events, e.g. Sysmon's Image and CommandLine. Each
+detection item becomes a closure with its modifiers applied up front:
+
+    equals          one frozenset lookup for all plain values of a field
+    startswith      one str.startswith(tuple) call, endswith likewise
+    contains        substring tests; other wildcard patterns become anchored regexes
+    re              compiled once (with the i/m/s sub-modifiers)
+    cidr            ipaddress networks
+    all, exists, cased, gt/gte/lt/lte
+
+Matching is case-insensitive except for re and cased, as in Sigma. Other
+modifiers (base64, windash, fieldref, ...) and aggregation conditions make a rule
+unsupported (RuleError).
+
+Most rules cannot match most events, so every rule gets anchors: literals of
+which at least one must occur in any event it matches (an AND needs only one
+child's anchors, an OR all of them; a negation or regex has none). One
+Aho-Corasick automaton over all anchors scans each event's values once, and
+only the rules whose anchors were found, plus the rules without anchors, are
+evaluated.
+
+Events are JSON objects, one per line (JSONL) or in one JSON array. Nested objects
+such as the Event.System / Event.EventData of EVTX exports (evtx_dump -o jsonl) are
+flattened: a field matches by its dotted path or by its own name.
+"""
+
+import fnmatch
+import ipaddress
+import json
+import re
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from typing import NamedTuple
+
+STRING_MODIFIERS = ("contains", "startswith", "endswith")
+COMPARE_MODIFIERS = {
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL}
+
+
+class RuleError(ValueError):
+    """A rule that cannot be compiled (invalid detection or an unsupported feature)."""
+
+
+class CompiledRule(NamedTuple):
+    path: str
+    rule_id: str | None
+    title: str
+    level: str | None
+    match: Callable[["Event"], bool]
+    anchors: frozenset | None  # None: evaluated for every event
+
+
+class Match(NamedTuple):
+    """A rule that matched an event: indexes into the Hunter's rules, and where the event came from."""
+
+    rule: int
+    source: str
+    line: int
+    event: dict
+
+
+class Event:
+    """One event, flattened, with its values converted to strings as the rules need them."""
+
+    __slots__ = ("raw", "fields", "_leaves", "_folded", "_text")
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self.fields: dict = {}
+        self._leaves: list = []
+        _flatten(raw, "", self.fields, self._leaves)
+        self._folded: dict = {}
+        self._text = None
+
+    def values(self, field: str) -> list | None:
+        """The field's values (a list for list-valued fields), or None if the event has no such field."""
+        if field not in self.fields:
+            return None
+        value = self.fields[field]
+        return value if isinstance(value, list) else [value]
+
+    def strings(self, field: str, cased: bool = False) -> list[str] | None:
+        if cased:
+            values = self.values(field)
+            return None if values is None else [_string(v) for v in values if v is not None]
+        if field not in self._folded:
+            values = self.values(field)
+            self._folded[field] = None if values is None else [_string(v).lower() for v in values if v is not None]
+        return self._folded[field]
+
+    def text(self) -> list[str]:
+        """Every value, lowercased: what keywords search and the prefilter scans."""
+        if self._text is None:
+            self._text = [
+                _string(v).lower()
+                for value in self._leaves
+                for v in (value if isinstance(value, list) else [value])
+                if v is not None
+            ]
+        return self._text
+
+
+def _flatten(obj: dict, prefix: str, out: dict, leaves: list) -> None:
+    """Fields by dotted path and, unless a shallower field has the same name, by their own name."""
+    for key, value in obj.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            if "#text" in value:  # XML element with attributes, as EVTX exports write them
+                out[path] = value["#text"]
+                out.setdefault(key, value["#text"])
+            _flatten(value, path, out, leaves)
+            continue
+        out[path] = value
+        out.setdefault(key, value)
+        leaves.append(value)
+
+
+def _string(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+# --- Values -------------------------------------------------------------------
+
+
+class _Pattern(NamedTuple):
+    """A string value after wildcards and modifiers: kind is equals/startswith/endswith/contains/regex."""
+
+    kind: str
+    literal: str  # the text for the first four kinds; a compiled regex for "regex"
+    anchor: str | None
+
+
+def _pattern(value, modifiers: set[str]) -> _Pattern:
+    cased = "cased" in modifiers
+    parts: list = []  # literal strings and "*"/"?" markers (None/False)
+    text = _string(value)
+    if "contains" in modifiers or "endswith" in modifiers:
+        parts.append(None)
+    literal = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text) and text[i + 1] in "*?\\":
+            literal.append(text[i + 1])
+            i += 2
+            continue
+        if ch in "*?" and isinstance(value, str):
+            parts.append("".join(literal))
+            parts.append(None if ch == "*" else False)
+            literal = []
+        else:
+            literal.append(ch)
+        i += 1
+    parts.append("".join(literal))
+    if "contains" in modifiers or "startswith" in modifiers:
+        parts.append(None)
+    parts = [p for p in parts if p != ""]
+    if not cased:
+        parts = [p.lower() if isinstance(p, str) else p for p in parts]
+    literals = [p for p in parts if isinstance(p, str)]
+    anchor = max(literals, key=len).lower() if literals else None  # the prefilter scans lowercased text
+
+    # collapse runs of "*"
+    squeezed = []
+    for p in parts:
+        if p is None and squeezed and squeezed[-1] is None:
+            continue
+        squeezed.append(p)
+    inner = [p for p in squeezed if p is not None]
+    if False not in squeezed and len(inner) <= 1:
+        body = inner[0] if inner else ""
+        lead, trail = squeezed[:1] == [None], squeezed[-1:] == [None]
+        kind = {
+            (False, False): "equals",
+            (False, True): "startswith",
+            (True, False): "endswith",
+            (True, True): "contains",
+        }[(lead, trail)]
+        return _Pattern(kind, body, anchor)
+    regex = "".join(".*" if p is None else "." if p is False else re.escape(p) for p in squeezed)
+    return _Pattern("regex", re.compile(regex, re.DOTALL), anchor)
+
+
+def _string_test(patterns: list[_Pattern]) -> Callable[[str], bool]:
+    """One test for an OR of patterns, grouped by kind so each kind costs one call."""
+    equal = frozenset(p.literal for p in patterns if p.kind == "equals")
+    starts = tuple(p.literal for p in patterns if p.kind == "startswith")
+    ends = tuple(p.literal for p in patterns if p.kind == "endswith")
+    contains = tuple(p.literal for p in patterns if p.kind == "contains")
+    regexes = tuple(p.literal for p in patterns if p.kind == "regex")
+
+    def test(s: str) -> bool:
+        return (
+            s in equal
+            or (starts and s.startswith(starts))
+            or (ends and s.endswith(ends))
+            or any(c in s for c in contains)
+            or any(r.fullmatch(s) for r in regexes)
+        )
+
+    return test
+
+
+def _value_test(value, modifiers: set[str]) -> Callable[[str], bool]:
+    """A test for one non-pattern value (re, cidr or a comparison), applied to each of the field's strings."""
+    if "re" in modifiers:
+        flags = 0
+        for flag, bit in REGEX_FLAGS.items():
+            if flag in modifiers:
+                flags |= bit
+        try:
+            return re.compile(_string(value), flags).search
+        except re.error as e:
+            raise RuleError(f"invalid regular expression {value!r}: {e}") from None
+    if "cidr" in modifiers:
+        try:
+            network = ipaddress.ip_network(_string(value), strict=False)
+        except ValueError as e:
+            raise RuleError(str(e)) from None
+
+        def in_network(s: str) -> bool:
+            try:
+                return ipaddress.ip_address(s) in network
+            except ValueError:
+                return False
+
+        return in_network
+    names = [m for m in modifiers if m in COMPARE_MODIFIERS]
+    if len(names) != 1:
+        raise RuleError("only one comparison modifier is allowed")
+    name = names[0]
+    compare = COMPARE_MODIFIERS[name]
+    try:
+        limit = float(value)
+    except (TypeError, ValueError):
+        raise RuleError(f"|{name} needs a number, not {value!r}") from None
+
+    def compare_number(s: str) -> bool:
+        try:
+            return compare(float(s), limit)
+        except ValueError:
+            return False
+
+    return compare_number
+
+
+def _best(anchor_sets: Iterable[frozenset | None]) -> frozenset | None:
+    """The anchors an AND should use: the smallest set, with the longest literals."""
+    candidates = [a for a in anchor_sets if a]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda a: (len(a), -min(len(x) for x in a)))
+
+
+def _union(anchor_sets: Iterable[frozenset | None]) -> frozenset | None:
+    union = set()
+    for anchors in anchor_sets:
+        if not anchors:
+            return None
+        union |= anchors
+    return frozenset(union) or None
+
+
+# --- Detection ----------------------------------------------------------------
+
+Node = tuple[Callable[[Event], bool], frozenset | None]
+
+
+def _field_item(key: str, value) -> Node:
+    field, *modifiers = key.split("|")
+    if not field:
+        raise RuleError(f"detection item without a field: {key!r}")
+    modifiers = set(modifiers)
+    known = {*STRING_MODIFIERS, *COMPARE_MODIFIERS, *REGEX_FLAGS, "all", "re", "cidr", "exists", "cased"}
+    unknown = sorted(modifiers - known)
+    if unknown:
+        raise RuleError(f"unsupported modifier |{unknown[0]}")
+    values = value if isinstance(value, list) else [value]
+    if not values:
+        raise RuleError(f"no values for {key!r}")
+    if "exists" in modifiers:
+        wanted = bool(values[0])
+        return (lambda event: (field in event.fields) == wanted), None
+    cased = "cased" in modifiers or "re" in modifiers
+    nulls = [v for v in values if v is None]
+    values = [v for v in values if v is not None]
+    tests: list[Callable[[str], bool]] = []
+    anchors: list[frozenset | None] = []
+    if "re" in modifiers or "cidr" in modifiers or modifiers & COMPARE_MODIFIERS.keys():
+        for v in values:
+            tests.append(_value_test(v, modifiers))
+            anchors.append(None)
+    elif "all" in modifiers:
+        for v in values:
+            pattern = _pattern(v, modifiers)
+            tests.append(_string_test([pattern]))
+            anchors.append(frozenset([pattern.anchor]) if pattern.anchor else None)
+    elif values:
+        patterns = [_pattern(v, modifiers) for v in values]
+        tests.append(_string_test(patterns))
+        anchors.append(_union(frozenset([p.anchor]) if p.anchor else None for p in patterns))
+
+    def null(event: Event) -> bool:
+        found = event.values(field)
+        return found is None or all(v is None or v == "" for v in found)
+
+    if "all" in modifiers:
+
+        def match(event: Event) -> bool:
+            strings = event.strings(field, cased)
+            return strings is not None and all(any(test(s) for s in strings) for test in tests)
+
+        return match, _best(anchors)
+
+    def match_any(event: Event) -> bool:
+        strings = event.strings(field, cased)
+        if strings is None:
+            return bool(nulls)
+        return any(test(s) for test in tests for s in strings) or (bool(nulls) and null(event))
+
+    return match_any, (None if nulls else _union(anchors))
+
+
+def _and(nodes: list[Node]) -> Node:
+    if len(nodes) == 1:
+        return nodes[0]
+    tests = [test for test, _ in nodes]
+    return (lambda event: all(test(event) for test in tests)), _best(a for _, a in nodes)
+
+
+def _or(nodes: list[Node]) -> Node:
+    if len(nodes) == 1:
+        return nodes[0]
+    tests = [test for test, _ in nodes]
+    return (lambda event: any(test(event) for test in tests)), _union(a for _, a in nodes)
+
+
+def _keywords(values: list) -> Node:
+    patterns = [_pattern(v, {"contains"}) for v in values]
+    test = _string_test(patterns)
+    return (lambda event: any(test(s) for s in event.text())), _union(
+        frozenset([p.anchor]) if p.anchor else None for p in patterns
+    )
+
+
+def _selection(name: str, definition) -> Node:
+    if isinstance(definition, dict):
+        if not definition:
+            raise RuleError(f"empty detection {name!r}")
+        return _and([_field_item(str(key), value) for key, value in definition.items()])
+    if isinstance(definition, list) and definition:
+        if all(isinstance(item, dict) for item in definition):
+            return _or([_selection(name, item) for item in definition])
+        if not any(isinstance(item, (dict, list)) for item in definition):
+            return _keywords(definition)
+    if isinstance(definition, (str, int)) and not isinstance(definition, bool):
+        return _keywords([definition])
+    raise RuleError(f"unsupported detection {name!r}")
+
+
+# --- Condition ----------------------------------------------------------------
+
+_TOKEN = re.compile(r"\s*(\(|\)|[^\s()]+)")
+
+
+class _Condition:
+    """Recursive-descent parser for a Sigma condition over compiled detections."""
+
+    def __init__(self, text: str, detections: dict[str, Node]):
+        if "|" in text:
+            raise RuleError("aggregation conditions are not supported")
+        self.tokens = _TOKEN.findall(text)
+        self.detections = detections
+        self.pos = 0
+
+    def parse(self) -> Node:
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise RuleError(f"unexpected {self.tokens[self.pos]!r} in condition")
+        return node
+
+    def _peek(self) -> str | None:
+        return self.tokens[self.pos].lower() if self.pos < len(self.tokens) else None
+
+    def _next(self) -> str:
+        if self.pos >= len(self.tokens):
+            raise RuleError("condition ends unexpectedly")
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def _or(self) -> Node:
+        nodes = [self._and()]
+        while self._peek() == "or":
+            self.pos += 1
+            nodes.append(self._and())
+        return _or(nodes)
+
+    def _and(self) -> Node:
+        nodes = [self._not()]
+        while self._peek() == "and":
+            self.pos += 1
+            nodes.append(self._not())
+        return _and(nodes)
+
+    def _not(self) -> Node:
+        if self._peek() == "not":
+            self.pos += 1
+            test, _ = self._not()
+            return (lambda event: not test(event)), None
+        return self._atom()
+
+    def _atom(self) -> Node:
+        token = self._next()
+        if token == "(":
+            node = self._or()
+            if self._next() != ")":
+                raise RuleError("unbalanced parentheses in condition")
+            return node
+        if token.lower() in ("1", "any", "all") and self._peek() == "of":
+            self.pos += 1
+            target = self._next()
+            if target.lower() == "them":
+                names = [n for n in self.detections if not n.startswith("_")]
+            else:
+                names = [n for n in self.detections if fnmatch.fnmatchcase(n, target)]
+            if not names:
+                raise RuleError(f"{target!r} matches no detection")
+            nodes = [self.detections[n] for n in names]
+            return _and(nodes) if token.lower() == "all" else _or(nodes)
+        if token not in self.detections:
+            raise RuleError(f"condition references unknown detection {token!r}")
+        return self.detections[token]
+
+
+def compile_rule(content: str, path: str) -> CompiledRule:
+    """Compile one rule's YAML; RuleError if it uses something hunt cannot evaluate."""
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    try:
+        documents = [doc for doc in yaml.load_all(content, Loader=loader) if doc is not None]
+    except yaml.YAMLError as e:
+        raise RuleError(f"invalid YAML: {e}") from None
+    if len(documents) != 1 or not isinstance(documents[0], dict):
+        raise RuleError("rule collections and correlation rules are not supported")
+    rule = documents[0]
+    detection = rule.get("detection")
+    if not isinstance(detection, dict) or "condition" not in detection:
+        raise RuleError("no detection condition")
+    detections = {
+        str(name): _selection(str(name), body) for name, body in detection.items() if name not in ("condition", "timeframe")
+    }
+    conditions = detection["condition"]
+    conditions = conditions if isinstance(conditions, list) else [conditions]
+    match, anchors = _or([_Condition(str(c), detections).parse() for c in conditions])
+    rule_id = str(rule["id"]) if rule.get("id") is not None else None
+    return CompiledRule(path, rule_id, str(rule.get("title") or path), rule.get("level"), match, anchors)
+
+
+# --- Prefilter ----------------------------------------------------------------
+
+
+class Prefilter:
+    """Aho-Corasick automaton over all rules' anchors; candidates() lists the rules worth evaluating."""
+
+    def __init__(self, rules: list[CompiledRule]):
+        self.always = [i for i, rule in enumerate(rules) if rule.anchors is None]
+        goto: list[dict] = [{}]
+        out: list[set] = [set()]
+        for index, rule in enumerate(rules):
+            for literal in rule.anchors or ():
+                state = 0
+                for ch in literal:
+                    if ch not in goto[state]:
+                        goto.append({})
+                        out.append(set())
+                        goto[state][ch] = len(goto) - 1
+                    state = goto[state][ch]
+                out[state].add(index)
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())  # depth 1: fail to the root
+        for state in queue:  # breadth-first, so a state's fail target is complete before it
+            for ch, child in goto[state].items():
+                queue.append(child)
+                target = fail[state]
+                while target and ch not in goto[target]:
+                    target = fail[target]
+                fail[child] = goto[target].get(ch, 0)
+                out[child] |= out[fail[child]]
+        self._goto = goto
+        self._fail = fail
+        self._out = [frozenset(s) for s in out]
+
+    def candidates(self, texts: list[str]) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(self.always)
+        if len(goto) == 1:
+            return found
+        for text in texts:
+            state = 0
+            for ch in text:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                if out[state]:
+                    found |= out[state]
+        return found
+
+
+class Hunter:
+    """Compiled rules plus their prefilter; counts how many rule evaluations the prefilter saved."""
+
+    def __init__(self, rules: list[CompiledRule]):
+        self.rules = rules
+        self.prefilter = Prefilter(rules)
+        self.events = 0
+        self.evaluated = 0
+
+    def match(self, raw: dict) -> list[int]:
+        """Indexes of the rules matching one event, in rule order."""
+        event = Event(raw)
+        self.events += 1
+        candidates = self.prefilter.candidates(event.text())
+        self.evaluated += len(candidates)
+        return [i for i in sorted(candidates) if self.rules[i].match(event)]
+
+    def skipped(self) -> float:
+        """Share of (rule, event) evaluations the prefilter avoided."""
+        total = self.events * len(self.rules)
+        return 1 - self.evaluated / total if total else 0.0
+
+    def hunt(self, events: Iterable[tuple[str, int, dict]]) -> Iterator[Match]:
+        for source, line, raw in events:
+            for index in self.match(raw):
+                yield Match(index, source, line, raw)
+
+
+# --- Events -------------------------------------------------------------------
+
+
+def iter_events(path: str, invalid: list[str] | None = None) -> Iterator[tuple[str, int, dict]]:
+    """
+    (path, line, event) for a JSONL file, a file holding one JSON array, or stdin
+    ("-"). Lines that are not JSON objects are skipped and noted in invalid.
+    """
+    if path == "-":
+        yield from _iter_lines("<stdin>", sys.stdin, invalid)
+        return
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(b"ElfFile"):
+        raise ValueError(f"{path} is a binary EVTX file; export it to JSONL first (e.g. evtx_dump -o jsonl)")
+    with open(path, encoding="utf-8-sig") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first == "[":
+            events = json.loads(first + f.read())
+            for number, event in enumerate(events, 1):
+                if isinstance(event, dict):
+                    yield path, number, event
+                elif invalid is not None:
+                    invalid.append(f"{path}:{number}")
+            return
+        f.seek(0)
+        yield from _iter_lines(path, f, invalid)
+
+
+def _iter_lines(name: str, lines, invalid: list[str] | None) -> Iterator[tuple[str, int, dict]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            event = None
+        if isinstance(event, dict):
+            yield name, number, event
+        elif invalid is not None:
+            invalid.append(f"{name}:{number}")
@@ -0,0 +1,296 @@
+"""
+SQLite index of rule metadata for selecting rules without opening every file.
+
+`sigmaforage index build -i DIR` records, per rule file, its id, title, tags,
+logsource, level, status and modified date together with the file's mtime, size
+and SHA-256. Rebuilds are incremental: a file whose mtime and size are unchanged
+is not opened, one whose content hash is unchanged is not parsed, and rows for
+files that disappeared from an indexed directory are dropped.
+
+Conversions with --tag / --logsource / --level refresh the index for their input
+the same way and convert only the selected files. Within one filter, repeated
+values are alternatives (--tag attack.t1071 --tag attack.t1090); different filters
+must all match. A tag also matches its sub-techniques (attack.t1071 matches
+attack.t1071.004).
+
+Rules inside archives (sigmaforge/archive.py) are indexed through update_entries
+under <absolute archive path>!<member>, with the member's mtime and size.
+"""
+
+import hashlib
+import os
+import sqlite3
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from .defaults import default_cache_dir
+
+# Bump when the schema or the extracted fields change; older indexes are rebuilt
+INDEX_FORMAT = 1
+
+LEVELS = ("informational", "low", "medium", "high", "critical")
+LOGSOURCE_FIELDS = ("product", "category", "service")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rules (
+    path TEXT PRIMARY KEY,
+    id TEXT,
+    title TEXT,
+    level TEXT,
+    status TEXT,
+    modified TEXT,
+    product TEXT,
+    category TEXT,
+    service TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT NOT NULL REFERENCES rules(path) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags(tag);
+CREATE INDEX IF NOT EXISTS tags_path ON tags(path);
+CREATE INDEX IF NOT EXISTS rules_level ON rules(level);
+"""
+
+
+class IndexStats(NamedTuple):
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+    errors: int
+
+
+class IndexEntry(NamedTuple):
+    """
+    One rule to index: a unique path, its modification time and size (compared to
+    skip unchanged rules), and a callable returning its content. read is None if the
+    rule no longer exists.
+    """
+
+    path: str
+    mtime_ns: int | None
+    size: int | None
+    read: Callable[[], bytes] | None
+
+
+class RuleSelection(NamedTuple):
+    """Filters for RuleIndex.select; empty filters match everything."""
+
+    tags: tuple[str, ...] = ()
+    logsource: tuple[tuple[str, str], ...] = ()
+    levels: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.tags or self.logsource or self.levels)
+
+
+def default_index_path() -> Path:
+    return default_cache_dir() / "index.sqlite3"
+
+
+def parse_level(spec: str) -> tuple[str, ...]:
+    """'high' -> (high,); 'high+' -> (high, critical); 'low,medium' -> (low, medium)."""
+    levels = []
+    for part in spec.lower().split(","):
+        part = part.strip()
+        name = part.rstrip("+")
+        if name not in LEVELS:
+            raise ValueError(f"Unknown level: {name}. Choose from: {', '.join(LEVELS)} (suffix + for 'or higher').")
+        levels.extend(LEVELS[LEVELS.index(name):] if part.endswith("+") else [name])
+    return tuple(dict.fromkeys(levels))
+
+
+def parse_logsource(spec: str) -> tuple[str, str]:
+    """'category=dns' -> ('category', 'dns')."""
+    field, sep, value = spec.partition("=")
+    field = field.strip().lower()
+    if not sep or field not in LOGSOURCE_FIELDS or not value.strip():
+        raise ValueError(f"Invalid logsource filter: {spec}. Use {'|'.join(LOGSOURCE_FIELDS)}=VALUE.")
+    return field, value.strip().lower()
+
+
+def _text(value) -> str | None:
+    """Field value as text (YAML parses dates into date objects)."""
+    return None if value is None else str(value)
+
+
+def rule_metadata(content: bytes) -> dict:
+    """Extract the indexed fields from a rule file (first rule document; global documents merged in)."""
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    merged: dict = {}
+    for doc in yaml.load_all(content, Loader=loader):
+        if not isinstance(doc, dict):
+            continue
+        if doc.get("action") == "global":
+            merged.update(doc)
+            continue
+        merged = {**merged, **doc, "logsource": {**(merged.get("logsource") or {}), **(doc.get("logsource") or {})}}
+        break
+    logsource = merged.get("logsource") if isinstance(merged.get("logsource"), dict) else {}
+    tags = merged.get("tags") if isinstance(merged.get("tags"), list) else []
+    return {
+        "id": _text(merged.get("id")),
+        "title": _text(merged.get("title")),
+        "level": _text(merged.get("level")).lower() if merged.get("level") else None,
+        "status": _text(merged.get("status")),
+        "modified": _text(merged.get("modified") or merged.get("date")),
+        **{field: _text(logsource.get(field)).lower() if logsource.get(field) else None for field in LOGSOURCE_FIELDS},
+        "tags": sorted({str(tag).lower() for tag in tags}),
+    }
+
+
+class RuleIndex:
+    """A rule metadata index in one SQLite file (default: <cache dir>/index.sqlite3)."""
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_FORMAT:
+            self.db.executescript("DROP TABLE IF EXISTS tags; DROP TABLE IF EXISTS rules;")
+            self.db.execute(f"PRAGMA user_version = {INDEX_FORMAT}")
+        self.db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, paths: Iterable[Path], roots: Iterable[Path] = ()) -> IndexStats:
+        """
+        Bring the index up to date for the given rule files. Rows under a directory
+        in roots whose file was not among paths are removed.
+        """
+
+        def entries():
+            for path in paths:
+                key = os.path.abspath(path)
+                try:
+                    st = os.stat(key)
+                except OSError:
+                    yield IndexEntry(key, None, None, None)
+                    continue
+                yield IndexEntry(key, st.st_mtime_ns, st.st_size, Path(key).read_bytes)
+
+        return self.update_entries(entries(), [os.path.join(os.path.abspath(root), "") for root in roots])
+
+    def update_entries(self, entries: Iterable["IndexEntry"], stale_prefixes: Iterable[str] = ()) -> IndexStats:
+        """
+        Like update, for rules that need not be files on disk (e.g. archive members).
+        Rows whose path starts with one of stale_prefixes and that were not among
+        entries are removed.
+        """
+        added = updated = removed = unchanged = errors = 0
+        known = {
+            row[0]: row[1:]
+            for row in self.db.execute("SELECT path, mtime_ns, size, sha256 FROM rules")
+        }
+        seen = set()
+        with self.db:
+            for key, mtime_ns, size, read in entries:
+                seen.add(key)
+                old = known.get(key)
+                if read is None:
+                    if old:
+                        self.db.execute("DELETE FROM rules WHERE path = ?", (key,))
+                        removed += 1
+                    continue
+                if old and old[0] == mtime_ns and old[1] == size:
+                    unchanged += 1
+                    continue
+                try:
+                    content = read()
+                except OSError:
+                    continue
+                digest = hashlib.sha256(content).hexdigest()
+                if old and old[2] == digest:
+                    self.db.execute("UPDATE rules SET mtime_ns = ?, size = ? WHERE path = ?", (mtime_ns, size, key))
+                    unchanged += 1
+                    continue
+                try:
+                    meta, error = rule_metadata(content), None
+                except Exception as e:  # unparsable YAML is indexed with no metadata, so it is never selected
+                    meta, error = {"tags": []}, str(e)
+                    errors += 1
+                self._store(key, mtime_ns, size, digest, meta, error)
+                if old:
+                    updated += 1
+                else:
+                    added += 1
+            for prefix in stale_prefixes:
+                stale = [p for p in known if p.startswith(prefix) and p not in seen]
+                self.db.executemany("DELETE FROM rules WHERE path = ?", [(p,) for p in stale])
+                removed += len(stale)
+        return IndexStats(added, updated, removed, unchanged, errors)
+
+    def _store(self, path: str, mtime_ns: int, size: int, digest: str, meta: dict, error: str | None) -> None:
+        self.db.execute("DELETE FROM rules WHERE path = ?", (path,))
+        self.db.execute(
+            "INSERT INTO rules (path, id, title, level, status, modified, product, category, service,"
+            " mtime_ns, size, sha256, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                meta.get("id"),
+                meta.get("title"),
+                meta.get("level"),
+                meta.get("status"),
+                meta.get("modified"),
+                meta.get("product"),
+                meta.get("category"),
+                meta.get("service"),
+                mtime_ns,
+                size,
+                digest,
+                error,
+            ),
+        )
+        self.db.executemany("INSERT INTO tags (path, tag) VALUES (?, ?)", [(path, tag) for tag in meta["tags"]])
+
+    def select(self, selection: RuleSelection, paths: Iterable[Path] | None = None) -> list[dict]:
+        """Rows (as dicts, path absolute) matching selection, restricted to paths if given, sorted by path."""
+        where, params = [], []
+        if selection.tags:
+            clauses = " OR ".join("tag = ? OR tag LIKE ? ESCAPE '\\'" for _ in selection.tags)
+            where.append(f"path IN (SELECT path FROM tags WHERE {clauses})")
+            for tag in selection.tags:
+                tag = tag.lower()
+                escaped = tag.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params += [tag, escaped + ".%"]
+        by_field: dict[str, list[str]] = {}
+        for field, value in selection.logsource:
+            by_field.setdefault(field, []).append(value)
+        for field, values in by_field.items():
+            where.append(f"{field} IN ({', '.join('?' * len(values))})")
+            params += values
+        if selection.levels:
+            where.append(f"level IN ({', '.join('?' * len(selection.levels))})")
+            params += list(selection.levels)
+        if paths is not None:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (path TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM wanted")
+            self.db.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((os.path.abspath(p),) for p in paths))
+            where.append("path IN (SELECT path FROM wanted)")
+        self.db.row_factory = sqlite3.Row
+        try:
+            rows = self.db.execute(
+                "SELECT * FROM rules" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY path", params
+            ).fetchall()
+        finally:
+            self.db.row_factory = None
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
@@ -0,0 +1,191 @@
+"""
+Oversized value lists moved out of queries (--lookup-threshold).
+
+IOC rules with hundreds of domains or hashes convert to huge inline lists that are
+slow to evaluate and can exceed a platform's query length limit. With
+--lookup-threshold N, every value list with more than N values is written to a
+side file in --lookup-dir and the query references that file instead:
+
+    Splunk   f IN (...)   ->  [| inputlookup sigma_list_<hash>.csv | rename value AS f | fields f]
+                              (a lookup CSV with a `value` column; the subsearch
+                              expands to f="v1" OR f="v2" ..., wildcards included;
+                              `| format` is added for the fields query and search,
+                              whose subsearch values Splunk inserts as raw terms)
+    KQL      f in~ (...)  ->  f in~ ((_GetWatchlist('sigma_list_<hash>') | project SearchKey))
+                              (a Sentinel watchlist CSV; create it with `value` as its
+                              search key)
+    Elastic  f:(a OR b)   ->  a Query DSL query with a terms lookup on the document
+                              sigma_list_<hash> in the LOOKUP_INDEX index, which holds
+                              {"values": [...]} (the <hash>.json file); the rest of the
+                              query stays query_string clauses
+
+Files are named after a hash of their values, so identical lists (in any order, in
+any rule) share one file, and a file is only written once. Lists that a file cannot
+represent are kept inline: Splunk values with escaped wildcards, Lucene values with
+wildcards, phrases or regexes (terms lookups match exact terms), and KQL operators
+other than in/in~ (contains/endswith chains have no set form, so e.g. the KQL of
+net_dns_external_service_interaction_domains keeps its endswith chain).
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+from .optimize import Group, KustoDialect, LuceneDialect, Not, SplunkDialect, Term, Unsupported, map_expressions, render
+
+LOOKUP_PREFIX = "sigma_list_"
+LOOKUP_INDEX = "sigma-lists"
+# Splunk inserts the values of a subsearch's query/search field as raw search terms
+SPLUNK_RAW_FIELDS = frozenset({"query", "search"})
+
+
+def lookup_name(values: list[str]) -> str:
+    digest = hashlib.sha256("\n".join(sorted(set(values))).encode("utf-8")).hexdigest()
+    return f"{LOOKUP_PREFIX}{digest[:16]}"
+
+
+def _splunk_value(raw: str) -> str | None:
+    if not raw.startswith('"'):
+        return raw
+    inner, out, i = raw[1:-1], [], 0
+    while i < len(inner):
+        if inner[i] == "\\" and i + 1 < len(inner):
+            if inner[i + 1] == "*":
+                return None  # a literal `*` cannot be expressed in a subsearch result
+            out.append(inner[i + 1])
+            i += 2
+            continue
+        out.append(inner[i])
+        i += 1
+    return "".join(out)
+
+
+def _lucene_value(raw: str) -> str | None:
+    if raw[:1] in ('"', "/"):
+        return None
+    out, i = [], 0
+    while i < len(raw):
+        if raw[i] == "\\" and i + 1 < len(raw):
+            out.append(raw[i + 1])
+            i += 2
+            continue
+        if raw[i] in "*?":
+            return None
+        out.append(raw[i])
+        i += 1
+    return "".join(out)
+
+
+def _unescape_field(field: str) -> str:
+    return _lucene_value(field) or field
+
+
+class LookupWriter:
+    """Rewrites queries for one run, writing each distinct list to directory once."""
+
+    def __init__(self, directory: str | os.PathLike, threshold: int):
+        if threshold < 1:
+            raise ValueError("the lookup threshold must be at least 1")
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.written: list[Path] = []
+        self._known: set[str] = set()
+
+    def rewrite(self, query: str, backend_id: str) -> str:
+        """query with its oversized lists replaced by lookup references (files are written as needed)."""
+        return map_expressions(query, backend_id, self._rewrite_expression)
+
+    def _rewrite_expression(self, text: str, dialect) -> str:
+        try:
+            tree = dialect.parse(text)
+        except Unsupported:
+            return text
+        lookups = {}  # id(Term) -> (field, lookup name)
+        for term in _terms(tree):
+            if len(term.values) > self.threshold:
+                self._externalize(term, dialect, lookups)
+        if not lookups:
+            return text
+        if isinstance(dialect, LuceneDialect):
+            return json.dumps(_dsl(tree, lookups), ensure_ascii=False)
+        return render(tree, dialect)
+
+    def _externalize(self, term: Term, dialect, lookups: dict) -> None:
+        if isinstance(dialect, SplunkDialect):
+            if term.op != "in":
+                return
+            values = [_splunk_value(v) for v in term.values]
+        elif isinstance(dialect, KustoDialect):
+            if term.op.lstrip("!") not in ("in", "in~"):
+                return
+            values = [KustoDialect.literal(v) for v in term.values]
+        else:
+            if term.op != "in":
+                return
+            values = [_lucene_value(v) for v in term.values]
+        if any(v is None for v in values):
+            return
+        name = lookup_name(values)
+        if isinstance(dialect, SplunkDialect):
+            format_ = ""
+            if term.field in SPLUNK_RAW_FIELDS:
+                if any('"' in v or "\\" in v for v in values):
+                    return  # `format` does not escape them
+                format_ = " | format"
+            self._write_csv(name, values)
+            term.text = f"[| inputlookup {name}.csv | rename value AS {term.field} | fields {term.field}{format_}]"
+        elif isinstance(dialect, KustoDialect):
+            self._write_csv(name, values)
+            term.text = f"{term.field} {term.op} ((_GetWatchlist('{name}') | project SearchKey))"
+        else:
+            self._write(f"{name}.json", json.dumps({"values": sorted(set(values))}, ensure_ascii=False, indent=1) + "\n")
+        lookups[id(term)] = (_unescape_field(term.field), name)
+
+    def _write_csv(self, name: str, values: list[str]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(["value"])
+        writer.writerows([v] for v in sorted(set(values)))
+        self._write(f"{name}.csv", buffer.getvalue())
+
+    def _write(self, filename: str, text: str) -> None:
+        """Write a lookup file once per run; content-addressed, so an existing file is already right."""
+        if filename in self._known:
+            return
+        self._known.add(filename)
+        path = self.directory / filename
+        if path.is_file():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{filename}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+        self.written.append(path)
+
+
+def _terms(node):
+    if isinstance(node, Not):
+        yield from _terms(node.child)
+    elif isinstance(node, Group):
+        for child in node.children:
+            yield from _terms(child)
+    else:
+        yield node
+
+
+def _dsl(node, lookups: dict) -> dict:
+    """Query DSL for a parsed Lucene query, with terms lookups for the externalized lists."""
+    if isinstance(node, Not):
+        return {"bool": {"must_not": [_dsl(node.child, lookups)]}}
+    if isinstance(node, Group):
+        children = [_dsl(child, lookups) for child in node.children]
+        if node.op == "and":
+            return {"bool": {"filter": children}}
+        return {"bool": {"should": children, "minimum_should_match": 1}}
+    if id(node) in lookups:
+        field, name = lookups[id(node)]
+        return {"terms": {field: {"index": LOOKUP_INDEX, "id": name, "path": "values"}}}
+    return {"query_string": {"query": node.text}}
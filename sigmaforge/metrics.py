@@ -0,0 +1,162 @@
+"""
+Per-stage conversion timings for --timings and --metrics-out.
+
+Workers already report cumulative per-stage seconds in their counter deltas
+(see batch.cache_counters); a StageTimings collector is only created when timings
+were asked for, so a normal run does no extra bookkeeping. Stages:
+
+    read        reading the rule file (once per rule, reported under SIEM "*")
+    cache       result cache lookup
+    setup       plugin discovery, pipeline resolution and backend construction
+                (backend cache misses only)
+    parse       YAML parsing and rule validation (in-process engine, once per rule)
+    backend     pipeline application and query generation (in-process engine)
+    subprocess  sigma-cli child process (subprocess engine)
+    optimize    --optimize rewrite passes
+    total       whole conversion as seen by the worker
+    write       writing output, sampled per written query in every output format
+                (once for all searches with --consolidate)
+
+A stage that did not run for a conversion (e.g. parse on a result cache hit) is
+not sampled, so percentiles describe the conversions where it did run.
+"""
+
+import json
+import math
+import os
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+STAGES = ("read", "cache", "setup", "parse", "backend", "subprocess", "optimize", "total", "write")
+ALL_SIEMS = "*"
+
+# Counter keys reported by workers -> stage names
+_COUNTER_STAGES = {
+    "cache_seconds": "cache",
+    "setup_seconds": "setup",
+    "parse_seconds": "parse",
+    "backend_seconds": "backend",
+    "subprocess_seconds": "subprocess",
+    "optimize_seconds": "optimize",
+    "convert_seconds": "total",
+}
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class StageTimings:
+    """Collects per-conversion stage durations (seconds) keyed by (SIEM, stage)."""
+
+    def __init__(self):
+        self.samples: dict[tuple[str, str], list[float]] = defaultdict(list)
+        self.results: dict[tuple[str, bool], int] = defaultdict(int)
+
+    def record(self, siem_id: str, stage: str, seconds: float) -> None:
+        self.samples[(siem_id, stage)].append(seconds)
+
+    def record_conversion(self, siem_id: str, ok: bool, counters) -> None:
+        """Record one conversion result from its worker counter delta."""
+        self.results[(siem_id, ok)] += 1
+        for key, stage in _COUNTER_STAGES.items():
+            if counters.get(key, 0) > 0:
+                self.record(siem_id, stage, counters[key])
+
+    def summary(self) -> list[dict]:
+        """Rows of {siem, stage, count, sum, p50, p95, max} (seconds), per SIEM and across all SIEMs."""
+        by_stage: dict[str, list[float]] = defaultdict(list)
+        rows = []
+        for (siem_id, stage), values in sorted(self.samples.items(), key=lambda kv: (kv[0][0], STAGES.index(kv[0][1]))):
+            by_stage[stage].extend(values)
+            if siem_id != ALL_SIEMS:
+                rows.append(self._row(siem_id, stage, values))
+        for stage in STAGES:
+            if by_stage[stage]:
+                rows.append(self._row(ALL_SIEMS, stage, by_stage[stage]))
+        return rows
+
+    @staticmethod
+    def _row(siem_id: str, stage: str, values: list[float]) -> dict:
+        ordered = sorted(values)
+        return {
+            "siem": siem_id,
+            "stage": stage,
+            "count": len(ordered),
+            "sum": sum(ordered),
+            "p50": percentile(ordered, 0.50),
+            "p95": percentile(ordered, 0.95),
+            "max": ordered[-1],
+        }
+
+    def format_table(self) -> str:
+        lines = [f"{'SIEM':<20} {'stage':<11} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}", "-" * 70]
+        for row in self.summary():
+            lines.append(
+                f"{row['siem']:<20} {row['stage']:<11} {row['count']:>7} "
+                f"{1000 * row['p50']:>9.2f} {1000 * row['p95']:>9.2f} {1000 * row['max']:>9.2f}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self, counters=None) -> str:
+        payload = {
+            "stages": self.summary(),
+            "conversions": [
+                {"siem": siem_id, "ok": ok, "count": count} for (siem_id, ok), count in sorted(self.results.items())
+            ],
+            "counters": {k: v for k, v in sorted((counters or {}).items()) if not k.endswith("_seconds")},
+        }
+        return json.dumps(payload, indent=2)
+
+    def to_prometheus(self, counters=None) -> str:
+        """Prometheus text exposition format (for the node exporter textfile collector)."""
+        counters = counters or {}
+        lines = [
+            "# HELP sigmaforge_stage_seconds Duration of a conversion stage.",
+            "# TYPE sigmaforge_stage_seconds summary",
+        ]
+        for row in self.summary():
+            labels = f'siem="{row["siem"]}",stage="{row["stage"]}"'
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95")):
+                lines.append(f'sigmaforge_stage_seconds{{{labels},quantile="{quantile}"}} {row[key]:.6f}')
+            lines.append(f"sigmaforge_stage_seconds_sum{{{labels}}} {row['sum']:.6f}")
+            lines.append(f"sigmaforge_stage_seconds_count{{{labels}}} {row['count']}")
+        lines += [
+            "# HELP sigmaforge_conversions_total Conversions by SIEM and outcome.",
+            "# TYPE sigmaforge_conversions_total counter",
+        ]
+        for (siem_id, ok), count in sorted(self.results.items()):
+            lines.append(f'sigmaforge_conversions_total{{siem="{siem_id}",result="{"ok" if ok else "error"}"}} {count}')
+        for outcome in ("hits", "misses"):
+            samples = [
+                f'sigmaforge_cache_{outcome}_total{{cache="{cache}"}} {counters[f"{cache}_{outcome}"]}'
+                for cache in ("backend", "parse", "result")
+                if f"{cache}_{outcome}" in counters
+            ]
+            if samples:
+                lines += [
+                    f"# HELP sigmaforge_cache_{outcome}_total Cache {outcome} by cache.",
+                    f"# TYPE sigmaforge_cache_{outcome}_total counter",
+                    *samples,
+                ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, fmt: str | None = None, counters=None) -> None:
+        """
+        Write metrics atomically (so a textfile collector never reads a partial file).
+        fmt defaults to prometheus for *.prom files and json otherwise.
+        """
+        fmt = fmt or ("prometheus" if path.endswith(".prom") else "json")
+        text = self.to_prometheus(counters) if fmt == "prometheus" else self.to_json(counters) + "\n"
+        target = Path(path)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
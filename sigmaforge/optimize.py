@@ -0,0 +1,846 @@
+"""
+Query optimizer (--optimize): rewrite converted queries so the SIEM evaluates them
+more cheaply, without changing what they match.
+
+The backend's output is parsed into a small boolean tree (terms joined by AND, OR
+and NOT) for its query language, rewritten and printed back. Passes:
+
+    sets       OR chains over one field become a single set-membership term:
+               Splunk `f IN (...)`, KQL `f in~ (...)`, Lucene `f:(a OR b)`
+    redundant  alternatives of an OR that another alternative already covers are
+               dropped (`*paste.ee/*` covers `*.paste.ee/r/*`, `*` covers all),
+               as are duplicates; repeated wildcards are squeezed (`**` -> `*`)
+    order      within an AND, cheap filters come first: indexed fields (Splunk
+               index, sourcetype, source, host), exact matches, prefixes, then
+               substring and suffix matches, regexes and negations
+
+KQL has no substring-set operator: has_any matches whole terms, not substrings,
+so only equality chains become sets there. Coverage is only decided for patterns
+whose wildcards are at the ends (exact, prefix, suffix, substring); anything else
+is kept. The parsers are deliberately strict: a query with constructs they do not
+know (other pipe commands, unusual quoting) is returned exactly as the backend
+wrote it, and so is a query that no pass changes.
+
+Supported backends: splunk, kusto, and the Lucene backends (elasticsearch,
+opensearch, lucene). Others are returned unchanged.
+"""
+
+import re
+from typing import NamedTuple
+
+# Splunk fields that live in the index itself rather than being extracted at search time
+SPLUNK_INDEXED_FIELDS = frozenset({"index", "sourcetype", "source", "host", "splunk_server"})
+
+# Order ranks: lower runs first
+RANK_INDEXED, RANK_EXACT, RANK_PREFIX, RANK_SCAN, RANK_REGEX, RANK_NEGATION = range(6)
+
+
+class Unsupported(ValueError):
+    """The query uses syntax the optimizer does not parse; it is left unchanged."""
+
+
+class Pattern(NamedTuple):
+    """What a value matches: kind is exact, prefix, suffix or substring."""
+
+    kind: str
+    literal: str
+
+
+def covers(a: Pattern, b: Pattern) -> bool:
+    """True if every string matched by b is also matched by a."""
+    if b.kind == "exact" and not b.literal:
+        return a == b  # empty values are special in every SIEM; only an identical one covers them
+    if a.kind == "substring":
+        return a.literal in b.literal
+    if a.kind == "prefix":
+        return b.kind in ("prefix", "exact") and b.literal.startswith(a.literal)
+    if a.kind == "suffix":
+        return b.kind in ("suffix", "exact") and b.literal.endswith(a.literal)
+    return a == b
+
+
+def classify(chars: list) -> Pattern | None:
+    """Pattern for a decoded value: characters, with None for an unescaped `*`."""
+    squeezed = []
+    for c in chars:
+        if c is None and squeezed and squeezed[-1] is None:
+            continue
+        squeezed.append(c)
+    lead = bool(squeezed) and squeezed[0] is None
+    trail = len(squeezed) > lead and squeezed[-1] is None
+    inner = squeezed[lead:len(squeezed) - trail] if trail else squeezed[lead:]
+    if None in inner:
+        return None  # wildcard in the middle
+    literal = "".join(inner)
+    if lead and not inner:
+        return Pattern("substring", "")  # `*`: anything
+    kind = {(False, False): "exact", (False, True): "prefix", (True, False): "suffix", (True, True): "substring"}
+    return Pattern(kind[(lead, trail)], literal)
+
+
+class Alternative(NamedTuple):
+    """One value of an OR over a field: the operator it is matched with, and its raw text."""
+
+    pattern: Pattern | None
+    op: str
+    raw: str
+
+
+# Parse tree -----------------------------------------------------------------------
+
+
+class Term:
+    """A leaf: field op value(s). op is None for terms that are kept verbatim."""
+
+    __slots__ = ("text", "field", "op", "values", "parens")
+
+    def __init__(self, text: str, field: str | None = None, op: str | None = None, values=(), parens: bool = False):
+        self.text = text
+        self.field = field
+        self.op = op
+        self.values = list(values)
+        self.parens = parens
+
+
+class Group:
+    __slots__ = ("op", "children", "parens")
+
+    def __init__(self, op: str, children: list, parens: bool = False):
+        self.op = op
+        self.children = children
+        self.parens = parens
+
+
+class Not:
+    __slots__ = ("child", "parens")
+
+    def __init__(self, child, parens: bool = False):
+        self.child = child
+        self.parens = parens
+
+
+class Parser:
+    """
+    Recursive descent over (kind, value) tokens: "(", ")", "and", "or", "not" and
+    ("term", Term). or_tighter selects Splunk's precedence (OR binds tighter than
+    AND); implicit_and allows AND to be left out (Splunk); strict rejects a mix of
+    AND and OR without parentheses (Lucene, whose mixed precedence is not boolean).
+    """
+
+    def __init__(self, tokens: list, or_tighter=False, implicit_and=False, strict=False):
+        self.tokens = tokens
+        self.pos = 0
+        self.or_tighter = or_tighter
+        self.implicit_and = implicit_and
+        self.strict = strict
+
+    def parse(self):
+        if not self.tokens:
+            raise Unsupported("empty query")
+        node = self._level()
+        if self.pos != len(self.tokens):
+            raise Unsupported("unbalanced parentheses")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def _level(self):
+        operands, ops = [self._unary()], []
+        while self._peek() not in (None, ")"):
+            if self._peek() in ("and", "or"):
+                ops.append(self.tokens[self.pos][0])
+                self.pos += 1
+            elif self.implicit_and:
+                ops.append("and")
+            else:
+                raise Unsupported("missing operator")
+            operands.append(self._unary())
+        if not ops:
+            return operands[0]
+        if self.strict and len(set(ops)) > 1:
+            raise Unsupported("AND and OR mixed without parentheses")
+        tight, loose = ("or", "and") if self.or_tighter else ("and", "or")
+        chains = [[operands[0]]]
+        for op, operand in zip(ops, operands[1:]):
+            if op == tight:
+                chains[-1].append(operand)
+            else:
+                chains.append([operand])
+        parts = [chain[0] if len(chain) == 1 else Group(tight, chain) for chain in chains]
+        return parts[0] if len(parts) == 1 else Group(loose, parts)
+
+    def _unary(self):
+        kind = self._peek()
+        if kind is None:
+            raise Unsupported("unexpected end of query")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        if kind == "not":
+            return Not(self._unary())
+        if kind == "(":
+            node = self._level()
+            if self._peek() != ")":
+                raise Unsupported("unbalanced parentheses")
+            self.pos += 1
+            node.parens = True
+            return node
+        if kind == "term":
+            return token[1]
+        raise Unsupported(f"unexpected {kind!r}")
+
+
+# Scanning helpers -------------------------------------------------------------------
+
+
+def _quoted_end(text: str, i: int, quote: str = '"') -> int:
+    """Index just past the string literal starting at text[i] (backslash escapes)."""
+    j = i + 1
+    while j < len(text):
+        if text[j] == "\\":
+            j += 2
+            continue
+        if text[j] == quote:
+            return j + 1
+        j += 1
+    raise Unsupported("unterminated string")
+
+
+def _decode(raw: str, wildcard: str | None, special: str = "") -> list | None:
+    """
+    Characters of a raw value, with None for each unescaped wildcard character.
+    Returns None if the value contains an unescaped special character or an
+    escaped wildcard (neither can be reasoned about as a plain pattern).
+    """
+    chars: list = []
+    i = 0
+    while i < len(raw):
+        c = raw[i]
+        if c == "\\" and i + 1 < len(raw):
+            if raw[i + 1] == wildcard:
+                return None
+            chars.append(raw[i + 1])
+            i += 2
+            continue
+        if c == wildcard:
+            chars.append(None)
+        elif c in special:
+            return None
+        else:
+            chars.append(c)
+        i += 1
+    return chars
+
+
+def _squeeze(raw: str, wildcard: str = "*") -> str:
+    """Collapse runs of unescaped wildcards (`**` -> `*`)."""
+    out = []
+    i = 0
+    while i < len(raw):
+        c = raw[i]
+        if c == "\\" and i + 1 < len(raw):
+            out.append(raw[i:i + 2])
+            i += 2
+            continue
+        if not (c == wildcard and out and out[-1] == wildcard):
+            out.append(c)
+        i += 1
+    return "".join(out)
+
+
+def _rank_pattern(pattern: Pattern | None) -> int:
+    if pattern is None:
+        return RANK_SCAN
+    return {"exact": RANK_EXACT, "prefix": RANK_PREFIX}.get(pattern.kind, RANK_SCAN)
+
+
+# Dialects ---------------------------------------------------------------------------
+
+
+class Dialect:
+    """Query-language hooks used by the generic passes."""
+
+    case_insensitive = True
+    or_tighter = False
+    implicit_and = False
+    strict = False
+    not_parens = False  # render_not() brackets its operand itself
+    and_sep = " and "
+    or_sep = " or "
+
+    def tokens(self, text: str) -> list:
+        raise NotImplementedError
+
+    def set_key(self, term: Term):
+        """Key under which terms of one OR may be merged, or None."""
+        return None
+
+    def alternatives(self, term: Term) -> list[Alternative]:
+        raise NotImplementedError
+
+    def render_alternatives(self, field: str, key, alternatives: list[Alternative]) -> list[Term]:
+        raise NotImplementedError
+
+    def squeeze(self, term: Term) -> bool:
+        """Squeeze repeated wildcards in term's values in place; True if anything changed."""
+        return False
+
+    def rank(self, term: Term) -> int:
+        return RANK_SCAN
+
+    def render_not(self, child: str) -> str:
+        return f"NOT {child}"
+
+    def parse(self, text: str):
+        return Parser(self.tokens(text), self.or_tighter, self.implicit_and, self.strict).parse()
+
+
+class SplunkDialect(Dialect):
+    or_tighter = True
+    implicit_and = True
+    and_sep = " "
+    or_sep = " OR "
+
+    _KEYWORD = re.compile(r"(AND|OR|NOT)(?=[\s()]|$)")
+    _BARE = re.compile(r"[^\s()=!<>\",|]+")
+    _OP = re.compile(r"!=|<=|>=|=|<|>")
+    _IN = re.compile(r"\s+IN\s*\(")
+
+    def _atom(self, text: str, i: int) -> int:
+        if i < len(text) and text[i] == '"':
+            return _quoted_end(text, i)
+        m = self._BARE.match(text, i)
+        if not m:
+            raise Unsupported(f"unexpected character at {i}")
+        return m.end()
+
+    def tokens(self, text: str) -> list:
+        tokens = []
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if c.isspace():
+                i += 1
+                continue
+            if c in "()":
+                tokens.append((c, None))
+                i += 1
+                continue
+            m = self._KEYWORD.match(text, i)
+            if m:
+                tokens.append((m.group(1).lower(), None))
+                i = m.end()
+                continue
+            start = i
+            i = self._atom(text, i)
+            field = text[start:i]
+            m_in = self._IN.match(text, i)
+            m_op = self._OP.match(text, i)
+            if m_in:
+                i = m_in.end()
+                values = []
+                while True:
+                    while i < len(text) and text[i].isspace():
+                        i += 1
+                    value_start = i
+                    i = self._atom(text, i)
+                    values.append(text[value_start:i])
+                    while i < len(text) and text[i].isspace():
+                        i += 1
+                    if i < len(text) and text[i] == ",":
+                        i += 1
+                        continue
+                    if i < len(text) and text[i] == ")":
+                        i += 1
+                        break
+                    raise Unsupported("malformed IN list")
+                tokens.append(("term", Term(text[start:i], field, "in", values)))
+            elif m_op:
+                i = self._atom(text, m_op.end())
+                tokens.append(("term", Term(text[start:i], field, m_op.group(), [text[m_op.end():i]])))
+            else:
+                tokens.append(("term", Term(field)))  # bare keyword search
+        return tokens
+
+    @staticmethod
+    def pattern(raw: str) -> Pattern | None:
+        if raw.startswith('"'):
+            raw = raw[1:-1]
+        chars = _decode(raw, "*")
+        return classify(chars) if chars is not None else None
+
+    def set_key(self, term: Term):
+        return (term.field,) if term.op in ("=", "in") else None
+
+    def alternatives(self, term: Term) -> list[Alternative]:
+        return [Alternative(self.pattern(raw), "=", raw) for raw in term.values]
+
+    def render_alternatives(self, field: str, key, alternatives: list[Alternative]) -> list[Term]:
+        values = [a.raw for a in alternatives]
+        if len(values) == 1:
+            return [Term(f"{field}={values[0]}", field, "=", values)]
+        return [Term(f"{field} IN ({', '.join(values)})", field, "in", values)]
+
+    def squeeze(self, term: Term) -> bool:
+        if term.op not in ("=", "in"):
+            return False
+        values = [_squeeze(v) for v in term.values]
+        if values == term.values:
+            return False
+        rendered = self.render_alternatives(term.field, None, [Alternative(None, "=", v) for v in values])[0]
+        term.text, term.op, term.values = rendered.text, rendered.op, rendered.values
+        return True
+
+    def rank(self, term: Term) -> int:
+        if term.field and term.field.strip('"').lower() in SPLUNK_INDEXED_FIELDS:
+            return RANK_INDEXED
+        if term.op not in ("=", "in"):
+            return RANK_SCAN
+        return max(_rank_pattern(self.pattern(v)) for v in term.values)
+
+
+class KustoDialect(Dialect):
+    not_parens = True
+    _WORD = re.compile(r"(and|or)(?=[\s(]|$)")
+    _NOT = re.compile(r"not\s*(?=\()")
+    _FIELD = re.compile(r"[A-Za-z_][\w]*")
+    _OP = re.compile(
+        r"\s+(matches regex|!in~|in~|!in|in|=~|==|!=|!~|"
+        r"!?(?:contains|startswith|endswith|has_any|has_all|hasprefix|hassuffix|has)(?:_cs)?|>=|<=|>|<)\s*"
+    )
+    _BARE = re.compile(r"[^\s(),]+")
+    # op -> (set class, pattern kind)
+    _SETS = {
+        "=~": ("ci", "exact"),
+        "in~": ("ci", "exact"),
+        "contains": ("ci", "substring"),
+        "startswith": ("ci", "prefix"),
+        "endswith": ("ci", "suffix"),
+        "==": ("cs", "exact"),
+        "in": ("cs", "exact"),
+    }
+    _RANKS = {
+        "=~": RANK_EXACT, "==": RANK_EXACT, "in~": RANK_EXACT, "in": RANK_EXACT, "!=": RANK_EXACT, "!~": RANK_EXACT,
+        "has": RANK_EXACT, "has_cs": RANK_EXACT, "has_any": RANK_EXACT, "has_all": RANK_EXACT,
+        "startswith": RANK_PREFIX, "startswith_cs": RANK_PREFIX, "hasprefix": RANK_PREFIX,
+        "matches regex": RANK_REGEX,
+    }
+
+    def _field(self, text: str, i: int) -> int:
+        if text.startswith("'", i):
+            end = text.find("'", i + 1)
+            if end <= i + 1:
+                raise Unsupported("malformed quoted field")
+            return end + 1
+        m = self._FIELD.match(text, i)
+        if not m:
+            raise Unsupported(f"unexpected character at {i}")
+        return m.end()
+
+    def _value(self, text: str, i: int) -> int:
+        if text.startswith('@"', i):
+            return _quoted_end(text, i + 1)
+        if i < len(text) and text[i] in "\"'":
+            return _quoted_end(text, i, text[i])
+        m = self._BARE.match(text, i)
+        if not m:
+            raise Unsupported(f"missing value at {i}")
+        return m.end()
+
+    def _call(self, text: str, i: int) -> int:
+        """Index past a balanced (...) starting at text[i]."""
+        depth = 0
+        while i < len(text):
+            c = text[i]
+            if c in "\"'":
+                i = _quoted_end(text, i, c)
+                continue
+            depth += c == "("
+            depth -= c == ")"
+            i += 1
+            if depth == 0:
+                return i
+        raise Unsupported("unbalanced parentheses")
+
+    def tokens(self, text: str) -> list:
+        tokens = []
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if c.isspace():
+                i += 1
+                continue
+            if c in "()":
+                tokens.append((c, None))
+                i += 1
+                continue
+            for kind, regex in (("not", self._NOT), ("word", self._WORD)):
+                m = regex.match(text, i)
+                if m:
+                    tokens.append((m.group(1) if kind == "word" else "not", None))
+                    i = m.end()
+                    break
+            else:
+                start = i
+                i = self._field(text, i)
+                if text.startswith("(", i):  # function call, e.g. isnull(field)
+                    i = self._call(text, i)
+                    tokens.append(("term", Term(text[start:i])))
+                    continue
+                m = self._OP.match(text, i)
+                if not m:
+                    raise Unsupported(f"missing operator at {i}")
+                field, op = text[start:i], m.group(1)
+                i = m.end()
+                if op in ("in~", "in", "!in~", "!in"):
+                    if not text.startswith("(", i):
+                        raise Unsupported("malformed in list")
+                    i += 1
+                    values = []
+                    while True:
+                        while i < len(text) and text[i].isspace():
+                            i += 1
+                        value_start = i
+                        i = self._value(text, i)
+                        values.append(text[value_start:i])
+                        while i < len(text) and text[i].isspace():
+                            i += 1
+                        if text.startswith(",", i):
+                            i += 1
+                            continue
+                        if text.startswith(")", i):
+                            i += 1
+                            break
+                        raise Unsupported("malformed in list")
+                else:
+                    value_start = i
+                    i = self._value(text, i)
+                    values = [text[value_start:i]]
+                tokens.append(("term", Term(text[start:i], field, op, values)))
+        return tokens
+
+    @staticmethod
+    def literal(raw: str) -> str | None:
+        if raw.startswith('@"'):
+            return raw[2:-1].replace('""', '"')
+        if raw[:1] not in ("'", '"'):
+            return None
+        chars = _decode(raw[1:-1], None)
+        return "".join(chars) if chars is not None else None
+
+    def set_key(self, term: Term):
+        entry = self._SETS.get(term.op)
+        return (term.field, entry[0]) if entry else None
+
+    def alternatives(self, term: Term) -> list[Alternative]:
+        cls, kind = self._SETS[term.op]
+        op = {"in~": "=~", "in": "=="}.get(term.op, term.op)
+        alternatives = []
+        for raw in term.values:
+            literal = self.literal(raw)
+            if literal is not None and cls == "ci":
+                literal = literal.casefold()  # every ci operator folds case the same way
+            alternatives.append(Alternative(Pattern(kind, literal) if literal is not None else None, op, raw))
+        return alternatives
+
+    def render_alternatives(self, field: str, key, alternatives: list[Alternative]) -> list[Term]:
+        eq_op = "=~" if key[1] == "ci" else "=="
+        equal = [a.raw for a in alternatives if a.op == eq_op]
+        terms = []
+        for a in alternatives:
+            if a.op != eq_op:
+                terms.append(Term(f"{field} {a.op} {a.raw}", field, a.op, [a.raw]))
+            elif a.raw == equal[0]:
+                if len(equal) == 1:
+                    terms.append(Term(f"{field} {eq_op} {equal[0]}", field, eq_op, equal))
+                else:
+                    set_op = "in~" if key[1] == "ci" else "in"
+                    terms.append(Term(f"{field} {set_op} ({', '.join(equal)})", field, set_op, equal))
+        return terms
+
+    def rank(self, term: Term) -> int:
+        return self._RANKS.get(term.op, RANK_SCAN)
+
+    def render_not(self, child: str) -> str:
+        return f"not({child})"
+
+
+class LuceneDialect(Dialect):
+    case_insensitive = False
+    strict = True
+    and_sep = " AND "
+    or_sep = " OR "
+
+    _KEYWORD = re.compile(r"(AND|OR|NOT)(?=[\s(]|$)")
+    _OR = re.compile(r"\s+OR\s+")
+
+    def _field(self, text: str, i: int) -> int:
+        """Index of the unescaped ':' ending the field that starts at i."""
+        while i < len(text):
+            c = text[i]
+            if c == "\\":
+                i += 2
+                continue
+            if c == ":":
+                return i
+            if c.isspace() or c in '()"/':
+                break
+            i += 1
+        raise Unsupported("term without field")
+
+    def _value(self, text: str, i: int) -> int:
+        if i < len(text) and text[i] in '"/':
+            return _quoted_end(text, i, text[i])
+        start = i
+        while i < len(text):
+            c = text[i]
+            if c == "\\":
+                i += 2
+                continue
+            if c.isspace() or c in "()":
+                break
+            i += 1
+        if i == start:
+            raise Unsupported(f"missing value at {i}")
+        return i
+
+    def tokens(self, text: str) -> list:
+        tokens = []
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if c.isspace():
+                i += 1
+                continue
+            if c in "()":
+                tokens.append((c, None))
+                i += 1
+                continue
+            m = self._KEYWORD.match(text, i)
+            if m:
+                tokens.append((m.group(1).lower(), None))
+                i = m.end()
+                continue
+            start = i
+            colon = self._field(text, i)
+            field = text[start:colon]
+            i = colon + 1
+            if text.startswith("(", i):
+                i += 1
+                values = []
+                while True:
+                    value_start = i
+                    i = self._value(text, i)
+                    values.append(text[value_start:i])
+                    if text.startswith(")", i):
+                        i += 1
+                        break
+                    m = self._OR.match(text, i)
+                    if not m:
+                        raise Unsupported("value list with operators other than OR")
+                    i = m.end()
+                tokens.append(("term", Term(text[start:i], field, "in", values)))
+            else:
+                value_start = i
+                i = self._value(text, i)
+                tokens.append(("term", Term(text[start:i], field, ":", [text[value_start:i]])))
+        return tokens
+
+    @staticmethod
+    def pattern(raw: str) -> Pattern | None:
+        if raw[:1] in ('"', "/"):
+            return None  # phrase or regex
+        chars = _decode(raw, "*", special="?")
+        return classify(chars) if chars is not None else None
+
+    def set_key(self, term: Term):
+        if term.op in (":", "in") and term.field != "_exists_" and not any(v.startswith("/") for v in term.values):
+            return (term.field,)
+        return None
+
+    def alternatives(self, term: Term) -> list[Alternative]:
+        return [Alternative(self.pattern(raw), ":", raw) for raw in term.values]
+
+    def render_alternatives(self, field: str, key, alternatives: list[Alternative]) -> list[Term]:
+        values = [a.raw for a in alternatives]
+        if len(values) == 1:
+            return [Term(f"{field}:{values[0]}", field, ":", values)]
+        return [Term(f"{field}:({' OR '.join(values)})", field, "in", values)]
+
+    def squeeze(self, term: Term) -> bool:
+        if self.set_key(term) is None:
+            return False
+        values = [v if v.startswith('"') else _squeeze(v) for v in term.values]
+        if values == term.values:
+            return False
+        term.text = self.render_alternatives(term.field, None, [Alternative(None, ":", v) for v in values])[0].text
+        term.values = values
+        return True
+
+    def rank(self, term: Term) -> int:
+        if term.field == "_exists_":
+            return RANK_EXACT
+        if any(v.startswith("/") for v in term.values):
+            return RANK_REGEX
+        if term.op not in (":", "in"):
+            return RANK_SCAN
+        return max(_rank_pattern(self.pattern(v)) for v in term.values)
+
+
+DIALECTS = {
+    "splunk": SplunkDialect(),
+    "kusto": KustoDialect(),
+    "elasticsearch": LuceneDialect(),
+    "opensearch": LuceneDialect(),
+    "lucene": LuceneDialect(),
+}
+
+
+# Passes -----------------------------------------------------------------------------
+
+
+def drop_covered(alternatives: list[Alternative], case_insensitive: bool) -> list[Alternative]:
+    """Alternatives of one OR that are not covered by another one (the first of equals is kept)."""
+
+    def folded(p: Pattern | None) -> Pattern | None:
+        return p._replace(literal=p.literal.casefold()) if p is not None and case_insensitive else p
+
+    patterns = [folded(a.pattern) for a in alternatives]
+    kept = []
+    for i, a in enumerate(alternatives):
+        redundant = False
+        for j, b in enumerate(alternatives):
+            if i == j:
+                continue
+            if patterns[i] is None or patterns[j] is None:
+                redundant = j < i and (a.op, a.raw) == (b.op, b.raw)  # verbatim duplicate
+            elif covers(patterns[j], patterns[i]):
+                redundant = j < i or not covers(patterns[i], patterns[j])
+            if redundant:
+                break
+        if not redundant:
+            kept.append(a)
+    return kept
+
+
+def rank(node, dialect: Dialect) -> int:
+    if isinstance(node, Not):
+        return RANK_NEGATION
+    if isinstance(node, Group):
+        return max(rank(child, dialect) for child in node.children)
+    return dialect.rank(node)
+
+
+class Rewriter:
+    def __init__(self, dialect: Dialect):
+        self.dialect = dialect
+        self.changed = False
+
+    def rewrite(self, node):
+        if isinstance(node, Term):
+            self.changed |= self.dialect.squeeze(node)
+            merged = self.merge([node])  # a value list on its own is an OR too
+            return merged[0] if len(merged) == 1 else Group("or", merged, node.parens)
+        if isinstance(node, Not):
+            node.child = self.rewrite(node.child)
+            return node
+        children = []
+        for child in (self.rewrite(child) for child in node.children):
+            # (a OR b) OR c == a OR b OR c
+            children.extend(child.children if isinstance(child, Group) and child.op == node.op else [child])
+        if node.op == "or":
+            children = self.merge(children)
+        else:
+            ordered = sorted(children, key=lambda child: rank(child, self.dialect))
+            self.changed |= ordered != children
+            children = ordered
+        if len(children) == 1:
+            children[0].parens = children[0].parens or node.parens
+            return children[0]
+        node.children = children
+        return node
+
+    def merge(self, children: list) -> list:
+        """Merge the terms of one OR per field into sets, dropping covered alternatives."""
+        groups: dict = {}
+        for index, child in enumerate(children):
+            if isinstance(child, Term):
+                key = self.dialect.set_key(child)
+                if key is not None:
+                    groups.setdefault(key, []).append(index)
+        replacements: dict[int, list] = {}
+        for key, indexes in groups.items():
+            alternatives = [a for index in indexes for a in self.dialect.alternatives(children[index])]
+            kept = drop_covered(alternatives, self.dialect.case_insensitive)
+            terms = self.dialect.render_alternatives(children[indexes[0]].field, key, kept)
+            if [t.text for t in terms] == [children[index].text for index in indexes]:
+                continue  # nothing to merge or drop
+            replacements[indexes[0]] = terms
+            replacements.update({index: [] for index in indexes[1:]})
+            self.changed = True
+        merged = []
+        for index, child in enumerate(children):
+            merged.extend(replacements.get(index, [child]))
+        return merged
+
+
+def render(node, dialect: Dialect, parent: str | None = None) -> str:
+    if isinstance(node, Term):
+        text = node.text
+    elif isinstance(node, Not):
+        text = dialect.render_not(render(node.child, dialect, "not"))
+    else:
+        sep = dialect.and_sep if node.op == "and" else dialect.or_sep
+        text = sep.join(render(child, dialect, node.op) for child in node.children)
+    if parent == "not" and dialect.not_parens:
+        return text
+    if node.parens or (isinstance(node, Group) and parent not in (None, node.op)):
+        text = f"({text})"
+    return text
+
+
+def optimize_expression(text: str, dialect: Dialect) -> str:
+    """Optimize one boolean search expression; unchanged if it cannot be parsed or improved."""
+    try:
+        tree = dialect.parse(text)
+    except Unsupported:
+        return text
+    rewriter = Rewriter(dialect)
+    tree = rewriter.rewrite(tree)
+    if not rewriter.changed:
+        return text
+    tree.parens = False
+    return render(tree, dialect)
+
+
+def _splunk_search(query: str, rewrite) -> str:
+    """Only the base search (or a `| search` command) is rewritten; other pipe commands are kept."""
+    lines = query.split("\n")
+    for index, line in enumerate(lines):
+        if index == 0 and not line.startswith("|"):
+            lines[0] = rewrite(line)
+            break
+        if line.startswith("| search "):
+            lines[index] = "| search " + rewrite(line[len("| search "):])
+            break
+    return "\n".join(lines)
+
+
+def map_expressions(query: str, backend_id: str, rewrite) -> str:
+    """
+    Apply rewrite(expression, dialect) to each boolean search expression in query
+    (as converted for backend_id): every query of a multi-query result, and for
+    Splunk only the base search. Queries of other backends are returned unchanged.
+    """
+    dialect = DIALECTS.get(backend_id)
+    if dialect is None:
+        return query
+    parts = query.split("\n\n")  # backends returning several queries (see engine.format_result)
+    if isinstance(dialect, SplunkDialect):
+        return "\n\n".join(_splunk_search(part, lambda text: rewrite(text, dialect)) for part in parts)
+    return "\n\n".join(part if "\n" in part else rewrite(part, dialect) for part in parts)
+
+
+def optimize_query(query: str, backend_id: str) -> str:
+    """Return query (as converted for backend_id) with the optimizer passes applied."""
+    return map_expressions(query, backend_id, optimize_expression)
@@ -0,0 +1,181 @@
+"""
+Persistent, content-addressed cache of successful conversion results.
+
+Entries live under $SIGMAFORGE_CACHE_DIR (default: $XDG_CACHE_HOME/sigmaforage or
+~/.cache/sigmaforage) and are keyed by a SHA-256 over the rule bytes, backend id,
+pipelines (including the content of pipeline files), the SigmaForge version and the
+engine that converts: for the in-process engine the installed pySigma and backend
+package versions, for sigma-cli a fingerprint of the environment it runs in (see
+discovery.subprocess_fingerprint), so any change to those is a miss.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from . import __version__
+from .defaults import default_cache_dir
+from .engine import backend_package_version, pipeline_names
+
+# Bump when the entry format or key derivation changes
+CACHE_FORMAT = 2
+
+
+class CacheStats(NamedTuple):
+    directory: str
+    entries: int
+    total_bytes: int
+    oldest: float | None
+    newest: float | None
+
+
+@functools.lru_cache(maxsize=None)
+def pysigma_version() -> str:
+    from importlib import metadata
+
+    try:
+        return metadata.version("pysigma")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def pipeline_digest(pipeline: str) -> list[str]:
+    """Pipeline names, with pipeline files replaced by a hash of their content."""
+    parts = []
+    for name in pipeline_names(pipeline):
+        try:
+            parts.append(f"{name}:{hashlib.sha256(Path(name).read_bytes()).hexdigest()}")
+        except OSError:
+            parts.append(name)
+    return parts
+
+
+def cache_key(sigma_content: str, backend_id: str, pipeline: str, engine: str = "inprocess") -> str:
+    """Content address of a conversion result made by engine ('inprocess' or 'subprocess')."""
+    if engine == "inprocess":
+        versions = [pysigma_version(), backend_package_version(backend_id)]
+    else:  # sigma-cli has its own packages (e.g. a pipx venv), unknown to this interpreter
+        from .discovery import subprocess_fingerprint
+
+        versions = [subprocess_fingerprint()]
+    material = json.dumps(
+        [
+            CACHE_FORMAT,
+            __version__,
+            engine,
+            *versions,
+            backend_id,
+            pipeline_digest(pipeline),
+            hashlib.sha256(sigma_content.encode("utf-8")).hexdigest(),
+        ]
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """On-disk conversion result cache with size- and age-based pruning."""
+
+    def __init__(self, directory: str | Path | None = None):
+        self._directory = Path(directory) if directory is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        return self._directory if self._directory is not None else default_cache_dir()
+
+    @property
+    def results_dir(self) -> Path:
+        return self.directory / "results"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.results_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        """Return the cached query text for key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            os.utime(path)  # Refresh mtime: pruning evicts least recently used first
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """Store a successful conversion. Write failures are ignored."""
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump({"text": text}, f)
+            os.replace(tmp, path)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        if not self.results_dir.is_dir():
+            return entries
+        for sub in os.scandir(self.results_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((Path(entry.path), entry.stat()))
+                    except OSError:
+                        pass
+        return entries
+
+    def stats(self) -> CacheStats:
+        entries = self._entries()
+        mtimes = [st.st_mtime for _, st in entries]
+        return CacheStats(
+            str(self.directory),
+            len(entries),
+            sum(st.st_size for _, st in entries),
+            min(mtimes) if mtimes else None,
+            max(mtimes) if mtimes else None,
+        )
+
+    def prune(self, max_bytes: int | None = None, max_age_days: float | None = None) -> tuple[int, int]:
+        """
+        Delete entries older than max_age_days, then least recently used entries until
+        the cache is at most max_bytes. Returns (entries removed, bytes freed).
+        """
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        total = sum(st.st_size for _, st in entries)
+        removed = freed = 0
+        for path, st in entries:
+            expired = cutoff is not None and st.st_mtime < cutoff
+            oversized = max_bytes is not None and total > max_bytes
+            if not (expired or oversized):
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+            removed += 1
+            freed += st.st_size
+        return removed, freed
+
+    def clear(self) -> tuple[int, int]:
+        """Delete every entry. Returns (entries removed, bytes freed)."""
+        return self.prune(max_bytes=0)
+
+
+RESULT_CACHE = ResultCache()
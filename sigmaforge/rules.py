@@ -0,0 +1,216 @@
+"""
+Rule discovery: expand -i inputs (file, directory, glob, @listfile, stdin) into rules.
+Rules inside archives are read by sigmaforge/archive.py.
+
+Everything here is a generator so large corpora are walked lazily; rule content is
+only read when a rule is about to be converted. Stdin is a stream of `---`-separated
+YAML documents that is split into rules as it arrives.
+"""
+
+import glob
+import os
+import re
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from .defaults import DEFAULT_STREAM_NAMED_RULES
+
+RULE_SUFFIXES = (".yml", ".yaml")
+
+_RULE_ID = re.compile(r"^id:[ \t]*['\"]?([^'\"\s#]+)", re.MULTILINE)
+_RULE_NAME = re.compile(r"^name:[ \t]*['\"]?([^'\"\s#]+)", re.MULTILINE)
+_CORRELATION = re.compile(r"^correlation:", re.MULTILINE)
+_ACTION = re.compile(r"^action:[ \t]*['\"]?(\w+)", re.MULTILINE)
+# "---" starts a document (optionally with content on the same line); "..." ends one
+_DOC_START = re.compile(r"^---(?:[ \t]+(.*))?\n?$")
+_DOC_END = re.compile(r"^\.\.\.[ \t]*\n?$")
+_BLANK_OR_COMMENT = re.compile(r"^[ \t]*(#.*)?$", re.MULTILINE)
+
+STDIN_NAME = "<stdin>"
+
+
+class RuleSource(NamedTuple):
+    """
+    A Sigma rule to convert: where it came from and (optionally) its content, as
+    text or as UTF-8 bytes (decoded on read).
+    """
+
+    path: str
+    content: str | bytes | None = None
+
+    def read(self) -> str:
+        """Return the rule YAML, reading it from disk if it was not given inline."""
+        if isinstance(self.content, bytes):
+            return self.content.decode("utf-8")
+        if self.content is not None:
+            return self.content
+        return Path(self.path).read_text(encoding="utf-8")
+
+
+def rule_id(content: str | None) -> str | None:
+    """The top-level `id:` of a rule (first document), found without parsing the YAML."""
+    match = _RULE_ID.search(content or "")
+    return match.group(1) if match else None
+
+
+def is_glob(spec: str) -> bool:
+    return any(ch in spec for ch in "*?[")
+
+
+def is_bulk_input(spec: str) -> bool:
+    """True if the -i value can expand to more than one rule."""
+    return spec.startswith("@") or is_glob(spec) or Path(spec).is_dir()
+
+
+def _walk_rule_files(root: Path) -> Iterator[Path]:
+    """Yield rule files under root in a stable (sorted) order, one directory at a time."""
+    try:
+        entries = sorted(os.scandir(root), key=lambda e: e.name)
+    except OSError:
+        return
+    dirs = []
+    for entry in entries:
+        if entry.is_dir():
+            dirs.append(entry)
+        elif entry.name.lower().endswith(RULE_SUFFIXES):
+            yield Path(entry.path)
+    for entry in dirs:
+        yield from _walk_rule_files(Path(entry.path))
+
+
+def iter_rule_paths(spec: str) -> Iterator[Path]:
+    """
+    Expand one -i value into rule file paths.
+
+    Accepts a file, a directory (walked recursively for *.yml / *.yaml), a glob
+    (e.g. 'sigma-rules/**/*.yml') or '@listfile' containing one file, directory or
+    glob per line ('#' starts a comment).
+    """
+    if spec.startswith("@"):
+        with open(spec[1:], encoding="utf-8") as listfile:
+            for line in listfile:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield from iter_rule_paths(line)
+    elif is_glob(spec):
+        for match in sorted(glob.iglob(spec, recursive=True)):
+            path = Path(match)
+            if path.is_dir():
+                yield from _walk_rule_files(path)
+            elif path.is_file():
+                yield path
+    elif Path(spec).is_dir():
+        yield from _walk_rule_files(Path(spec))
+    else:
+        yield Path(spec)
+
+
+def iter_rule_sources(spec: str) -> Iterator[RuleSource]:
+    """Expand one -i value into RuleSource objects (content is read lazily)."""
+    for path in iter_rule_paths(spec):
+        yield RuleSource(str(path))
+
+
+def iter_yaml_documents(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """
+    Split a YAML stream into (line number, document text), yielding each document
+    as soon as the `---` (or `...`) line after it has been read. Documents holding
+    only blank lines and comments are skipped.
+    """
+    doc: list[str] = []
+    start = 1
+    for number, line in enumerate(lines, 1):
+        opener = _DOC_START.match(line)
+        if opener or _DOC_END.match(line):
+            text = "".join(doc)
+            if _BLANK_OR_COMMENT.sub("", text).strip():
+                yield start, text
+            doc = [opener.group(1) + "\n"] if opener and opener.group(1) else []
+            start = number
+            continue
+        if not doc:
+            start = number
+        doc.append(line)
+    text = "".join(doc)
+    if _BLANK_OR_COMMENT.sub("", text).strip():
+        yield start, text
+
+
+def iter_stream_sources(lines: Iterable[str], max_named: int = DEFAULT_STREAM_NAMED_RULES) -> Iterator[RuleSource]:
+    """
+    One RuleSource per rule in a `---`-separated YAML stream (e.g. stdin), named
+    <stdin>:<line>. Rule collection actions keep pySigma's semantics although each
+    rule is converted on its own: an `action: global` document is prepended to every
+    following rule until `action: reset`, and an `action: repeat` document is merged
+    into the rule it repeats, global fields included (the only case that parses YAML
+    here). A correlation rule is converted together with the documents of the rules
+    it names, which keep their own sources as well. Only the max_named most recently
+    seen or referenced rules can be found that way, so memory stays bounded.
+    """
+    global_doc = None
+    previous = None  # last rule: text, (global, text) or a dict after a repeat
+    named: OrderedDict[str, str] = OrderedDict()  # rule id or name -> its source content, least recent first
+    for line, text in iter_yaml_documents(lines):
+        match = _ACTION.search(text)
+        action = match.group(1) if match else None
+        if action == "global":
+            global_doc = previous = text
+            continue
+        if action == "reset":
+            global_doc = None
+            continue
+        if action == "repeat":
+            previous = _repeat(previous, text)
+            content = _dump_yaml(previous)
+        elif _CORRELATION.search(text):
+            content = _with_referenced(text, named)
+        else:
+            previous = (global_doc, text) if global_doc else text
+            content = f"{global_doc}---\n{text}" if global_doc else text
+        for pattern in (_RULE_ID, _RULE_NAME):
+            key = pattern.search(content if action == "repeat" else text)
+            if key:
+                named[key.group(1)] = content
+                named.move_to_end(key.group(1))
+        while len(named) > max_named:
+            named.popitem(last=False)
+        yield RuleSource(f"{STDIN_NAME}:{line}", content)
+
+
+def _with_referenced(correlation: str, named: OrderedDict[str, str]) -> str:
+    """A correlation document preceded by the rules it references (each closed by a reset)."""
+    import yaml
+
+    try:
+        references = (yaml.safe_load(correlation) or {}).get("correlation", {}).get("rules") or []
+    except (yaml.YAMLError, AttributeError):
+        references = []  # reported by the converter
+    if isinstance(references, str):
+        references = [references]
+    parts = []
+    for ref in dict.fromkeys(map(str, references)):
+        if ref in named:
+            named.move_to_end(ref)
+            parts.append(named[ref])
+    return "".join(f"{part}---\naction: reset\n---\n" for part in parts) + correlation
+
+
+def _repeat(previous, text: str) -> dict:
+    import yaml
+    from sigma.collection import deep_dict_update
+
+    if isinstance(previous, tuple):  # a rule under a global: pySigma repeats the merged rule
+        global_doc, rule = previous
+        previous = deep_dict_update(yaml.safe_load(rule) or {}, yaml.safe_load(global_doc) or {})
+    base = yaml.safe_load(previous) if isinstance(previous, str) else previous
+    base = {k: v for k, v in (base or {}).items() if k != "action"}
+    update = {k: v for k, v in (yaml.safe_load(text) or {}).items() if k != "action"}
+    return deep_dict_update(base, update)
+
+
+def _dump_yaml(rule: dict) -> str:
+    import yaml
+
+    return yaml.safe_dump(rule, sort_keys=False)
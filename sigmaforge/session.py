@@ -0,0 +1,202 @@
+"""
+Python API: a reusable conversion session.
+
+    from sigmaforge import Converter
+
+    with Converter(pipeline="sysmon", jobs=4) as converter:
+        for result in converter.convert_many(Path("rules").glob("**/*.yml"), ["splunk", "kusto"]):
+            print(result.rule, result.siem, result.query if result.ok else result.error)
+
+A Converter is what the CLI, `sigmaforage watch` and scripts/validate_siem_outputs.py
+run on. Conversions in this process reuse its warm backends, pipelines and parsed
+rules (engine.BACKEND_CACHE / PARSED_RULE_CACHE) across calls, and the on-disk
+result cache is consulted first. With jobs > 1 the worker processes are started on
+first use and kept until close(), so their caches stay warm between convert_many
+calls too. SIEM names that share a backend (elasticsearch, elk, wazuh, ...) are
+converted once and reported under every name.
+"""
+
+import os
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
+
+from .batch import ConversionUnit, fan_out, group_siems, zip_units
+from .engine import BACKEND_CACHE
+from .rules import RuleSource, rule_id
+
+
+class ConversionResult(NamedTuple):
+    """
+    One rule converted for one SIEM. `text` is the query, or the error if not ok.
+    siem is None when the rule itself could not be read. rule_index is the rule's
+    position in the input; counters are the cache counters and stage timings
+    (*_seconds) the conversion moved, see batch.cache_counters.
+    """
+
+    rule: str
+    siem: str | None
+    ok: bool
+    text: str
+    rule_id: str | None
+    seconds: float
+    rule_index: int
+    counters: Counter
+
+    @property
+    def query(self) -> str | None:
+        return self.text if self.ok else None
+
+    @property
+    def error(self) -> str | None:
+        return None if self.ok else self.text
+
+
+def as_source(rule, index: int = 0) -> RuleSource:
+    """A RuleSource for a rule given as a RuleSource, a path (os.PathLike) or YAML text."""
+    if isinstance(rule, RuleSource):
+        return rule
+    if isinstance(rule, os.PathLike):
+        return RuleSource(os.fspath(rule))
+    if isinstance(rule, (str, bytes)):
+        return RuleSource(f"<rule {index}>", rule)
+    raise TypeError(f"Expected a rule path, YAML text or RuleSource, got {type(rule).__name__}")
+
+
+class Converter:
+    """
+    A conversion session: pipeline and engine settings, warm backends and a worker
+    pool that outlive individual calls. Use it as a context manager, or call close().
+
+    Args:
+        pipeline: Processing pipeline(s), comma-separated (default: sysmon).
+        engine: 'inprocess', 'subprocess' or 'auto' (default: $SIGMAFORGE_ENGINE or auto).
+        jobs: Worker processes for convert_many (default 1: convert in this process).
+        use_cache: Use the on-disk result cache.
+        optimize: Apply the optimize.py rewrite passes to every query.
+        backend_cache_size: Resize the in-memory backend cache (process-wide).
+        daemon: A daemon.DaemonClient to send conversions to instead of converting
+            here; it is closed with the session.
+        timings: A metrics.StageTimings to record per-stage durations into.
+    """
+
+    def __init__(
+        self,
+        pipeline: str = "sysmon",
+        engine: str | None = None,
+        jobs: int = 1,
+        use_cache: bool = True,
+        optimize: bool = False,
+        backend_cache_size: int | None = None,
+        daemon=None,
+        timings=None,
+    ):
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+        self.pipeline = pipeline
+        self.engine = engine
+        self.jobs = jobs
+        self.use_cache = use_cache
+        self.optimize = optimize
+        self.daemon = daemon
+        self.timings = timings
+        # Cache counters and stage seconds summed over every conversion of this session
+        self.counters = Counter()
+        self._executor = None
+        self._executor_jobs = 0
+        if backend_cache_size is not None:
+            BACKEND_CACHE.resize(backend_cache_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker processes (and close the daemon client)."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        if self.daemon is not None:
+            self.daemon.close()
+            self.daemon = None
+
+    def convert(self, rule, siems: Iterable[str]) -> list[ConversionResult]:
+        """Convert one rule (path, YAML text or RuleSource) for each SIEM, in this process."""
+        return list(self.convert_many([rule], siems, jobs=1))
+
+    def convert_many(
+        self, rules: Iterable, siems: Iterable[str], jobs: int | None = None, ordered: bool = True
+    ) -> Iterator[ConversionResult]:
+        """
+        Convert every rule for every SIEM, yielding each result as soon as it is
+        ready. Rules are read lazily and only a bounded window is in flight, so rules
+        can come from an unbounded iterator. Results come in input order (rule-major,
+        siems order within a rule); with ordered=False a rule's results are yielded
+        as soon as that rule is done. jobs overrides the session's for this call.
+        """
+        siems = list(dict.fromkeys(s.lower() for s in siems))
+        jobs = self.jobs if jobs is None else jobs
+        units = self._units((as_source(rule, i) for i, rule in enumerate(rules)), siems)
+        if self.daemon is not None:
+            results = self.daemon.zip_units(units)
+        else:
+            results = zip_units(units, jobs, self._pool(jobs), ordered=ordered)
+        current = (None, None)  # (rule_index, rule_id) of the rule being reported
+        for unit, (ok, text, counters) in fan_out(results, siems):
+            self.counters.update(counters)
+            if current[0] != unit.rule_index:
+                current = (unit.rule_index, rule_id(unit.content))
+            if self.timings is not None and unit.error is None:
+                self.timings.record_conversion(unit.siem_id, ok, counters)
+            yield ConversionResult(
+                unit.rule_path,
+                unit.siem_id,
+                ok,
+                text,
+                current[1],
+                counters["convert_seconds"],
+                unit.rule_index,
+                counters,
+            )
+
+    def _pool(self, jobs: int):
+        """The session's worker pool for jobs > 1, (re)started on demand."""
+        if jobs <= 1:
+            return None
+        if self._executor is None or self._executor_jobs != jobs:
+            from concurrent.futures import ProcessPoolExecutor
+
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = ProcessPoolExecutor(max_workers=jobs)
+            self._executor_jobs = jobs
+        return self._executor
+
+    def _units(self, sources: Iterable[RuleSource], siems: list[str]) -> Iterator[ConversionUnit]:
+        """One ConversionUnit per (rule, backend), reading each rule once, lazily."""
+        groups = group_siems(siems, self.pipeline)
+        for rule_index, source in enumerate(sources):
+            start = time.perf_counter()
+            try:
+                content = source.read()
+            except (OSError, UnicodeDecodeError) as e:
+                yield ConversionUnit(source.path, None, None, error=str(e), rule_index=rule_index)
+                continue
+            if self.timings is not None:
+                self.timings.record("*", "read", time.perf_counter() - start)
+            for group in groups:
+                yield ConversionUnit(
+                    source.path,
+                    group[0],
+                    content,
+                    pipeline=self.pipeline,
+                    engine=self.engine,
+                    from_file=source.content is None,
+                    use_cache=self.use_cache,
+                    rule_index=rule_index,
+                    aliases=group,
+                    optimize=self.optimize,
+                )
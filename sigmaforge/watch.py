@@ -0,0 +1,414 @@
+"""
+Watch mode: reconvert only the rules that changed under a directory.
+
+Changes are picked up with inotify on Linux (through ctypes, no extra dependency)
+and by polling file mtimes elsewhere. Bursts of events are debounced, and each rule
+is hashed so saves that do not change the content (touch, editor re-saves) cost
+nothing. Every rule gets one output file per SIEM:
+
+    <output>/<rule dir>/<rule stem>.<siem>.txt
+
+State (rule hashes and a fingerprint of the SIEM/pipeline/backend set) is kept in
+<output>/.sigmaforage-watch.json, so a restart with the same configuration only
+reconverts what changed while it was not running. A different SIEM set, edited
+pipeline files or upgraded backends trigger a full rebuild.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import json
+import os
+import select
+import struct
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+from . import __version__
+from .defaults import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL
+from .engine import backend_package_version, pipeline_names
+from .result_cache import pipeline_digest, pysigma_version
+from .rules import RULE_SUFFIXES, RuleSource, iter_rule_paths
+from .session import Converter
+from .siem_backends import SIEM_BACKENDS
+
+STATE_FILE = ".sigmaforage-watch.json"
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _log(message: str) -> None:
+    print(f"[{datetime.now():%H:%M:%S}] {message}", file=sys.stderr, flush=True)
+
+
+def file_hash(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+class Inotify:
+    """Minimal recursive inotify watcher. Raises OSError where inotify is unavailable."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._dirs: dict[int, Path] = {}
+
+    def add_tree(self, root: Path) -> None:
+        """Watch root and every directory below it."""
+        for dirpath, dirnames, _ in os.walk(root):
+            self._add(Path(dirpath))
+
+    def add_files(self, paths: list[Path]) -> None:
+        """Watch individual files (through a non-recursive watch on their directories)."""
+        for parent in {p.parent for p in paths}:
+            self._add(parent)
+
+    def _add(self, path: Path) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+        self._dirs[wd] = path
+
+    def _remove_tree(self, root: Path) -> None:
+        """Stop watching root and the directories below it (they left the tree)."""
+        for wd, path in list(self._dirs.items()):
+            if path == root or root in path.parents:
+                self._libc.inotify_rm_watch(self.fd, wd)  # fails harmlessly if the kernel dropped it already
+                del self._dirs[wd]
+
+    def read(self, timeout: float | None) -> set[Path] | None:
+        """
+        Wait up to timeout seconds and return the paths that changed (empty set on
+        timeout). Returns None if the kernel queue overflowed and events were lost,
+        or if a directory was moved out or deleted (its rules are not known here).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed: set[Path] | None = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:  # watched directory deleted, or its watch removed
+                self._dirs.pop(wd, None)
+                continue
+            parent = self._dirs.get(wd)
+            if parent is None or not name:
+                continue
+            path = parent / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_MOVED_FROM | IN_DELETE):
+                    self._remove_tree(path)
+                    changed = None  # keep reading so the watches stay consistent
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+                    if changed is not None:
+                        changed.update(iter_rule_paths(str(path)))
+                continue
+            if changed is not None:
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Poller:
+    """Portable fallback: compare (mtime, size) snapshots of the watched files."""
+
+    def __init__(self, interval: float = DEFAULT_POLL_INTERVAL):
+        self.interval = interval
+        self._roots: list[Path] = []
+        self._files: list[Path] = []
+        self._snapshot: dict[Path, tuple[int, int]] = {}
+
+    def add_tree(self, root: Path) -> None:
+        self._roots.append(root)
+        self._snapshot.update(self._scan_root(root))
+
+    def add_files(self, paths: list[Path]) -> None:
+        self._files.extend(paths)
+        self._snapshot.update(self._scan_files())
+
+    def _scan_files(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for path in self._files:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _scan_root(self, root: Path) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                path = Path(dirpath) / name
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout: float | None) -> set[Path]:
+        time.sleep(min(self.interval, timeout) if timeout is not None else self.interval)
+        current = self._scan_files()
+        for root in self._roots:
+            current.update(self._scan_root(root))
+        changed = {p for p, sig in current.items() if self._snapshot.get(p) != sig}
+        changed |= self._snapshot.keys() - current.keys()
+        self._snapshot = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def debounced(source, debounce: float) -> Iterator[set[Path] | None]:
+    """Group events: after the first change, keep collecting until `debounce` seconds pass quietly."""
+    while True:
+        changed = source.read(None)
+        if not changed and changed is not None:
+            continue
+        while changed is not None:
+            more = source.read(debounce)
+            if more is None:
+                changed = None
+            elif not more:
+                break
+            else:
+                changed |= more
+        yield changed
+
+
+class RuleWatcher:
+    """Keeps <output> in sync with the rules under <root> for a fixed SIEM set and pipeline."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        output_dir: str | Path,
+        siems: list[str],
+        pipeline: str = "sysmon",
+        engine: str | None = None,
+        jobs: int = 1,
+        use_cache: bool = True,
+        optimize: bool = False,
+    ):
+        self.root = Path(root)
+        self.output_dir = Path(output_dir)
+        self.siems = siems
+        self.pipeline = pipeline
+        self.engine = engine
+        self.jobs = jobs
+        self.use_cache = use_cache
+        self.optimize = optimize
+        # One session for the watcher's lifetime: worker processes and backends stay warm between rebuilds
+        self.converter = Converter(pipeline=pipeline, engine=engine, jobs=jobs, use_cache=use_cache, optimize=optimize)
+        self.state_path = self.output_dir / STATE_FILE
+        self.hashes: dict[str, str] = {}
+        self.fingerprint = ""
+
+    def config_fingerprint(self) -> str:
+        """Hash of everything that, when changed, invalidates every output file."""
+        backend_ids = sorted({SIEM_BACKENDS[s][0] for s in self.siems})
+        material = json.dumps(
+            [
+                __version__,
+                pysigma_version(),
+                self.siems,
+                [(b, backend_package_version(b)) for b in backend_ids],
+                pipeline_digest(self.pipeline),
+            ]
+            + (["optimize"] if self.optimize else [])  # so existing state stays valid without it
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def pipeline_files(self) -> list[Path]:
+        return [Path(name).resolve() for name in pipeline_names(self.pipeline) if Path(name).is_file()]
+
+    def output_path(self, rel: str, siem_id: str) -> Path:
+        return self.output_dir / Path(rel).parent / f"{Path(rel).stem}.{siem_id}.txt"
+
+    def load_state(self) -> None:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self.fingerprint = state.get("fingerprint", "")
+        self.hashes = state.get("rules", {})
+
+    def save_state(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({"fingerprint": self.fingerprint, "rules": self.hashes}, indent=1, sort_keys=True)
+        _atomic_write(self.state_path, payload)
+
+    def _rel(self, path: Path) -> str | None:
+        try:
+            rel = path.resolve().relative_to(self.root.resolve())
+        except ValueError:
+            return None
+        if not rel.name.lower().endswith(RULE_SUFFIXES):
+            return None
+        return rel.as_posix()
+
+    def sync(self, changed: set[Path] | None = None) -> tuple[int, int, int]:
+        """
+        Bring outputs up to date. changed=None checks every rule (startup, lost events,
+        configuration change); otherwise only the given paths are looked at.
+
+        Returns (rules converted, rules removed, conversions failed).
+        """
+        fingerprint = self.config_fingerprint()
+        if fingerprint != self.fingerprint:
+            if self.fingerprint:
+                _log("Pipeline or backend set changed: full rebuild.")
+            self.hashes = {}
+            self.fingerprint = fingerprint
+            changed = None
+
+        if changed is None:
+            candidates = {self._rel(p) for p in iter_rule_paths(str(self.root))} | set(self.hashes)
+        else:
+            candidates = {self._rel(p) for p in changed}
+        candidates.discard(None)
+
+        to_convert: list[tuple[str, str]] = []
+        removed = 0
+        for rel in sorted(candidates):
+            digest = file_hash(self.root / rel)
+            if digest is None:
+                if self.hashes.pop(rel, None) is not None:
+                    self._remove_outputs(rel)
+                    removed += 1
+                    _log(f"Removed {rel}")
+                continue
+            if self.hashes.get(rel) != digest:
+                to_convert.append((rel, digest))
+
+        failed = 0
+        if to_convert:
+            failed = self._convert(to_convert)
+        if to_convert or removed:
+            self.save_state()
+        return len(to_convert), removed, failed
+
+    def _convert(self, rules: list[tuple[str, str]]) -> int:
+        digests = dict(rules)
+        rule_failed: dict[str, bool] = {}
+        failed = 0
+
+        def sources():
+            nonlocal failed
+            for rel, _ in rules:
+                try:
+                    yield RuleSource(rel, (self.root / rel).read_text(encoding="utf-8"))
+                except (OSError, UnicodeDecodeError) as e:
+                    _log(f"{rel}: {e}")
+                    rule_failed[rel] = True
+                    failed += 1
+
+        for result in self.converter.convert_many(sources(), self.siems):
+            out = self.output_path(result.rule, result.siem)
+            if result.ok:
+                out.parent.mkdir(parents=True, exist_ok=True)
+                _atomic_write(out, result.text + "\n")
+            else:
+                out.unlink(missing_ok=True)  # never leave a stale query behind
+                _log(f"{result.rule}: {result.siem}: {result.text.splitlines()[0] if result.text else result.text}")
+                rule_failed[result.rule] = True
+                failed += 1
+        for rel, _ in rules:
+            if rule_failed.get(rel):
+                self.hashes.pop(rel, None)  # retry on the next change or restart
+            else:
+                self.hashes[rel] = digests[rel]
+                _log(f"Converted {rel}")
+        return failed
+
+    def _remove_outputs(self, rel: str) -> None:
+        for siem_id in self.siems:
+            self.output_path(rel, siem_id).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """Stop the conversion worker processes."""
+        self.converter.close()
+
+    def watch(self, debounce: float = DEFAULT_DEBOUNCE, poll: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        """Initial sync, then reconvert changed rules until interrupted."""
+        self.load_state()
+        converted, removed, failed = self.sync()
+        _log(f"Up to date: {converted} converted, {removed} removed, {failed} failed.")
+
+        source = None
+        if not poll:
+            try:
+                source = Inotify()
+            except OSError as e:
+                _log(f"inotify unavailable ({e}); polling every {poll_interval:g}s.")
+        if source is None:
+            source = Poller(poll_interval)
+        source.add_tree(self.root)
+        source.add_files(self.pipeline_files())
+
+        try:
+            for changed in debounced(source, debounce):
+                if changed is not None and set(self.pipeline_files()) & {p.resolve() for p in changed}:
+                    changed = None  # pipeline edited: the fingerprint check forces a full rebuild
+                converted, removed, failed = self.sync(changed)
+                if converted or removed:
+                    _log(f"{converted} converted, {removed} removed, {failed} failed.")
+        finally:
+            source.close()
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,19 @@
+"""Shared fixtures: keep tests away from the user's real caches."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Point the on-disk result cache at a per-test directory."""
+    cache_dir = tmp_path / "sigmaforage-cache"
+    monkeypatch.setenv("SIGMAFORGE_CACHE_DIR", str(cache_dir))
+    # Never talk to a conversion daemon the developer may have running
+    monkeypatch.setenv("SIGMAFORGE_DAEMON", str(tmp_path / "no-daemon.sock"))
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def no_backend_discovery(monkeypatch):
+    """Treat every backend as installed (conversions are mocked); test_discovery covers the real probe."""
+    monkeypatch.setattr("sigmaforge.discovery.missing_backends", lambda backend_ids, engine=None: None)
@@ -0,0 +1,118 @@
+"""Tests for reading rules straight out of zip/tar archives (import-archive)."""
+
+import io
+import tarfile
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+from sigmaforge.archive import ArchiveError, iter_archive_sources
+from sigmaforge.cli import main
+from sigmaforge.index import RuleIndex, RuleSelection
+
+RULE = """title: {name}
+id: {name}-id
+level: {level}
+logsource:
+  category: dns
+detection:
+  sel:
+    query: {name}
+  condition: sel
+"""
+
+MEMBERS = {
+    "rules/dns/a.yml": RULE.format(name="a", level="high"),
+    "rules-threat-hunting/dns/b.yml": RULE.format(name="b", level="low"),
+    "rules-threat-hunting/dns/c.yaml": RULE.format(name="c", level="critical"),
+    "rules-threat-hunting/README.md": "not a rule",
+}
+
+
+def make_zip(path, members=MEMBERS):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+    return path
+
+
+def make_tgz(path, members=MEMBERS):
+    with tarfile.open(path, "w:gz") as tf:
+        for name, text in members.items():
+            data = text.encode()
+            info = tarfile.TarInfo(f"./{name}")
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.fixture(params=["zip", "tgz"])
+def archive(request, tmp_path):
+    maker = make_zip if request.param == "zip" else make_tgz
+    return str(maker(tmp_path / f"sigma_all_rules.{request.param}"))
+
+
+def test_members_are_streamed_with_prefix_filter(archive):
+    sources = list(iter_archive_sources(archive, ["rules-threat-hunting/"]))
+    assert [s.path for s in sources] == [
+        f"{archive}!rules-threat-hunting/dns/b.yml",
+        f"{archive}!rules-threat-hunting/dns/c.yaml",
+    ]
+    assert sources[0].read() == MEMBERS["rules-threat-hunting/dns/b.yml"]
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=lambda content, siem, **kw: (True, f"q-{content.splitlines()[0]}"))
+def test_convert_from_archive(mock_convert, archive, tmp_path, capsys):
+    out = tmp_path / "out.txt"
+    argv = ["import-archive", archive, "--prefix", "rules-threat-hunting/", "-s", "splunk", "-j", "1", "-o", str(out)]
+    assert main(argv) == 0
+    assert mock_convert.call_count == 2
+    assert f"# === {archive}!rules-threat-hunting/dns/c.yaml ===" in out.read_text()
+    assert "q-title: c" in out.read_text()
+    assert not (tmp_path / "rules-threat-hunting").exists()  # nothing unpacked
+
+
+def test_import_populates_index_incrementally(tmp_path, capsys):
+    archive = str(make_zip(tmp_path / "rules.zip"))
+    index_path = tmp_path / "ix.sqlite3"
+    assert main(["import-archive", archive, "--index", str(index_path)]) == 0
+    assert "3 added" in capsys.readouterr().err
+    members = dict(MEMBERS)
+    del members["rules/dns/a.yml"]
+    make_zip(tmp_path / "rules.zip", members)
+    assert main(["import-archive", archive, "--index", str(index_path)]) == 0
+    assert "1 removed" in capsys.readouterr().err
+    with RuleIndex(index_path) as index:
+        assert index.count() == 2
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", return_value=(True, "q"))
+def test_filters_select_members_through_index(mock_convert, archive, tmp_path, capsys):
+    argv = ["import-archive", archive, "-s", "splunk", "-j", "1", "--level", "high+", "--index", str(tmp_path / "ix")]
+    assert main(argv) == 0
+    out = capsys.readouterr().out
+    assert "a.yml ===" in out and "c.yaml ===" in out and "b.yml" not in out
+    assert mock_convert.call_count == 2
+    with RuleIndex(tmp_path / "ix") as index:
+        assert len(index.select(RuleSelection(levels=("low",)))) == 1
+
+
+def test_corrupt_archive_is_an_error(tmp_path, capsys):
+    (tmp_path / "bad.zip").write_text("not an archive")
+    assert main(["import-archive", str(tmp_path / "bad.zip"), "-s", "splunk"]) == 1
+    assert "Cannot read archive" in capsys.readouterr().err
+    with pytest.raises(ArchiveError):
+        list(iter_archive_sources(str(tmp_path / "bad.zip")))
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", return_value=(True, "q"))
+def test_non_utf8_member_fails_only_that_rule(mock_convert, tmp_path, capsys):
+    archive = tmp_path / "rules.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("bad.yml", b"title: \xff\n")
+        zf.writestr("good.yml", RULE.format(name="g", level="low"))
+    assert main(["import-archive", str(archive), "-s", "splunk", "-j", "1"]) == 1
+    captured = capsys.readouterr()
+    assert "good.yml ===" in captured.out
+    assert f"{archive}!bad.yml: " in captured.err and "utf-8" in captured.err
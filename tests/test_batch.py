@@ -0,0 +1,73 @@
+"""Tests for ordered parallel fan-out."""
+
+import os
+from collections import Counter
+
+from sigmaforge.batch import ConversionUnit, default_jobs, fan_out, group_by_rule, group_siems, ordered_map
+
+
+def _square_with_pid(x):
+    return x * x, os.getpid()
+
+
+def test_ordered_map_serial_runs_in_process():
+    results = list(ordered_map(_square_with_pid, range(5), jobs=1))
+    assert [r for r, _ in results] == [0, 1, 4, 9, 16]
+    assert {pid for _, pid in results} == {os.getpid()}
+
+
+def test_ordered_map_pool_preserves_order():
+    """Results come back in submission order even when run on worker processes."""
+    results = list(ordered_map(_square_with_pid, range(50), jobs=3))
+    assert [r for r, _ in results] == [x * x for x in range(50)]
+    assert os.getpid() not in {pid for _, pid in results}
+
+
+def test_ordered_map_single_item_stays_serial():
+    results = list(ordered_map(_square_with_pid, [7], jobs=4))
+    assert results == [(49, os.getpid())]
+
+
+def test_ordered_map_consumes_lazily():
+    """Only a bounded window of the input is pulled ahead of the consumer."""
+    pulled = []
+
+    def items():
+        for x in range(1000):
+            pulled.append(x)
+            yield x
+
+    results = ordered_map(_square_with_pid, items(), jobs=2)
+    next(results)
+    assert len(pulled) < 100
+
+
+def test_default_jobs_is_positive():
+    assert default_jobs() >= 1
+
+
+def test_group_by_rule_keeps_siems_of_one_rule_together():
+    units = [ConversionUnit(f"r{i}", siem, "x", rule_index=i) for i in range(3) for siem in ("splunk", "kusto")]
+    groups = list(group_by_rule(units))
+    assert [[u.rule_index for u in g] for g in groups] == [[0, 0], [1, 1], [2, 2]]
+
+
+def test_group_siems_groups_aliases_by_backend():
+    groups = group_siems(["wazuh", "splunk", "kusto", "elasticsearch", "azure-sentinel", "nope"])
+    assert groups == [("wazuh", "elasticsearch"), ("splunk",), ("kusto", "azure-sentinel"), ("nope",)]
+
+
+def test_fan_out_restores_requested_order_and_counts_once():
+    siems = ["elasticsearch", "splunk", "wazuh"]
+    groups = group_siems(siems)
+    results = [
+        (ConversionUnit("r", group[0], "x", aliases=group), (True, f"q-{group[0]}", Counter(result_misses=1)))
+        for group in groups
+    ]
+    fanned = list(fan_out(results, siems))
+    assert [(u.siem_id, text) for u, (_, text, _) in fanned] == [
+        ("elasticsearch", "q-elasticsearch"),
+        ("splunk", "q-splunk"),
+        ("wazuh", "q-elasticsearch"),
+    ]
+    assert sum((c for _, (_, _, c) in fanned), Counter()) == Counter(result_misses=2)
@@ -1,5 +1,6 @@
 """Tests for CLI (help, list-siem, list-pipelines, conversion with mock)."""
 
+import json
 from io import StringIO
 from unittest.mock import patch
 
@@ -63,7 +64,7 @@ def test_missing_siem_returns_error():
     assert code == 2
 
 
-@patch("sigmaforge.cli.convert_sigma_to_siem")
+@patch("sigmaforge.batch.convert_sigma_to_siem")
 def test_convert_success_prints_output(mock_convert):
     """When conversion succeeds, output is printed (or written to -o)."""
     mock_convert.return_value = (True, "index=main Image=*whoami*")
@@ -80,7 +81,7 @@ def test_convert_success_prints_output(mock_convert):
     mock_convert.assert_called()
 
 
-@patch("sigmaforge.cli.convert_sigma_to_siem")
+@patch("sigmaforge.batch.convert_sigma_to_siem")
 def test_convert_writes_to_file_when_o_specified(mock_convert):
     """With -o FILE, output is written to file."""
     mock_convert.return_value = (True, "splunk query here")
@@ -103,3 +104,131 @@ def test_convert_writes_to_file_when_o_specified(mock_convert):
     finally:
         import os
         os.unlink(outpath)
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_convert_directory_keeps_per_rule_errors(mock_convert, tmp_path):
+    """-i DIR converts every rule; one failing rule does not stop the batch."""
+    (tmp_path / "bad.yml").write_text("title: bad\n")
+    (tmp_path / "good.yml").write_text("title: good\n")
+    mock_convert.side_effect = lambda content, siem_id, **kw: (
+        (False, "Error while converting: broken") if "bad" in content else (True, "good query")
+    )
+    args = get_parser().parse_args(["-i", str(tmp_path), "-s", "splunk", "--jobs", "1"])
+    with patch("sys.stdout", new_callable=StringIO) as out, patch("sys.stderr", new_callable=StringIO) as err:
+        code = run_convert(args)
+    assert code == 1
+    assert mock_convert.call_count == 2
+    assert f"# === {tmp_path / 'good.yml'} ===" in out.getvalue()
+    assert "good query" in out.getvalue()
+    assert f"{tmp_path / 'bad.yml'}: splunk: Error while converting: broken" in err.getvalue()
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_convert_aliases_share_one_conversion(mock_convert):
+    """SIEM names mapping to the same backend are converted once and printed under each name."""
+    mock_convert.side_effect = lambda content, siem_id, **kw: (True, f"query from {siem_id}")
+    args = get_parser().parse_args([
+        "-i", "examples/sample_sigma_rule.yml",
+        "-s", "elasticsearch", "-s", "splunk", "-s", "wazuh", "-s", "elk",
+    ])
+    with patch("sys.stdout", new_callable=StringIO) as out:
+        code = run_convert(args)
+    assert code == 0
+    assert [c.args[1] for c in mock_convert.call_args_list] == ["elasticsearch", "splunk"]
+    text = out.getvalue()
+    for header in ("ELASTICSEARCH", "WAZUH", "ELK"):
+        assert f"# --- {header} ---\nquery from elasticsearch" in text
+    assert text.index("# --- ELASTICSEARCH") < text.index("# --- SPLUNK") < text.index("# --- WAZUH") < text.index("# --- ELK")
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_ndjson_streams_one_record_per_rule_and_siem(mock_convert, tmp_path):
+    """--format ndjson writes one JSON object per (rule, SIEM), failures included, and keeps stdout clean."""
+    (tmp_path / "a.yml").write_text("title: a\nid: 11111111-aaaa\n")
+    (tmp_path / "b.yml").write_text("title: b\n")
+    mock_convert.side_effect = lambda content, siem_id, **kw: (
+        (False, "boom") if "title: b" in content and siem_id == "kusto" else (True, f"{siem_id} query")
+    )
+    argv = ["-i", str(tmp_path), "-s", "splunk", "-s", "kusto", "--format", "ndjson", "--jobs", "1"]
+    with patch("sys.stdout", new_callable=StringIO) as out, patch("sys.stderr", new_callable=StringIO) as err:
+        code = main(argv)
+    assert code == 1
+    assert "Sigma Forage" in err.getvalue()
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(r["rule"], r["siem"], r["ok"]) for r in records] == [
+        (str(tmp_path / "a.yml"), "splunk", True),
+        (str(tmp_path / "a.yml"), "kusto", True),
+        (str(tmp_path / "b.yml"), "splunk", True),
+        (str(tmp_path / "b.yml"), "kusto", False),
+    ]
+    assert records[0]["rule_id"] == "11111111-aaaa" and records[2]["rule_id"] is None
+    assert records[0]["query"] == "splunk query"
+    assert records[3]["error"] == "boom" and "query" not in records[3]
+    assert all(r["duration_ms"] >= 0 for r in records)
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_ndjson_to_output_file(mock_convert, tmp_path):
+    mock_convert.return_value = (True, "q")
+    outpath = tmp_path / "out.ndjson"
+    args = get_parser().parse_args([
+        "-i", "examples/sample_sigma_rule.yml", "-s", "splunk", "-s", "wazuh", "--format", "ndjson", "-o", str(outpath),
+    ])
+    with patch("sys.stderr", new_callable=StringIO) as err:
+        code = run_convert(args)
+    assert code == 0
+    assert [json.loads(line)["siem"] for line in outpath.read_text().splitlines()] == ["splunk", "wazuh"]
+    assert "Wrote 2 record(s)" in err.getvalue()
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_stdin_stream_converts_each_document(mock_convert):
+    """-i - splits a ---separated feed into rules and prints results in feed order."""
+    mock_convert.side_effect = lambda content, siem_id, **kw: (True, content.splitlines()[0])
+    feed = StringIO("title: one\n---\ntitle: two\n---\n---\ntitle: three\n")
+    with patch("sys.stdin", feed), patch("sys.stdout", new_callable=StringIO) as out, patch(
+        "sys.stderr", new_callable=StringIO
+    ):
+        code = main(["-i", "-", "-s", "splunk", "--jobs", "1", "--no-cache"])
+    assert code == 0
+    assert mock_convert.call_count == 3
+    assert out.getvalue().endswith(
+        "# === <stdin>:1 ===\n# --- SPLUNK ---\ntitle: one\n\n"
+        "# === <stdin>:3 ===\n# --- SPLUNK ---\ntitle: two\n\n"
+        "# === <stdin>:6 ===\n# --- SPLUNK ---\ntitle: three\n"
+    )
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_stdin_single_rule_output_unchanged(mock_convert):
+    mock_convert.return_value = (True, "q")
+    with patch("sys.stdin", StringIO("---\ntitle: one\n")), patch("sys.stdout", new_callable=StringIO) as out:
+        code = main(["-i", "-", "-s", "splunk", "--format", "ndjson"])
+    assert code == 0
+    assert json.loads(out.getvalue())["rule"] == "-"
+
+
+def test_convert_empty_glob_returns_error(tmp_path):
+    """A glob that matches no rules is a usage error."""
+    args = get_parser().parse_args(["-i", str(tmp_path / "*.yml"), "-s", "splunk"])
+    with patch("sys.stderr", new_callable=StringIO) as err:
+        code = run_convert(args)
+    assert code == 2
+    assert "No Sigma rules found" in err.getvalue()
+
+
+def test_cache_stats_subcommand(isolated_cache_dir):
+    """`sigmaforage cache stats` reports the cache directory."""
+    with patch("sys.stdout", new_callable=StringIO) as out:
+        code = main(["cache", "stats"])
+    assert code == 0
+    assert str(isolated_cache_dir) in out.getvalue()
+    assert "Entries:   0" in out.getvalue()
+
+
+def test_cache_prune_subcommand():
+    with patch("sys.stdout", new_callable=StringIO) as out:
+        code = main(["cache", "prune", "--max-size", "1", "--max-age", "7"])
+    assert code == 0
+    assert "Removed 0 entries" in out.getvalue()
@@ -0,0 +1,103 @@
+"""Tests for --consolidate (one search per logsource)."""
+
+import json
+from unittest.mock import patch
+
+from sigmaforge.cli import main
+from sigmaforge.consolidate import RuleQuery, consolidate, group_key
+
+RULE = """title: {name}
+id: {name}-id
+level: {level}
+logsource:
+  product: {product}
+  category: process_creation
+detection:
+  sel:
+    Image: {name}
+  condition: sel
+"""
+
+
+def test_splunk_search_labels_every_rule():
+    rules = [
+        RuleQuery("a.yml", "a-id", "high", 'Image="*\\\\a.exe"'),
+        RuleQuery("b.yml", "b-id", None, 'Image="b" OR CommandLine="*x*"'),
+        RuleQuery("c.yml", "c-id", "low", '| rex field=x "(?<y>.)"\n| search y="1"'),
+    ]
+    [combined], separate = consolidate("splunk", rules)
+    assert combined.rules == rules[:2] and separate == rules[2:]
+    assert combined.query == (
+        '(Image="*\\\\a.exe") OR (Image="b" OR CommandLine="*x*")\n'
+        '| eval sigma_rule_id=mvappend(if(searchmatch("Image=\\"*\\\\\\\\a.exe\\""), "a-id", null()), '
+        'if(searchmatch("Image=\\"b\\" OR CommandLine=\\"*x*\\""), "b-id", null()))\n'
+        "| mvexpand sigma_rule_id\n"
+        '| eval sigma_level=case(sigma_rule_id="a-id", "high", sigma_rule_id="b-id", "")'
+    )
+
+
+def test_kusto_groups_by_table():
+    rules = [
+        RuleQuery("a.yml", "a-id", "high", 'DeviceProcessEvents | where Image endswith "\\\\a.exe"'),
+        RuleQuery("b.yml", "b-id", "low", 'DeviceNetworkEvents | where RemoteUrl =~ "b"'),
+        RuleQuery("c.yml", "c-id", "low", 'DeviceProcessEvents | where x == "a|b" or y == 1'),
+        RuleQuery("d.yml", "d-id", "low", "DeviceProcessEvents | where x | summarize count()"),
+        RuleQuery("e.yml", "e-id", "low", 'Image endswith "\\\\e.exe"'),  # no table: not a query on its own
+    ]
+    combined, separate = consolidate("kusto", rules)
+    assert [[r.label for r in c.rules] for c in combined] == [["a-id", "c-id"], ["b-id"]]
+    assert separate == rules[3:]
+    assert combined[0].query == (
+        'DeviceProcessEvents\n| where (Image endswith "\\\\a.exe") or (x == "a|b" or y == 1)\n'
+        '| extend RuleId = pack_array(iff((Image endswith "\\\\a.exe"), "a-id", ""), iff((x == "a|b" or y == 1), "c-id", ""))\n'
+        "| mv-expand RuleId to typeof(string)\n"
+        '| where RuleId != ""\n'
+        '| extend RuleLevel = case(RuleId == "a-id", "high", RuleId == "c-id", "low", "")'
+    )
+    assert combined[1].query.startswith('DeviceNetworkEvents\n| where (RemoteUrl =~ "b")\n')
+
+
+def test_other_backends_stay_separate():
+    rules = [RuleQuery("a.yml", "a-id", "high", "Image:a")]
+    assert consolidate("lucene", rules) == ([], rules)
+    assert group_key({"product": "windows", "category": None, "service": "x"}) == (("product", "windows"), ("service", "x"))
+
+
+def fake_convert(content, siem_id, **kwargs):
+    name = content.splitlines()[0].split(": ")[1]
+    return (False, "boom") if name == "bad" else (True, f'Image="{name}"')
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_cli_writes_one_search_per_logsource(mock_convert, tmp_path, capsys):
+    for name, level, product in [("a", "high", "windows"), ("b", "low", "linux"), ("c", "medium", "windows")]:
+        (tmp_path / f"{name}.yml").write_text(RULE.format(name=name, level=level, product=product))
+    assert main(["-i", str(tmp_path), "-s", "splunk", "-j", "1", "--consolidate"]) == 0
+    out = capsys.readouterr().out
+    assert out.count("# === ") == 2
+    assert "# === product=windows category=process_creation, pipeline sysmon (2 rule(s)) ===" in out
+    assert f"#   c-id [medium] {tmp_path / 'c.yml'}" in out
+    assert '(Image="a") OR (Image="c")\n' in out
+
+    (tmp_path / "bad.yml").write_text(RULE.format(name="bad", level="low", product="windows"))
+    argv = ["-i", str(tmp_path), "-s", "splunk", "-j", "1", "--consolidate", "--format", "ndjson"]
+    assert main(argv) == 1
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines() if line.startswith("{")]
+    assert [(r["logsource"]["product"], [x["rule_id"] for x in r["rules"]]) for r in records] == [
+        ("windows", ["a-id", "c-id"]),
+        ("linux", ["b-id"]),
+    ]
+    assert records[0]["rules"][0]["level"] == "high" and records[0]["consolidated"] is True
+    assert "bad.yml: splunk: boom" in captured.err
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_cli_consolidate_writes_metrics(mock_convert, tmp_path, capsys):
+    (tmp_path / "a.yml").write_text(RULE.format(name="a", level="high", product="windows"))
+    metrics = tmp_path / "metrics.json"
+    argv = ["-i", str(tmp_path), "-s", "splunk", "-j", "1", "--consolidate", "--timings", "--metrics-out", str(metrics)]
+    assert main(argv) == 0
+    assert "p95 ms" in capsys.readouterr().err
+    stages = {(r["siem"], r["stage"]) for r in json.loads(metrics.read_text())["stages"]}
+    assert {("splunk", "total"), ("*", "write")} <= stages
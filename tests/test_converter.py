@@ -5,6 +5,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from sigmaforge.converter import (
+    EngineUnavailable,
     _sigma_cmd,
     _subprocess_env,
     convert_sigma_to_siem,
@@ -45,6 +46,7 @@ def test_successful_conversion(mock_run):
     ok, out = convert_sigma_to_siem(
         "title: Whoami\nlogsource:\n  category: process_creation\n  product: windows\ndetection:\n  selection:\n    Image: '*whoami*'\n  condition: selection",
         "splunk",
+        engine="subprocess",
     )
     assert ok is True
     assert "whoami" in out or "Image" in out or out
@@ -65,6 +67,7 @@ def test_failed_conversion_returns_error(mock_run):
     ok, msg = convert_sigma_to_siem(
         "title: X\nlogsource:\n  category: process_creation\n  product: windows\ndetection:\n  selection:\n    x: 1\n  condition: selection",
         "splunk",
+        engine="subprocess",
     )
     assert ok is False
     assert "splunk" in msg or "Install" in msg or "backend" in msg.lower()
@@ -78,6 +81,7 @@ def test_conversion_passes_correct_args(mock_run):
         "title: X\nlogsource:\n  category: process_creation\n  product: windows\ndetection:\n  selection:\n    x: 1\n  condition: selection",
         "elasticsearch",
         pipeline="windows",
+        engine="subprocess",
     )
     args = mock_run.call_args[0][0]
     assert "convert" in args
@@ -87,3 +91,54 @@ def test_conversion_passes_correct_args(mock_run):
     assert "-p" in args
     idx_p = args.index("-p")
     assert args[idx_p + 1] == "windows"
+
+
+@patch("sigmaforge.converter._convert_subprocess")
+@patch("sigmaforge.converter.convert_in_process")
+def test_auto_engine_prefers_in_process(mock_inproc, mock_subproc):
+    """engine='auto' uses pySigma in-process and does not spawn sigma-cli."""
+    mock_inproc.return_value = (True, "index=main Image=*whoami*")
+    ok, out = convert_sigma_to_siem("title: X", "splunk", engine="auto")
+    assert ok is True
+    assert out == "index=main Image=*whoami*"
+    mock_inproc.assert_called_once_with("title: X", "splunk", "sysmon")
+    mock_subproc.assert_not_called()
+
+
+@patch("sigmaforge.converter._convert_subprocess")
+@patch("sigmaforge.converter.convert_in_process")
+def test_auto_engine_falls_back_to_subprocess(mock_inproc, mock_subproc):
+    """engine='auto' falls back to sigma-cli when the backend is not installed in-process."""
+    mock_inproc.side_effect = EngineUnavailable("Unknown target: splunk")
+    mock_subproc.return_value = (True, "query")
+    ok, out = convert_sigma_to_siem("title: X", "splunk", engine="auto")
+    assert ok is True
+    assert out == "query"
+    mock_subproc.assert_called_once()
+
+
+@patch("sigmaforge.converter._convert_subprocess")
+@patch("sigmaforge.converter.convert_in_process")
+def test_inprocess_engine_does_not_fall_back(mock_inproc, mock_subproc):
+    """engine='inprocess' reports a missing backend instead of spawning sigma-cli."""
+    mock_inproc.side_effect = EngineUnavailable("Unknown target: splunk")
+    ok, msg = convert_sigma_to_siem("title: X", "splunk", engine="inprocess")
+    assert ok is False
+    assert "sigma plugin install splunk" in msg
+    mock_subproc.assert_not_called()
+
+
+def test_unknown_engine_returns_false():
+    """An unknown engine name returns (False, error message)."""
+    ok, msg = convert_sigma_to_siem("title: X", "splunk", engine="warp")
+    assert ok is False
+    assert "Unknown engine" in msg
+
+
+@patch("sigmaforge.converter.subprocess.run")
+def test_inline_content_is_piped_to_stdin(mock_run):
+    """Without a rule path, sigma-cli reads the rule from stdin (no temp file)."""
+    mock_run.return_value = MagicMock(returncode=0, stdout="query", stderr="")
+    convert_sigma_to_siem("title: X\n", "splunk", engine="subprocess", use_cache=False)
+    assert mock_run.call_args[0][0][-1] == "-"
+    assert mock_run.call_args[1]["input"] == "title: X\n"
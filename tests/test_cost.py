@@ -0,0 +1,92 @@
+"""Tests for the static query cost lint (sigmaforage lint --cost)."""
+
+import json
+from unittest.mock import patch
+
+from sigmaforge.cli import main
+from sigmaforge.cost import FANOUT_LIMIT, WEIGHTS, score_query
+
+RULE = """title: {name}
+id: {name}-id
+logsource:
+  category: dns
+detection:
+  sel:
+    query: {name}
+  condition: sel
+"""
+
+
+def checks(query, backend, **kwargs):
+    return {f.check: f.count for f in score_query(query, backend, **kwargs)}
+
+
+def test_splunk_findings():
+    # net_dns_mal_cobaltstrike
+    query = 'query IN ("aaa.stage.*", "post.1*") OR query="*.stage.123456.*"'
+    assert checks(query, "splunk") == {"leading-wildcard": 1, "unscoped": 1, "unindexed-field": 1}
+    assert checks(f"index=dns sourcetype=zeek ({query})", "splunk") == {"leading-wildcard": 1, "unindexed-field": 1}
+    # scoping only inside an OR does not restrict the search
+    assert "unscoped" in checks('index=dns OR query="a"', "splunk")
+
+
+def test_regexes():
+    splunk = 'CommandLine="*x*"\n| regex CommandLine="[a-z]{20}"\n| regex Image="^C:"'
+    assert checks(splunk, "splunk")["unanchored-regex"] == 1
+    assert checks('CommandLine matches regex "(.){200,}"', "kusto")["unanchored-regex"] == 1
+    assert "unanchored-regex" not in checks('CommandLine matches regex "^abc"', "kusto")
+    assert checks("CommandLine:/.*abc/ AND Image:/abc.*/", "lucene") == {"unanchored-regex": 1}
+
+
+def test_kusto_scans_and_table_scope():
+    query = 'Image endswith "\\\\cmd.exe" and CommandLine contains ">" and User =~ "x"'
+    assert checks(query, "kusto") == {"leading-wildcard": 2, "unscoped": 1}
+    assert checks(f"DeviceProcessEvents | where {query}", "kusto") == {"leading-wildcard": 2}
+    assert checks(query, "kusto", indexed_fields=["Image"])["unindexed-field"] == 2
+
+
+def test_or_fanout():
+    values = ", ".join(f'"v{i}"' for i in range(FANOUT_LIMIT + 10))
+    [finding] = [f for f in score_query(f"index=x f IN ({values})", "splunk") if f.check == "or-fanout"]
+    assert finding.count == FANOUT_LIMIT + 10 and finding.points == 6 * WEIGHTS["or-fanout"]
+
+
+def test_unparsable_query_falls_back_to_text():
+    # pySigma's broken quoting of dotted KQL fields
+    query = "''c-uri'' contains \"a\" or ''c-uri'' endswith \"b\""
+    assert checks(query, "kusto") == {"leading-wildcard": 2, "unscoped": 1}
+    assert score_query("from * | where x", "esql") == []
+
+
+def fake_convert(content, siem_id, **kwargs):
+    name = content.splitlines()[0].split(": ")[1]
+    return {"cheap": (True, 'index=dns query="a.example"'), "costly": (True, 'query IN ("*a", "*b")')}.get(
+        name, (False, "boom")
+    )
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_lint_ranks_and_applies_threshold(mock_convert, tmp_path, capsys):
+    for name in ("cheap", "costly"):
+        (tmp_path / f"{name}.yml").write_text(RULE.format(name=name))
+    argv = ["lint", "--cost", "-i", str(tmp_path), "-s", "splunk", "-j", "1"]
+    assert main(argv) == 0
+    out, err = capsys.readouterr()
+    lines = [line for line in out.splitlines() if line.lstrip().split(" ")[0].isdigit()]
+    assert lines[0].split()[0] == "42" and lines[0].endswith("costly.yml")
+    assert lines[1].split()[0] == "2" and lines[1].endswith("cheap.yml")
+    assert "leading-wildcard x2 (+20)" in out
+    assert "2 queries scored, highest 42." in err
+
+    assert main(argv + ["--threshold", "10", "--format", "ndjson"]) == 1
+    out, err = capsys.readouterr()
+    records = [json.loads(line) for line in out.splitlines() if line.startswith("{")]
+    assert [(r["rule"].rsplit("/", 1)[1], r["score"]) for r in records] == [("costly.yml", 42), ("cheap.yml", 2)]
+    assert "1 above the threshold of 10" in err
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_lint_reports_failed_conversions(mock_convert, tmp_path, capsys):
+    (tmp_path / "bad.yml").write_text(RULE.format(name="bad"))
+    assert main(["lint", "-i", str(tmp_path / "bad.yml"), "-s", "splunk", "-j", "1"]) == 1
+    assert "bad.yml: splunk: boom" in capsys.readouterr().err
@@ -0,0 +1,107 @@
+"""Tests for the conversion daemon and its client."""
+
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sigmaforge.cli import get_parser, run_convert
+from sigmaforge.daemon import DaemonClient, DaemonError, find_daemon, parse_address, serve
+
+
+@pytest.fixture
+def daemon(monkeypatch):
+    """Run a daemon on a short Unix socket path in a background thread."""
+    sock_dir = tempfile.mkdtemp(prefix="sf", dir="/tmp")  # AF_UNIX paths are length limited
+    address = str(Path(sock_dir) / "d.sock")
+    monkeypatch.setenv("SIGMAFORGE_DAEMON", address)
+    thread = threading.Thread(target=serve, kwargs={"address": address, "max_concurrent": 2}, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if find_daemon(address):
+            break
+        time.sleep(0.02)
+    yield address
+    try:
+        DaemonClient(address).shutdown()
+    except DaemonError:
+        pass
+    thread.join(timeout=5)
+    shutil.rmtree(sock_dir, ignore_errors=True)
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:8765") == ("127.0.0.1", 8765)
+    assert parse_address("http://localhost:9000") == ("localhost", 9000)
+    assert parse_address("/run/user/1000/sigmaforage.sock") == "/run/user/1000/sigmaforage.sock"
+
+
+def test_find_daemon_without_socket_returns_none(tmp_path):
+    assert find_daemon(str(tmp_path / "missing.sock")) is None
+
+
+def test_serve_refuses_non_loopback():
+    with pytest.raises(ValueError):
+        serve("0.0.0.0:0")
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_daemon_converts_in_request_order(mock_convert, daemon):
+    mock_convert.side_effect = lambda content, siem_id, **kw: (True, f"{content}->{siem_id}")
+    client = DaemonClient(daemon)
+    results = client.convert(
+        [{"path": "a.yml", "content": "A"}, {"path": "b.yml", "content": "B"}],
+        ["splunk", "kusto"],
+    )
+    client.close()
+    assert [(r["rule"], r["siem"], r["text"]) for r in results] == [
+        ("a.yml", "splunk", "A->splunk"),
+        ("a.yml", "kusto", "A->kusto"),
+        ("b.yml", "splunk", "B->splunk"),
+        ("b.yml", "kusto", "B->kusto"),
+    ]
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_client_sends_absolute_pipeline_paths(mock_convert, daemon, tmp_path, monkeypatch):
+    """A relative pipeline file is resolved in the client's directory, not the daemon's."""
+    mock_convert.return_value = (True, "q")
+    (tmp_path / "mypipe.yml").write_text("name: mine\n")
+    monkeypatch.chdir(tmp_path)
+    client = DaemonClient(daemon)
+    client.convert([{"path": "a.yml", "content": "A"}], ["splunk"], pipeline="sysmon,mypipe.yml")
+    client.close()
+    assert mock_convert.call_args.kwargs["pipeline"] == f"sysmon,{tmp_path / 'mypipe.yml'}"
+
+
+def test_daemon_rejects_bad_requests(daemon):
+    client = DaemonClient(daemon)
+    with pytest.raises(DaemonError):
+        client.convert([], [])
+    assert client.health()["ok"] is True
+    client.close()
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_cli_uses_running_daemon(mock_convert, daemon):
+    """run_convert sends work to a running daemon instead of converting locally."""
+    mock_convert.return_value = (True, "query from daemon")
+    args = get_parser().parse_args(["-i", "examples/sample_sigma_rule.yml", "-s", "splunk", "--no-header"])
+    with patch("sys.stdout", new_callable=StringIO) as out, patch("sys.stderr", new_callable=StringIO):
+        code = run_convert(args)
+    assert code == 0
+    assert "query from daemon" in out.getvalue()
+
+
+def test_daemon_shutdown_removes_socket(daemon):
+    DaemonClient(daemon).shutdown()
+    for _ in range(100):
+        if not Path(daemon).exists():
+            break
+        time.sleep(0.02)
+    assert not Path(daemon).exists()
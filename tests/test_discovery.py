@@ -0,0 +1,105 @@
+"""Tests for up-front backend discovery and how the CLI uses it."""
+
+import os
+from unittest.mock import patch
+
+from sigmaforge import discovery
+from sigmaforge.cli import drop_missing_backends, list_siem, main
+from sigmaforge.discovery import missing_backends, parse_target_table  # the real one; conftest patches the module
+
+TABLE = """\
++--------------+-----------------------+------------------------------+---------+
+| Identifier   | Target Query Language | Processing Pipeline Required | Plugin  |
++--------------+-----------------------+------------------------------+---------+
+| kusto        | Kusto queries         | Yes                          | kusto   |
+| splunk       | Splunk SPL            | No                           | splunk  |
++--------------+-----------------------+------------------------------+---------+
+"""
+
+
+def test_parse_target_table():
+    assert parse_target_table(TABLE) == {"kusto", "splunk"}
+
+
+def test_probe_result_is_cached_per_environment():
+    with patch("sigmaforge.discovery._probe_inprocess", return_value=frozenset({"splunk"})) as probe:
+        assert discovery.inprocess_targets() == {"splunk"}
+        assert discovery.inprocess_targets() == {"splunk"}
+    assert probe.call_count == 1
+    with patch("sigmaforge.discovery.environment_fingerprint", return_value="after pip install"):
+        with patch("sigmaforge.discovery._probe_inprocess", return_value=frozenset({"splunk", "loki"})):
+            assert discovery.inprocess_targets() == {"splunk", "loki"}
+
+
+def test_failed_probe_is_not_cached():
+    with patch("sigmaforge.discovery._probe_inprocess", return_value=None):
+        assert discovery.inprocess_targets() is None
+    with patch("sigmaforge.discovery._probe_inprocess", return_value=frozenset({"kusto"})):
+        assert discovery.inprocess_targets() == {"kusto"}
+
+
+def test_cli_probe_is_keyed_by_sigma_cli_site_packages(tmp_path):
+    """A plugin installed into sigma-cli's own venv invalidates the cached probe."""
+    site = tmp_path / "venv" / "lib" / "python3.12" / "site-packages"
+    site.mkdir(parents=True)
+    sigma = tmp_path / "venv" / "bin" / "sigma"
+    sigma.parent.mkdir()
+    sigma.write_text(f"#!{tmp_path / 'venv' / 'bin' / 'python'}\nimport sigma\n")
+    assert discovery.cli_site_packages(str(sigma)) == [site]
+    with patch("sigmaforge.discovery.shutil.which", return_value=str(sigma)):
+        with patch("sigmaforge.discovery._probe_cli", return_value=frozenset({"splunk"})) as probe:
+            assert discovery.cli_targets() == {"splunk"}
+            assert discovery.cli_targets() == {"splunk"}
+        assert probe.call_count == 1
+        os.utime(site, ns=(0, site.stat().st_mtime_ns + 1_000_000_000))  # e.g. `sigma plugin install loki`
+        with patch("sigmaforge.discovery._probe_cli", return_value=frozenset({"splunk", "loki"})):
+            assert discovery.cli_targets() == {"splunk", "loki"}
+
+
+def test_auto_engine_combines_pysigma_and_sigma_cli():
+    with patch("sigmaforge.discovery.inprocess_targets", return_value=frozenset({"splunk"})), patch(
+        "sigmaforge.discovery.cli_targets", return_value=frozenset({"loki"})
+    ) as cli:
+        assert missing_backends({"splunk", "loki", "qradar"}, "auto") == {"qradar"}
+        assert missing_backends({"splunk", "loki"}, "inprocess") == {"loki"}
+        cli.reset_mock()
+        assert missing_backends({"splunk"}, "auto") == set()
+        cli.assert_not_called()  # sigma-cli is only probed when pySigma lacks a backend
+
+
+def test_nothing_discovered_means_no_filtering():
+    with patch("sigmaforge.discovery.inprocess_targets", return_value=None), patch(
+        "sigmaforge.discovery.cli_targets", return_value=None
+    ):
+        assert missing_backends({"splunk"}, "auto") is None
+
+
+def test_explicit_missing_siem_reported_once():
+    with patch("sigmaforge.discovery.missing_backends", return_value={"qradar"}):
+        siem_ids, errors = drop_missing_backends(["splunk", "qradar", "ibm-qradar"], None, False)
+    assert siem_ids == ["splunk"]
+    assert len(errors) == 2 and "pip install pysigma-backend-qradar" in errors[0]
+
+
+def test_all_drops_missing_siems_without_errors(capsys):
+    with patch("sigmaforge.discovery.missing_backends", return_value={"qradar"}):
+        siem_ids, errors = drop_missing_backends(["splunk", "ibm-qradar"], None, True)
+    assert (siem_ids, errors) == (["splunk"], [])
+    assert "Skipping 1 SIEM(s)" in capsys.readouterr().err
+
+
+def test_convert_fails_before_reading_rules_when_no_backend(tmp_path, capsys):
+    with patch("sigmaforge.discovery.missing_backends", return_value={"qradar"}), patch(
+        "sigmaforge.batch.convert_sigma_to_siem"
+    ) as convert:
+        assert main(["-i", str(tmp_path), "-s", "qradar"]) == 1
+    convert.assert_not_called()
+    assert "Backend not installed for SIEM qradar" in capsys.readouterr().err
+
+
+def test_list_siem_shows_installed_status(capsys):
+    with patch("sigmaforge.discovery.missing_backends", return_value={"qradar"}):
+        list_siem()
+    out = capsys.readouterr().out
+    assert "splunk                 -> backend: splunk            installed" in out
+    assert "backend: qradar            not installed" in out
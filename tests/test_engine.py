@@ -0,0 +1,149 @@
+"""Tests for the in-process pySigma engine."""
+
+from unittest.mock import patch
+
+import pytest
+
+from sigmaforge.engine import (
+    BackendCache,
+    CacheInfo,
+    EngineUnavailable,
+    ParsedRuleCache,
+    convert_in_process,
+    format_result,
+    has_backend,
+    pipeline_names,
+)
+
+
+def test_format_result_joins_query_list():
+    """A list of queries is joined with blank lines, like `sigma convert`."""
+    assert format_result(["a=1", "b=2"]) == "a=1\n\nb=2"
+
+
+def test_format_result_passes_strings_through():
+    assert format_result("a=1") == "a=1"
+
+
+def test_format_result_renders_dicts_as_json_lines():
+    assert format_result([{"q": 1}, {"q": 2}]) == '{"q": 1}\n{"q": 2}'
+
+
+def test_format_result_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        format_result(42)
+
+
+def test_unknown_backend_raises_engine_unavailable():
+    """A backend that is not installed cannot be handled in-process."""
+    with pytest.raises(EngineUnavailable):
+        convert_in_process("title: X", "no-such-backend-xyz")
+
+
+def test_has_backend_false_for_unknown():
+    assert has_backend("no-such-backend-xyz") is False
+
+
+@patch("sigmaforge.engine.build_backend")
+def test_backend_cache_reuses_backends(mock_build):
+    """A second lookup for the same backend and pipeline is a hit and builds nothing."""
+    mock_build.side_effect = lambda backend_id, pipeline: object()
+    cache = BackendCache(maxsize=4)
+    first = cache.get("splunk", "sysmon")
+    second = cache.get("splunk", "sysmon")
+    assert first is second
+    assert mock_build.call_count == 1
+    assert cache.info() == CacheInfo(hits=1, misses=1, maxsize=4, currsize=1)
+
+
+@patch("sigmaforge.engine.build_backend")
+def test_backend_cache_keys_on_pipeline(mock_build):
+    """Different pipelines get different backend objects."""
+    mock_build.side_effect = lambda backend_id, pipeline: object()
+    cache = BackendCache(maxsize=4)
+    assert cache.get("splunk", "sysmon") is not cache.get("splunk", "windows")
+    assert cache.info().misses == 2
+
+
+@patch("sigmaforge.engine.build_backend")
+def test_backend_cache_evicts_least_recently_used(mock_build):
+    """With maxsize=2, the least recently used entry is evicted first."""
+    mock_build.side_effect = lambda backend_id, pipeline: object()
+    cache = BackendCache(maxsize=2)
+    splunk = cache.get("splunk", "sysmon")
+    cache.get("kusto", "sysmon")
+    cache.get("splunk", "sysmon")  # splunk is now most recently used
+    cache.get("lucene", "sysmon")  # evicts kusto
+    assert cache.info().currsize == 2
+    assert cache.get("splunk", "sysmon") is splunk
+    cache.get("kusto", "sysmon")
+    assert mock_build.call_count == 4
+
+
+@patch("sigmaforge.engine.build_backend")
+def test_backend_cache_resize_and_clear(mock_build):
+    mock_build.side_effect = lambda backend_id, pipeline: object()
+    cache = BackendCache(maxsize=4)
+    for backend_id in ("splunk", "kusto", "lucene"):
+        cache.get(backend_id, "sysmon")
+    cache.resize(1)
+    assert cache.info().currsize == 1
+    cache.clear()
+    assert cache.info() == CacheInfo(hits=0, misses=0, maxsize=1, currsize=0)
+
+
+def test_pipeline_names_splits_commas():
+    assert pipeline_names("sysmon") == ("sysmon",)
+    assert pipeline_names("sysmon, fields.yml") == ("sysmon", "fields.yml")
+
+
+RULE = """
+title: Parse Once
+logsource:
+  category: process_creation
+  product: windows
+detection:
+  selection:
+    Image|endswith: '\\whoami.exe'
+  condition: selection
+"""
+
+
+def test_parsed_rule_cache_parses_once_and_hands_out_copies():
+    pytest.importorskip("sigma.collection")
+    cache = ParsedRuleCache()
+    first = cache.get(RULE)
+    second = cache.get(RULE)
+    assert first is not second
+    assert first.rules[0] is not second.rules[0]
+    assert first.rules[0].title == second.rules[0].title == "Parse Once"
+    assert cache.info() == CacheInfo(1, 1, cache.maxsize, 1)
+
+
+def test_parsed_rule_cache_caches_parse_errors():
+    pytest.importorskip("sigma.collection")
+    from sigma.exceptions import SigmaError
+
+    cache = ParsedRuleCache()
+    for _ in range(2):
+        with pytest.raises(SigmaError):
+            cache.get("title: Broken\ndetection: {}\n")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_parsed_rule_cache_evicts_least_recently_used():
+    pytest.importorskip("sigma.collection")
+    cache = ParsedRuleCache(maxsize=1)
+    cache.get(RULE)
+    cache.get(RULE.replace("Parse Once", "Other"))
+    cache.get(RULE)
+    assert cache.info().misses == 3
+
+
+@pytest.mark.skipif(not has_backend("splunk"), reason="pySigma Splunk backend not installed")
+def test_reused_parse_converts_identically():
+    """Pipelines mutate the rule, so every conversion must see a pristine copy."""
+    first = convert_in_process(RULE, "splunk", "sysmon")
+    again = convert_in_process(RULE, "splunk", "sysmon")
+    assert first == again
+    assert first[0] and first[1].count("whoami.exe") == 1
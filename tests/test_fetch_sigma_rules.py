@@ -0,0 +1,99 @@
+"""Tests for scripts/fetch_sigma_rules.py against a local HTTP server."""
+
+import importlib.util
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "fetch_sigma_rules.py"
+RULE = b"title: x\n"
+ETAG = '"v1"'
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("fetch_sigma_rules", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests: list = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path.endswith("broken.yml"):
+            # promise more than is sent, then hang up: the download fails mid-body
+            self.send_response(200)
+            self.send_header("Content-Length", "100")
+            self.end_headers()
+            self.wfile.write(b"title: trunc")
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(RULE)))
+        self.end_headers()
+        self.wfile.write(RULE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_second_run_sends_conditional_request_and_keeps_file(server, tmp_path):
+    fetch = load_script()
+    argv = ["fetch_sigma_rules.py", "--base-url", server, "--out", str(tmp_path), "-j", "2"]
+    with patch.object(fetch, "RULES", {"Windows": ["rules/windows/a.yml"]}), patch("sys.argv", argv):
+        assert fetch.main() == 0
+        rule = tmp_path / "Windows" / "a.yml"
+        assert rule.read_bytes() == RULE
+        manifest = json.loads((tmp_path / ".manifest.json").read_text())
+        assert manifest["files"]["Windows/a.yml"]["etag"] == ETAG
+        mtime = rule.stat().st_mtime_ns
+
+        assert fetch.main() == 0
+    assert Handler.requests[-1] == ("/rules/windows/a.yml", ETAG)  # answered with 304
+    assert rule.stat().st_mtime_ns == mtime
+
+
+def test_failed_download_leaves_old_file_and_no_temp_file(server, tmp_path):
+    fetch = load_script()
+    dest = tmp_path / "broken.yml"
+    dest.write_bytes(b"title: old\n")
+    pool = fetch.ConnectionPool(timeout=5)
+    with pytest.raises(Exception):
+        fetch.sync_one(pool, f"{server}/rules/broken.yml", dest, None)
+    assert dest.read_bytes() == b"title: old\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["broken.yml"]
+
+
+def test_atomic_write_cleans_up_after_a_failed_write(tmp_path):
+    fetch = load_script()
+    dest = tmp_path / "a.yml"
+    dest.write_bytes(b"old")
+    with patch.object(fetch.os, "replace", side_effect=OSError("disk full")), pytest.raises(OSError):
+        fetch.atomic_write(dest, b"new")
+    assert dest.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["a.yml"]
@@ -0,0 +1,121 @@
+"""Tests for offline rule evaluation (sigmaforage hunt)."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from sigmaforge.cli import main
+from sigmaforge.hunt import Event, Hunter, Prefilter, RuleError, compile_rule
+
+RULES_DIR = Path(__file__).resolve().parent.parent / "sigma-rules"
+
+RULE = """title: Curl Download
+id: curl-id
+level: medium
+logsource:
+  category: process_creation
+  product: windows
+detection:
+  selection_img:
+    - Image|endswith: '\\curl.exe'
+    - OriginalFileName: 'curl.exe'
+  selection_cli:
+    CommandLine|contains|all:
+      - ' -o'
+      - 'http'
+  filter_main_local:
+    DestinationIp|cidr: '10.0.0.0/8'
+  condition: all of selection_* and not 1 of filter_main_*
+"""
+
+
+def matches(detection: str, event: dict) -> bool:
+    rule = compile_rule(f"title: t\ndetection:\n{detection}", "t.yml")
+    return rule.match(Event(event))
+
+
+def test_modifiers_and_wildcards():
+    assert matches("  sel:\n    Image|endswith: '\\cmd.exe'\n  condition: sel", {"Image": "C:\\WINDOWS\\CMD.EXE"})
+    assert not matches("  sel:\n    Image|endswith|cased: '\\cmd.exe'\n  condition: sel", {"Image": "C:\\CMD.EXE"})
+    assert matches("  sel:\n    Image: 'c:\\win*\\c?d.exe'\n  condition: sel", {"Image": "C:\\Windows\\cmd.exe"})
+    assert matches("  sel:\n    CommandLine|re: '-e(nc)? [A-Z]'\n  condition: sel", {"CommandLine": "ps -enc QQ"})
+    assert not matches("  sel:\n    CommandLine|re: '-E [a-z]'\n  condition: sel", {"CommandLine": "ps -e q"})
+    assert matches("  sel:\n    EventID: 4688\n  condition: sel", {"EventID": "4688"})
+    assert matches("  sel:\n    Size|gte: 10\n  condition: sel", {"Size": 12})
+    assert matches("  sel:\n    ParentImage: null\n  condition: sel", {"Image": "x"})
+    assert matches("  sel:\n    ParentImage|exists: false\n  condition: sel", {"Image": "x"})
+    assert matches("  kw:\n    - 'mimikatz'\n  condition: kw", {"a": 1, "b": ["x", "Invoke-Mimikatz"]})
+    assert matches("  sel:\n    Path: 'a\\*b'\n  condition: sel", {"Path": "a*b"})
+    assert not matches("  sel:\n    Path: 'a\\*b'\n  condition: sel", {"Path": "axb"})
+
+
+def test_condition_and_evtx_fields():
+    rule = compile_rule(RULE, "curl.yml")
+    event = {
+        "Event": {
+            "System": {"EventID": {"#attributes": {"Qualifiers": ""}, "#text": 1}},
+            "EventData": {"Image": "C:\\Tools\\curl.exe", "CommandLine": "curl -o x http://a", "DestinationIp": "8.8.8.8"},
+        }
+    }
+    assert rule.match(Event(event))
+    event["Event"]["EventData"]["DestinationIp"] = "10.1.2.3"
+    assert not rule.match(Event(event))
+    assert Event(event).values("Event.System.EventID") == [1]
+    # an AND only needs the anchors of one side, the one with fewer of them
+    assert rule.anchors == frozenset({"http"})
+
+
+def test_unsupported_rules():
+    with pytest.raises(RuleError, match="base64offset"):
+        compile_rule("detection:\n  sel:\n    a|base64offset|contains: x\n  condition: sel", "r.yml")
+    with pytest.raises(RuleError, match="aggregation"):
+        compile_rule("detection:\n  sel:\n    a: x\n  condition: sel | count() > 5", "r.yml")
+    with pytest.raises(RuleError, match="unknown detection"):
+        compile_rule("detection:\n  sel:\n    a: x\n  condition: sel and other", "r.yml")
+    with pytest.raises(RuleError, match="only one comparison modifier"):
+        compile_rule("detection:\n  sel:\n    Count|gt|lt: 5\n  condition: sel", "r.yml")
+
+
+def test_prefilter_finds_overlapping_anchors():
+    rules = [compile_rule(f"detection:\n  sel:\n    a|contains: {word}\n  condition: sel", "r.yml") for word in ("he", "she", "hers", "x")]
+    assert Prefilter(rules).candidates(["ushers"]) == {0, 1, 2}
+
+
+def test_prefilter_agrees_with_full_evaluation():
+    rules = [compile_rule(path.read_text(encoding="utf-8"), str(path)) for path in sorted(RULES_DIR.rglob("*.yml"))]
+    events = [
+        {"Image": "C:\\Windows\\System32\\curl.exe", "CommandLine": "curl http://x -o y"},
+        {"eventSource": "cloudtrail.amazonaws.com", "eventName": "StopLogging"},
+        {"query": "x.example", "QueryName": "a.b"},
+        {"Event": {"EventData": {"Image": "/usr/bin/whoami", "CommandLine": "whoami"}}},
+    ]
+    hunter = Hunter(rules)
+    for raw in events:
+        event = Event(raw)
+        assert hunter.match(raw) == [i for i, rule in enumerate(rules) if rule.match(event)]
+    assert hunter.skipped() > 0.5
+
+
+def test_cli_reports_hits(tmp_path, capsys):
+    (tmp_path / "curl.yml").write_text(RULE)
+    (tmp_path / "bad.yml").write_text("title: bad\ndetection:\n  sel:\n    a|windash: x\n  condition: sel\n")
+    events = tmp_path / "events.jsonl"
+    lines = [
+        {"Image": "C:\\curl.exe", "CommandLine": "curl -o a http://x"},
+        {"Image": "C:\\curl.exe", "CommandLine": "curl --version"},
+        {"OriginalFileName": "curl.exe", "CommandLine": "curl.exe -o b http://y", "DestinationIp": "1.1.1.1"},
+    ]
+    events.write_text("\n".join(json.dumps(e) for e in lines) + "\nnot json\n")
+    assert main(["hunt", "-i", str(tmp_path), "--events", str(events), "--max-events", "1"]) == 1
+    out, err = capsys.readouterr()
+    assert f"     2  Curl Download ({tmp_path / 'curl.yml'})" in out
+    assert f"{events}:1 " in out and f"{events}:3 " not in out
+    assert "bad.yml: unsupported modifier |windash" in err
+    assert "3 event(s) against 1 rule(s)" in err and "1 line(s) skipped" in err
+
+    events.write_text(json.dumps(lines))
+    assert main(["hunt", "-i", str(tmp_path / "curl.yml"), "--events", str(events), "--format", "ndjson"]) == 0
+    [record] = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    assert record["hits"] == 2 and record["rule_id"] == "curl-id"
+    assert [e["line"] for e in record["events"]] == [1, 3]
@@ -0,0 +1,106 @@
+"""Tests for the SQLite rule index and the --tag/--logsource/--level filters."""
+
+import os
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+
+from sigmaforge import index as index_module
+from sigmaforge.cli import main
+from sigmaforge.index import RuleIndex, RuleSelection, parse_level, parse_logsource
+from sigmaforge.rules import iter_rule_paths
+
+RULE = """title: {title}
+id: {title}-id
+status: test
+modified: 2024-05-01
+level: {level}
+tags:
+{tags}
+logsource:
+  category: {category}
+detection:
+  sel:
+    x: 1
+  condition: sel
+"""
+
+
+def write_rule(path, title, level="medium", category="dns", tags=("attack.t1071.004",)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(RULE.format(title=title, level=level, category=category, tags="\n".join(f"  - {t}" for t in tags)))
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "rules"
+    write_rule(root / "dns" / "a.yml", "a", level="critical")
+    write_rule(root / "dns" / "b.yml", "b", level="low", tags=("attack.t1071",))
+    write_rule(root / "proc" / "c.yml", "c", level="high", category="process_creation", tags=("attack.T1059",))
+    return root
+
+
+def build(index_path, root):
+    with RuleIndex(index_path) as index:
+        return index.update(list(iter_rule_paths(str(root))), [root])
+
+
+def select(index_path, root, **filters):
+    with RuleIndex(index_path) as index:
+        return [os.path.basename(row["path"]) for row in index.select(RuleSelection(**filters))]
+
+
+def test_metadata_is_extracted(corpus, tmp_path):
+    db = tmp_path / "index.sqlite3"
+    build(db, corpus)
+    with RuleIndex(db) as index:
+        row = index.select(RuleSelection(levels=("critical",)))[0]
+    assert (row["id"], row["title"], row["status"], row["modified"], row["category"]) == (
+        "a-id", "a", "test", "2024-05-01", "dns",
+    )
+    assert len(row["sha256"]) == 64 and row["mtime_ns"] > 0
+
+
+def test_filters(corpus, tmp_path):
+    db = tmp_path / "index.sqlite3"
+    build(db, corpus)
+    assert select(db, corpus, tags=("attack.t1071",)) == ["a.yml", "b.yml"]  # sub-technique matches
+    assert select(db, corpus, tags=("attack.t1059",)) == ["c.yml"]  # tags are case-insensitive
+    assert select(db, corpus, levels=parse_level("high+")) == ["a.yml", "c.yml"]
+    assert select(db, corpus, logsource=(parse_logsource("category=dns"),), levels=("low",)) == ["b.yml"]
+    assert select(db, corpus, tags=("attack.t1071",), levels=parse_level("high+")) == ["a.yml"]
+
+
+def test_rebuild_only_reads_changed_files(corpus, tmp_path):
+    db = tmp_path / "index.sqlite3"
+    assert build(db, corpus)[:4] == (3, 0, 0, 0)
+    write_rule(corpus / "dns" / "b.yml", "b", level="critical")
+    os.utime(corpus / "dns" / "a.yml")  # touched, same content
+    (corpus / "proc" / "c.yml").unlink()
+    with patch("sigmaforge.index.rule_metadata", wraps=index_module.rule_metadata) as parse:
+        assert build(db, corpus)[:4] == (0, 1, 1, 1)
+    assert parse.call_count == 1
+    assert select(db, corpus, levels=("critical",)) == ["a.yml", "b.yml"]
+
+
+def test_invalid_filters():
+    with pytest.raises(ValueError):
+        parse_level("severe")
+    with pytest.raises(ValueError):
+        parse_logsource("category")
+    assert parse_level("medium,critical") == ("medium", "critical")
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", return_value=(True, "q"))
+def test_convert_reads_only_selected_rules(mock_convert, corpus, tmp_path):
+    argv = ["-i", str(corpus), "-s", "splunk", "--jobs", "1", "--index", str(tmp_path / "ix.sqlite3")]
+    assert main(["index", "build", "-i", str(corpus), "--index", str(tmp_path / "ix.sqlite3")]) == 0
+    with patch("sys.stdout", new_callable=StringIO) as out:
+        assert main(argv + ["--logsource", "category=dns", "--level", "medium+"]) == 0
+    assert mock_convert.call_count == 1
+    assert "a.yml ===" in out.getvalue() and "b.yml" not in out.getvalue()
+
+
+def test_convert_with_no_match_is_an_error(corpus, tmp_path):
+    assert main(["-i", str(corpus), "-s", "splunk", "--tag", "attack.t9999", "--index", str(tmp_path / "ix.sqlite3")]) == 2
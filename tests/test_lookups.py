@@ -0,0 +1,105 @@
+"""Tests for --lookup-threshold (oversized value lists moved into lookup files)."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from sigmaforge.cli import main
+from sigmaforge.lookups import LookupWriter, lookup_name
+
+RULE = """title: {name}
+id: {name}-id
+logsource:
+  category: dns
+detection:
+  sel:
+    query: {name}
+  condition: sel
+"""
+
+
+def test_splunk_list_becomes_inputlookup(tmp_path):
+    writer = LookupWriter(tmp_path, 2)
+    query = 'index=dns dest IN ("a.com", "*.b.com", "c\\\\d") OR Image="x"\n| stats count by dest'
+    name = lookup_name(["a.com", "*.b.com", "c\\d"])
+    assert writer.rewrite(query, "splunk") == (
+        f"index=dns ([| inputlookup {name}.csv | rename value AS dest | fields dest] OR Image=\"x\")\n"
+        "| stats count by dest"
+    )
+    assert (tmp_path / f"{name}.csv").read_text() == "value\n*.b.com\na.com\nc\\d\n"
+    # subsearch values of `query` and `search` become raw terms unless formatted as field="value"
+    name = lookup_name(["a.com", "*.b.com", "c.org"])
+    assert writer.rewrite('query IN ("a.com", "*.b.com", "c.org")', "splunk") == (
+        f"[| inputlookup {name}.csv | rename value AS query | fields query | format]"
+    )
+    assert writer.rewrite('search IN ("a", "b\\\\c", "d")', "splunk") == 'search IN ("a", "b\\\\c", "d")'
+    # at or below the threshold, and literal `*` values, stay inline
+    assert writer.rewrite('query IN ("a", "b")', "splunk") == 'query IN ("a", "b")'
+    assert writer.rewrite('query IN ("a\\*", "b", "c")', "splunk") == 'query IN ("a\\*", "b", "c")'
+
+
+def test_kusto_list_becomes_watchlist(tmp_path):
+    writer = LookupWriter(tmp_path, 2)
+    query = 'QueryName !in~ ("a.com", "b.com", "c.com") and not(Image endswith "x")'
+    name = lookup_name(["a.com", "b.com", "c.com"])
+    assert writer.rewrite(query, "kusto") == (
+        f"QueryName !in~ ((_GetWatchlist('{name}') | project SearchKey)) and not(Image endswith \"x\")"
+    )
+    chain = 'Q endswith "a" or Q endswith "b" or Q endswith "c"'
+    assert writer.rewrite(chain, "kusto") == chain
+
+
+def test_lucene_list_becomes_terms_lookup(tmp_path):
+    writer = LookupWriter(tmp_path, 2)
+    query = "dns.question.name:(a.com OR b.com OR c\\:d) AND NOT Image:x*"
+    name = lookup_name(["a.com", "b.com", "c:d"])
+    assert json.loads(writer.rewrite(query, "lucene")) == {
+        "bool": {
+            "filter": [
+                {"terms": {"dns.question.name": {"index": "sigma-lists", "id": name, "path": "values"}}},
+                {"bool": {"must_not": [{"query_string": {"query": "Image:x*"}}]}},
+            ]
+        }
+    }
+    assert json.loads((tmp_path / f"{name}.json").read_text()) == {"values": ["a.com", "b.com", "c:d"]}
+    wildcards = "dns.question.name:(*a.com OR b.com OR c)"
+    assert writer.rewrite(wildcards, "lucene") == wildcards
+
+
+def test_identical_lists_share_one_file(tmp_path):
+    writer = LookupWriter(tmp_path, 1)
+    writer.rewrite('query IN ("a", "b")', "splunk")
+    writer.rewrite('q IN ("b", "a")', "splunk")
+    writer.rewrite('q in~ ("a", "b")', "kusto")
+    assert writer.written == [tmp_path / f"{lookup_name(['a', 'b'])}.csv"]
+    with pytest.raises(ValueError):
+        LookupWriter(tmp_path, 0)
+
+
+def fake_convert(content, siem_id, **kwargs):
+    name = content.splitlines()[0].split(": ")[1]
+    values = ", ".join(f'"{name}{i}.com"' for i in range(3))
+    return True, f"index=dns query IN ({values})"
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_cli_writes_lookups(mock_convert, tmp_path, capsys):
+    rules = tmp_path / "rules"
+    rules.mkdir()
+    for name in ("a", "b"):
+        (rules / f"{name}.yml").write_text(RULE.format(name=name))
+    out_dir = tmp_path / "lookups"
+    argv = ["-i", str(rules), "-s", "splunk", "-j", "1", "--lookup-threshold", "2", "--lookup-dir", str(out_dir)]
+    assert main(argv) == 0
+    out, err = capsys.readouterr()
+    assert out.count("| inputlookup sigma_list_") == 2
+    assert sorted(p.name for p in out_dir.iterdir()) == sorted(
+        f"{lookup_name([f'{n}{i}.com' for i in range(3)])}.csv" for n in "ab"
+    )
+    assert f"Wrote 2 lookup file(s) to {out_dir}." in err
+
+    assert main(argv + ["--consolidate"]) == 0
+    out, err = capsys.readouterr()
+    assert out.count("(separate search)") == 2 and "lookup file(s)" not in err
+    assert main(argv[:-4] + ["--lookup-threshold", "0"]) == 2
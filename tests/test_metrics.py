@@ -0,0 +1,62 @@
+"""Tests for per-stage timings (--timings / --metrics-out)."""
+
+import json
+from collections import Counter
+from io import StringIO
+from unittest.mock import patch
+
+from sigmaforge.cli import main
+from sigmaforge.metrics import StageTimings, percentile
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 21)]
+    assert percentile(values, 0.5) == 10
+    assert percentile(values, 0.95) == 19
+    assert percentile([3.0], 0.95) == 3
+
+
+def test_record_conversion_samples_only_stages_that_ran():
+    timings = StageTimings()
+    timings.record_conversion("splunk", True, Counter(parse_seconds=0.002, backend_seconds=0.004, convert_seconds=0.007))
+    timings.record_conversion("kusto", True, Counter(backend_seconds=0.003, convert_seconds=0.004))
+    rows = {(r["siem"], r["stage"]): r for r in timings.summary()}
+    assert ("kusto", "parse") not in rows
+    assert rows[("*", "backend")]["count"] == 2
+    assert rows[("*", "total")]["max"] == 0.007
+    assert rows[("splunk", "parse")]["p50"] == 0.002
+
+
+def test_prometheus_output_groups_metric_families():
+    timings = StageTimings()
+    timings.record_conversion("splunk", False, Counter(convert_seconds=0.5))
+    text = timings.to_prometheus(Counter(result_hits=3, result_misses=1))
+    assert 'sigmaforge_stage_seconds{siem="splunk",stage="total",quantile="0.95"} 0.500000' in text
+    assert 'sigmaforge_stage_seconds_count{siem="*",stage="total"} 1' in text
+    assert 'sigmaforge_conversions_total{siem="splunk",result="error"} 1' in text
+    hits = text.index("# TYPE sigmaforge_cache_hits_total counter")
+    assert hits < text.index('sigmaforge_cache_hits_total{cache="result"} 3') < text.index("# TYPE sigmaforge_cache_misses_total")
+
+
+def test_write_picks_format_from_extension(tmp_path):
+    timings = StageTimings()
+    timings.record("*", "read", 0.001)
+    timings.write(str(tmp_path / "m.prom"))
+    timings.write(str(tmp_path / "m.json"))
+    assert (tmp_path / "m.prom").read_text().startswith("# HELP")
+    assert json.loads((tmp_path / "m.json").read_text())["stages"][0]["stage"] == "read"
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem")
+def test_cli_timings_and_metrics_out(mock_convert, tmp_path):
+    mock_convert.return_value = (True, "q")
+    metrics = tmp_path / "metrics.json"
+    argv = ["-i", "examples/sample_sigma_rule.yml", "-s", "splunk", "-s", "wazuh",
+            "--timings", "--metrics-out", str(metrics), "--no-cache"]
+    with patch("sys.stdout", new_callable=StringIO), patch("sys.stderr", new_callable=StringIO) as err:
+        assert main(argv) == 0
+    assert "p95 ms" in err.getvalue()
+    payload = json.loads(metrics.read_text())
+    stages = {(r["siem"], r["stage"]) for r in payload["stages"]}
+    assert {("splunk", "total"), ("wazuh", "total"), ("*", "read"), ("*", "write")} <= stages
+    assert {c["siem"] for c in payload["conversions"]} == {"splunk", "wazuh"}
@@ -0,0 +1,233 @@
+"""Tests for the --optimize query rewrite passes."""
+
+import random
+import re
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sigmaforge.converter import convert_sigma_to_siem
+from sigmaforge.engine import convert_in_process, has_backend
+from sigmaforge.optimize import DIALECTS, Group, Not, Unsupported, optimize_query
+
+RULES_DIR = Path(__file__).resolve().parent.parent / "sigma-rules"
+
+
+@pytest.mark.parametrize(
+    "backend, before, after",
+    [
+        # net_dns_mal_cobaltstrike: the OR chain becomes one set
+        (
+            "splunk",
+            'query IN ("aaa.stage.*", "post.1*") OR query="*.stage.123456.*"',
+            'query IN ("aaa.stage.*", "post.1*", "*.stage.123456.*")',
+        ),
+        (
+            "lucene",
+            "(query:(aaa.stage.* OR post.1*)) OR query:*.stage.123456.*",
+            "query:(aaa.stage.* OR post.1* OR *.stage.123456.*)",
+        ),
+        # proc_creation_macos_file_and_directory_discovery: =~ chains become in~
+        (
+            "kusto",
+            '(Image =~ "/bin/ls" and CommandLine contains "-R") or Image =~ "/usr/bin/find" or Image =~ "/tree"',
+            '(Image =~ "/bin/ls" and CommandLine contains "-R") or Image in~ ("/usr/bin/find", "/tree")',
+        ),
+        # proxy_raw_paste_service_access: "*paste.ee/*" already covers "*.paste.ee/r/*"
+        (
+            "splunk",
+            '"c-uri" IN ("*.paste.ee/r/*", "*pastebin.pl/*", "*paste.ee/*")',
+            '"c-uri" IN ("*pastebin.pl/*", "*paste.ee/*")',
+        ),
+        # proxy_downloadcradle_webdav: exact match before the prefix scan
+        (
+            "splunk",
+            '"c-useragent"="Microsoft-WebDAV-MiniRedir/*" "cs-method"="GET"',
+            '"cs-method"="GET" "c-useragent"="Microsoft-WebDAV-MiniRedir/*"',
+        ),
+        ("splunk", 'Image="*\\\\cmd.exe" index=sysmon', 'index=sysmon Image="*\\\\cmd.exe"'),
+        ("splunk", 'CommandLine="**whoami**"', 'CommandLine="*whoami*"'),
+        # Only the base search is rewritten; pipe commands are kept verbatim
+        (
+            "splunk",
+            '| rex field=x "(?<m>.)"\n| search a="1" OR a="2"',
+            '| rex field=x "(?<m>.)"\n| search a IN ("1", "2")',
+        ),
+        (
+            "kusto",
+            'x startswith "ab" or x startswith "abc" or x contains "b" or x =~ "Q"',
+            'x contains "b" or x =~ "Q"',
+        ),
+    ],
+)
+def test_rewrites(backend, before, after):
+    assert optimize_query(before, backend) == after
+
+
+@pytest.mark.parametrize(
+    "backend, query",
+    [
+        # has_any matches terms, not substrings: contains chains stay as they are
+        ("kusto", 'x contains "a" or x contains "b"'),
+        # different case-sensitive and insensitive operators are not merged
+        ("kusto", 'x == "a" or x =~ "b"'),
+        # empty and escaped-wildcard values are never treated as covered
+        ("splunk", 'f IN ("", "*")'),
+        ("splunk", 'f IN ("a\\*", "*")'),
+        # Lucene is case-sensitive
+        ("lucene", "f:(*Abc* OR *abc*)"),
+        # syntax the parser does not know is passed through
+        ("kusto", "''c-uri'' contains \"a\" or ''c-uri'' contains \"b\""),
+        ("lucene", "a:1 AND b:2 OR a:1"),
+        ("splunk", 'a="1" OR a="2" | stats count'),
+        ("esql", 'from * | where a == "1" or a == "2"'),
+    ],
+)
+def test_left_unchanged(backend, query):
+    assert optimize_query(query, backend) == query
+
+
+@patch("sigmaforge.converter.convert_in_process", return_value=(True, 'a="1" OR a="2"'))
+def test_cache_keeps_backend_output(mock_convert):
+    assert convert_sigma_to_siem("title: X", "splunk", optimize=True) == (True, 'a IN ("1", "2")')
+    assert convert_sigma_to_siem("title: X", "splunk") == (True, 'a="1" OR a="2"')
+    assert convert_sigma_to_siem("title: X", "splunk", optimize=True) == (True, 'a IN ("1", "2")')
+    assert mock_convert.call_count == 1
+
+
+# Semantic check: the optimized query must match exactly the events the original matches
+
+
+def _glob(raw: str, flags: int) -> re.Pattern:
+    out, i = [], 0
+    while i < len(raw):
+        if raw[i] == "\\" and i + 1 < len(raw):
+            out.append(re.escape(raw[i + 1]))
+            i += 2
+            continue
+        out.append({"*": ".*", "?": "."}.get(raw[i], re.escape(raw[i])))
+        i += 1
+    return re.compile("".join(out), flags | re.DOTALL)
+
+
+def _kusto_string(raw: str) -> str:
+    literal = DIALECTS["kusto"].literal(raw)
+    if literal is None:
+        raise Unsupported(raw)
+    return literal
+
+
+def term_matches(term, event: dict, backend: str) -> bool:
+    field = (term.field or "").strip("\"'")
+    value = event.get(field)
+    if backend == "splunk":
+        if term.op not in ("=", "in"):
+            raise Unsupported(term.text)
+        return value is not None and any(
+            _glob(v[1:-1] if v.startswith('"') else v, re.IGNORECASE).fullmatch(value) for v in term.values
+        )
+    if backend == "lucene":
+        if field == "_exists_":
+            return term.values[0] in event
+        if value is None:
+            return False
+        for v in term.values:
+            if v.startswith("/"):
+                hit = re.fullmatch(v[1:-1], value)
+            elif v.startswith('"'):
+                hit = value == v[1:-1]
+            else:
+                hit = _glob(v, 0).fullmatch(value)
+            if hit:
+                return True
+        return False
+    if value is None:
+        return False
+    if term.op == "matches regex":
+        return re.search(_kusto_string(term.values[0]), value) is not None
+    literals = [_kusto_string(v) for v in term.values]
+    folded = [x.casefold() for x in literals]
+    checks = {
+        "=~": lambda: value.casefold() in folded,
+        "in~": lambda: value.casefold() in folded,
+        "==": lambda: value in literals,
+        "in": lambda: value in literals,
+        "contains": lambda: folded[0] in value.casefold(),
+        "startswith": lambda: value.casefold().startswith(folded[0]),
+        "endswith": lambda: value.casefold().endswith(folded[0]),
+    }
+    if term.op not in checks:
+        raise Unsupported(term.text)
+    return checks[term.op]()
+
+
+def evaluate(node, event: dict, backend: str) -> bool:
+    if isinstance(node, Not):
+        return not evaluate(node.child, event, backend)
+    if isinstance(node, Group):
+        combine = all if node.op == "and" else any
+        return combine(evaluate(child, event, backend) for child in node.children)
+    return term_matches(node, event, backend)
+
+
+def terms(node):
+    if isinstance(node, Not):
+        yield from terms(node.child)
+    elif isinstance(node, Group):
+        for child in node.children:
+            yield from terms(child)
+    else:
+        yield node
+
+
+def sample_events(tree, count: int = 300) -> list[dict]:
+    """Random events built from the query's own values, wildcards filled in several ways."""
+    candidates: dict[str, list[str]] = {}
+    for term in terms(tree):
+        field = (term.field or "").strip("\"'")
+        for raw in term.values:
+            text = raw.strip("\"'/").replace("\\\\", "\x00").replace("\\", "").replace("\x00", "\\")
+            for fill in ("", "x", "/r/"):
+                sample = text.replace("*", fill)
+                candidates.setdefault(field, []).extend([sample, sample.upper()])
+    rng = random.Random(0)
+    events = []
+    for _ in range(count):
+        event = {}
+        for field, values in candidates.items():
+            pick = rng.random()
+            if pick < 0.6:
+                event[field] = rng.choice(values)
+            elif pick < 0.9:
+                event[field] = rng.choice(values) + rng.choice(values)
+        events.append(event)
+    return events
+
+
+def search_expression(query: str) -> str | None:
+    return None if "\n" in query or "|" in query.split('"')[0] else query
+
+
+@pytest.mark.parametrize("backend", ["splunk", "kusto", "lucene"])
+def test_bundled_rules_match_the_same_events(backend):
+    if not has_backend(backend):
+        pytest.skip(f"pySigma {backend} backend not installed")
+    dialect = DIALECTS[backend]
+    checked = 0
+    for path in sorted(RULES_DIR.glob("**/*.yml")):
+        ok, query = convert_in_process(path.read_text(encoding="utf-8"), backend, "sysmon")
+        expression = search_expression(query) if ok else None
+        if expression is None:
+            continue
+        optimized = optimize_query(expression, backend)
+        if optimized == expression:
+            continue
+        before, after = dialect.parse(expression), dialect.parse(optimized)
+        try:
+            for event in sample_events(before):
+                assert evaluate(before, event, backend) == evaluate(after, event, backend), (path.name, event)
+        except Unsupported:
+            continue
+        checked += 1
+    assert checked >= 2
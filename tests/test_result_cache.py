@@ -0,0 +1,107 @@
+"""Tests for the on-disk conversion result cache."""
+
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+from sigmaforge.converter import convert_sigma_to_siem
+from sigmaforge.result_cache import ResultCache, cache_key, default_cache_dir
+
+RULE = "title: X\nlogsource:\n  category: process_creation\n  product: windows\ndetection:\n  selection:\n    x: 1\n  condition: selection"
+
+
+def test_default_cache_dir_honours_env(isolated_cache_dir):
+    assert default_cache_dir() == isolated_cache_dir
+
+
+def test_get_put_round_trip(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache_key(RULE, "splunk", "sysmon")
+    assert cache.get(key) is None
+    cache.put(key, "index=main x=1")
+    assert cache.get(key) == "index=main x=1"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_rule_backend_and_pipeline():
+    base = cache_key(RULE, "splunk", "sysmon")
+    assert cache_key(RULE, "splunk", "sysmon") == base
+    assert cache_key(RULE + "\n", "splunk", "sysmon") != base
+    assert cache_key(RULE, "kusto", "sysmon") != base
+    assert cache_key(RULE, "splunk", "windows") != base
+
+
+def test_key_depends_on_pipeline_file_content(tmp_path):
+    pipeline_file = tmp_path / "fields.yml"
+    pipeline_file.write_text("name: a\n")
+    first = cache_key(RULE, "splunk", f"sysmon,{pipeline_file}")
+    pipeline_file.write_text("name: b\n")
+    assert cache_key(RULE, "splunk", f"sysmon,{pipeline_file}") != first
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache_key(RULE, "splunk", "sysmon")
+    cache.put(key, "q")
+    cache._entry_path(key).write_text("{not json")
+    assert cache.get(key) is None
+
+
+def test_prune_by_age_and_size(tmp_path):
+    cache = ResultCache(tmp_path)
+    keys = [cache_key(RULE, backend, "sysmon") for backend in ("splunk", "kusto", "lucene")]
+    for key in keys:
+        cache.put(key, "q" * 100)
+    old = time.time() - 10 * 86400
+    os.utime(cache._entry_path(keys[0]), (old, old))
+    assert cache.prune(max_age_days=5)[0] == 1
+    assert cache.stats().entries == 2
+    entry_size = cache._entry_path(keys[1]).stat().st_size
+    assert cache.prune(max_bytes=entry_size)[0] == 1
+    assert cache.stats().entries == 1
+    assert cache.clear()[0] == 1
+    assert cache.stats().entries == 0
+
+
+@patch("sigmaforge.converter.subprocess.run")
+def test_convert_uses_cache_before_any_work(mock_run):
+    """A second identical conversion is served from the cache without running sigma-cli."""
+    mock_run.return_value = MagicMock(returncode=0, stdout="query", stderr="")
+    assert convert_sigma_to_siem(RULE, "splunk", engine="subprocess") == (True, "query")
+    assert convert_sigma_to_siem(RULE, "splunk", engine="subprocess") == (True, "query")
+    mock_run.assert_called_once()
+
+
+@patch("sigmaforge.converter.subprocess.run")
+def test_convert_without_cache_always_converts(mock_run):
+    mock_run.return_value = MagicMock(returncode=0, stdout="query", stderr="")
+    convert_sigma_to_siem(RULE, "splunk", engine="subprocess", use_cache=False)
+    convert_sigma_to_siem(RULE, "splunk", engine="subprocess", use_cache=False)
+    assert mock_run.call_count == 2
+
+
+@patch("sigmaforge.converter.subprocess.run")
+def test_failed_conversions_are_not_cached(mock_run):
+    mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="boom")
+    convert_sigma_to_siem(RULE, "splunk", engine="subprocess")
+    convert_sigma_to_siem(RULE, "splunk", engine="subprocess")
+    assert mock_run.call_count == 2
+
+
+@patch("sigmaforge.converter.subprocess.run")
+def test_sigma_cli_results_are_keyed_by_its_environment(mock_run, tmp_path):
+    """`sigma plugin install` into sigma-cli's own venv invalidates its cached results."""
+    site = tmp_path / "venv" / "lib" / "python3.12" / "site-packages"
+    site.mkdir(parents=True)
+    sigma = tmp_path / "venv" / "bin" / "sigma"
+    sigma.parent.mkdir()
+    sigma.write_text(f"#!{tmp_path / 'venv' / 'bin' / 'python'}\nimport sigma\n")
+    mock_run.return_value = MagicMock(returncode=0, stdout="query", stderr="")
+    with patch("sigmaforge.discovery.shutil.which", return_value=str(sigma)):
+        assert cache_key(RULE, "splunk", "sysmon", "subprocess") != cache_key(RULE, "splunk", "sysmon")
+        convert_sigma_to_siem(RULE, "splunk", engine="subprocess")
+        convert_sigma_to_siem(RULE, "splunk", engine="subprocess")
+        assert mock_run.call_count == 1
+        os.utime(site, ns=(0, site.stat().st_mtime_ns + 1_000_000_000))
+        convert_sigma_to_siem(RULE, "splunk", engine="subprocess")
+        assert mock_run.call_count == 2
@@ -0,0 +1,149 @@
+"""Tests for rule discovery (-i file, directory, glob, @listfile, stdin stream)."""
+
+import types
+
+import yaml
+from sigma.collection import SigmaCollection
+
+from sigmaforge.rules import (
+    RuleSource,
+    is_bulk_input,
+    iter_rule_paths,
+    iter_rule_sources,
+    iter_stream_sources,
+    iter_yaml_documents,
+)
+
+
+def _make_tree(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "one.yml").write_text("title: one\n")
+    (tmp_path / "a" / "two.yaml").write_text("title: two\n")
+    (tmp_path / "a" / "notes.txt").write_text("not a rule\n")
+    (tmp_path / "b" / "three.yml").write_text("title: three\n")
+    (tmp_path / "top.yml").write_text("title: top\n")
+
+
+def test_directory_is_walked_recursively_in_sorted_order(tmp_path):
+    _make_tree(tmp_path)
+    names = [p.name for p in iter_rule_paths(str(tmp_path))]
+    assert names == ["top.yml", "one.yml", "two.yaml", "three.yml"]
+
+
+def test_glob_expands_recursively(tmp_path):
+    _make_tree(tmp_path)
+    names = sorted(p.name for p in iter_rule_paths(str(tmp_path / "**" / "*.yml")))
+    assert names == ["one.yml", "three.yml", "top.yml"]
+
+
+def test_listfile_accepts_files_dirs_and_comments(tmp_path):
+    _make_tree(tmp_path)
+    listfile = tmp_path / "rules.txt"
+    listfile.write_text(f"# selected rules\n{tmp_path / 'b'}\n\n{tmp_path / 'top.yml'}\n")
+    names = [p.name for p in iter_rule_paths(f"@{listfile}")]
+    assert names == ["three.yml", "top.yml"]
+
+
+def test_iter_rule_sources_is_lazy(tmp_path):
+    _make_tree(tmp_path)
+    sources = iter_rule_sources(str(tmp_path))
+    assert isinstance(sources, types.GeneratorType)
+    first = next(sources)
+    assert first.content is None
+    assert first.read() == "title: top\n"
+
+
+def test_rule_source_prefers_inline_content():
+    assert RuleSource("-", "title: x\n").read() == "title: x\n"
+
+
+def test_is_bulk_input(tmp_path):
+    _make_tree(tmp_path)
+    assert is_bulk_input(str(tmp_path))
+    assert is_bulk_input("sigma-rules/**/*.yml")
+    assert is_bulk_input("@rules.txt")
+    assert not is_bulk_input(str(tmp_path / "top.yml"))
+
+
+def test_yaml_documents_are_yielded_as_soon_as_they_end():
+    read = []
+
+    def feed():
+        for line in ["# header\n", "---\n", "title: a\n", "---\n", "title: b\n", "...\n", "--- title: c\n"]:
+            read.append(line)
+            yield line
+
+    docs = iter_yaml_documents(feed())
+    assert next(docs) == (3, "title: a\n")
+    assert len(read) == 4  # nothing read past the line that ended the document
+    assert list(docs) == [(5, "title: b\n"), (7, "title: c\n")]
+
+
+def test_stream_sources_keep_collection_actions():
+    feed = (
+        "action: global\nlogsource:\n  product: windows\n---\n"
+        "title: a\n---\n"
+        "action: repeat\ntitle: b\n---\n"
+        "action: reset\n---\n"
+        "title: c\n"
+    )
+    sources = list(iter_stream_sources(feed.splitlines(keepends=True)))
+    assert [s.path for s in sources] == ["<stdin>:5", "<stdin>:7", "<stdin>:12"]
+    assert sources[0].content == "action: global\nlogsource:\n  product: windows\n---\ntitle: a\n"
+    # a repeat builds on the rule merged with the global document, as in pySigma
+    assert yaml.safe_load(sources[1].content) == {"title": "b", "logsource": {"product": "windows"}}
+    assert sources[2].content == "title: c\n"
+
+
+CORRELATED = """title: Failed logon
+name: failed_logon
+logsource:
+  product: windows
+  service: security
+detection:
+  selection:
+    EventID: 4625
+  condition: selection
+---
+title: Other
+id: other-id
+detection:
+  selection:
+    EventID: 1
+  condition: selection
+---
+title: Many failed logons
+correlation:
+  type: event_count
+  rules:
+    - failed_logon
+  group-by:
+    - TargetUserName
+  timespan: 5m
+  condition:
+    gte: 10
+"""
+
+
+def test_stream_correlation_keeps_referenced_rules():
+    sources = list(iter_stream_sources(CORRELATED.splitlines(keepends=True)))
+    assert [s.path for s in sources] == ["<stdin>:1", "<stdin>:11", "<stdin>:18"]
+    documents = list(yaml.safe_load_all(sources[2].content))
+    assert [d.get("title") or d.get("action") for d in documents] == ["Failed logon", "reset", "Many failed logons"]
+    collection = SigmaCollection.from_yaml(sources[2].content)  # references resolve
+    assert len(collection.rules) == 2
+
+
+def test_stream_remembers_a_bounded_number_of_named_rules():
+    rules = "".join(f"title: r{i}\nid: rule-{i}\n---\n" for i in range(5000))
+    correlation = "title: c\ncorrelation:\n  type: event_count\n  rules:\n    - rule-0\n    - rule-4999\n"
+    sources = list(iter_stream_sources((rules + correlation).splitlines(keepends=True), max_named=100))
+    titles = [d.get("title") for d in yaml.safe_load_all(sources[-1].content)]
+    # rule-0 dropped out long ago; the most recent rule is still there
+    assert titles == ["r4999", None, "c"]
+    # a rule a correlation references counts as recently used
+    feed = "".join(f"title: {n}\nid: {n}\n---\n" for n in "ab") + "correlation:\n  rules: [a]\n---\n"
+    feed += "title: c\nid: c\n---\ncorrelation:\n  rules: [a, b]\n"
+    sources = list(iter_stream_sources(feed.splitlines(keepends=True), max_named=2))
+    assert [d.get("title") for d in yaml.safe_load_all(sources[-1].content)] == ["a", None, None]
@@ -0,0 +1,71 @@
+"""Tests for the Converter session API."""
+
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import sigmaforge
+from sigmaforge import Converter
+
+RULE = """title: {name}
+id: {name}-id
+logsource:
+  category: dns
+detection:
+  sel:
+    query: {name}
+  condition: sel
+"""
+
+
+def fake_convert(content, siem_id, **kwargs):
+    name = content.splitlines()[0].split(": ")[1]
+    if name == "bad":
+        return False, "boom"
+    return True, f"{siem_id}:{name}"
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_convert_one_rule(mock_convert):
+    with Converter() as converter:
+        results = converter.convert(RULE.format(name="a"), ["splunk", "elk", "elasticsearch"])
+    assert [(r.siem, r.ok, r.query, r.rule_id) for r in results] == [
+        ("splunk", True, "splunk:a", "a-id"),
+        ("elk", True, "elk:a", "a-id"),
+        ("elasticsearch", True, "elk:a", "a-id"),  # aliases share one conversion
+    ]
+    assert mock_convert.call_count == 2
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_convert_many_reports_errors_per_rule(mock_convert, tmp_path):
+    (tmp_path / "a.yml").write_text(RULE.format(name="a"))
+    rules = [tmp_path / "a.yml", tmp_path / "missing.yml", RULE.format(name="bad")]
+    with Converter() as converter:
+        results = list(converter.convert_many(rules, ["splunk"]))
+    assert [(r.rule, r.siem, r.ok) for r in results] == [
+        (str(tmp_path / "a.yml"), "splunk", True),
+        (str(tmp_path / "missing.yml"), None, False),
+        ("<rule 2>", "splunk", False),
+    ]
+    assert "No such file" in results[1].error and results[2].error == "boom"
+    assert converter.counters["convert_seconds"] > 0
+
+
+@patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert)
+def test_worker_pool_is_kept_between_calls(mock_convert):
+    rules = [RULE.format(name=f"r{i}") for i in range(20)]
+    with Converter(jobs=2) as converter:
+        first = [r.query for r in converter.convert_many(rules, ["splunk"])]
+        pool = converter._executor
+        unordered = [r.query for r in converter.convert_many(rules, ["splunk"], ordered=False)]
+        assert converter._executor is pool
+    assert first == [f"splunk:r{i}" for i in range(20)]
+    assert sorted(unordered) == sorted(first)
+    assert converter._executor is None
+
+
+def test_import_stays_light():
+    code = "import sys, sigmaforge; assert 'sigmaforge.session' not in sys.modules; sigmaforge.Converter"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(sigmaforge.__file__).parent.parent)
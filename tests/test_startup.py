@@ -0,0 +1,31 @@
+"""The cheap CLI commands must not import the conversion machinery (see benchmarks/bench_startup.py)."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = ("sigma.", "sigmaforge.batch", "sigmaforge.converter", "sigmaforge.daemon", "sigmaforge.engine",
+         "concurrent.futures", "http.server", "multiprocessing")
+
+RUNNER = """
+import json, sys
+before = set(sys.modules)
+from sigmaforge.cli import main
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+print()
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+
+@pytest.mark.parametrize("command", ["--version", "--list-siem", "--list-pipelines"])
+def test_listing_commands_stay_lightweight(command):
+    # The first --list-siem probes installed backends and caches the result; later runs must stay light
+    subprocess.run([sys.executable, "-c", RUNNER, command], capture_output=True, check=True)
+    proc = subprocess.run([sys.executable, "-c", RUNNER, command], capture_output=True, text=True, check=True)
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert [m for m in loaded if m == "sigma" or m.startswith(HEAVY)] == []
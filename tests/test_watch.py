@@ -0,0 +1,175 @@
+"""Tests for watch mode (incremental reconversion of changed rules)."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from sigmaforge.cli import main
+from sigmaforge.watch import Inotify, Poller, RuleWatcher, debounced
+
+RULE = "title: {title}\nlogsource:\n  product: linux\ndetection:\n  sel:\n    x: 1\n  condition: sel\n"
+
+
+def fake_convert(content, siem_id, **kwargs):
+    title = content.splitlines()[0].split(": ", 1)[1]
+    return True, f"{siem_id}:{title}"
+
+
+@pytest.fixture
+def rules(tmp_path):
+    root = tmp_path / "rules"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.yml").write_text(RULE.format(title="A"))
+    (root / "sub" / "b.yml").write_text(RULE.format(title="B"))
+    (root / "notes.txt").write_text("not a rule")
+    return root
+
+
+@pytest.fixture
+def convert():
+    with patch("sigmaforge.batch.convert_sigma_to_siem", side_effect=fake_convert) as mock:
+        yield mock
+
+
+def make_watcher(rules, out, siems=("splunk", "kusto")):
+    watcher = RuleWatcher(rules, out, list(siems), use_cache=False)
+    watcher.load_state()
+    return watcher
+
+
+def test_initial_sync_writes_one_file_per_rule_and_siem(rules, tmp_path, convert):
+    out = tmp_path / "out"
+    assert make_watcher(rules, out).sync() == (2, 0, 0)
+    assert (out / "a.splunk.txt").read_text() == "splunk:A\n"
+    assert (out / "a.kusto.txt").read_text() == "kusto:A\n"
+    assert (out / "sub" / "b.splunk.txt").read_text() == "splunk:B\n"
+    assert convert.call_count == 4
+
+
+def test_restart_with_same_config_converts_nothing(rules, tmp_path, convert):
+    out = tmp_path / "out"
+    make_watcher(rules, out).sync()
+    convert.reset_mock()
+    assert make_watcher(rules, out).sync() == (0, 0, 0)
+    convert.assert_not_called()
+
+
+def test_touch_without_content_change_is_skipped(rules, tmp_path, convert):
+    watcher = make_watcher(rules, tmp_path / "out")
+    watcher.sync()
+    convert.reset_mock()
+    os.utime(rules / "a.yml")
+    assert watcher.sync({rules / "a.yml"}) == (0, 0, 0)
+    convert.assert_not_called()
+
+
+def test_edited_rule_is_reconverted_alone(rules, tmp_path, convert):
+    out = tmp_path / "out"
+    watcher = make_watcher(rules, out)
+    watcher.sync()
+    convert.reset_mock()
+    (rules / "a.yml").write_text(RULE.format(title="A2"))
+    assert watcher.sync({rules / "a.yml", rules / "notes.txt"}) == (1, 0, 0)
+    assert convert.call_count == 2
+    assert (out / "a.splunk.txt").read_text() == "splunk:A2\n"
+
+
+def test_deleted_rule_removes_outputs(rules, tmp_path, convert):
+    out = tmp_path / "out"
+    watcher = make_watcher(rules, out)
+    watcher.sync()
+    (rules / "sub" / "b.yml").unlink()
+    assert watcher.sync({rules / "sub" / "b.yml"}) == (0, 1, 0)
+    assert not (out / "sub" / "b.splunk.txt").exists()
+    assert not (out / "sub" / "b.kusto.txt").exists()
+
+
+def test_failed_conversion_leaves_no_stale_output_and_is_retried(rules, tmp_path, convert):
+    out = tmp_path / "out"
+    watcher = make_watcher(rules, out)
+    watcher.sync()
+    (rules / "a.yml").write_text(RULE.format(title="A2"))
+    convert.side_effect = lambda content, siem_id, **kw: (False, "boom") if siem_id == "kusto" else fake_convert(content, siem_id)
+    assert watcher.sync({rules / "a.yml"}) == (1, 0, 1)
+    assert not (out / "a.kusto.txt").exists()
+    convert.side_effect = fake_convert
+    assert watcher.sync({rules / "a.yml"}) == (1, 0, 0)
+    assert (out / "a.kusto.txt").read_text() == "kusto:A2\n"
+
+
+def test_siem_set_change_forces_full_rebuild(rules, tmp_path, convert):
+    out = tmp_path / "out"
+    make_watcher(rules, out).sync()
+    convert.reset_mock()
+    assert make_watcher(rules, out, siems=("splunk",)).sync() == (2, 0, 0)
+    assert convert.call_count == 2
+
+
+def test_pipeline_file_edit_forces_full_rebuild(rules, tmp_path, convert):
+    pipeline = tmp_path / "custom.yml"
+    pipeline.write_text("name: custom\n")
+    out = tmp_path / "out"
+    watcher = RuleWatcher(rules, out, ["splunk"], pipeline=str(pipeline), use_cache=False)
+    watcher.sync()
+    assert watcher.pipeline_files() == [pipeline.resolve()]
+    pipeline.write_text("name: custom\npriority: 10\n")
+    assert watcher.sync({rules / "a.yml"}) == (2, 0, 0)
+
+
+def test_poller_reports_changes_and_deletions(rules):
+    poller = Poller(interval=0)
+    poller.add_tree(rules)
+    assert poller.read(0) == set()
+    (rules / "a.yml").write_text(RULE.format(title="changed size"))
+    (rules / "sub" / "b.yml").unlink()
+    (rules / "c.yml").write_text(RULE.format(title="C"))
+    assert poller.read(0) == {rules / "a.yml", rules / "sub" / "b.yml", rules / "c.yml"}
+
+
+def test_directory_moved_out_of_the_tree_removes_its_outputs(rules, tmp_path, convert):
+    try:
+        source = Inotify()
+    except OSError:
+        pytest.skip("inotify unavailable")
+    out = tmp_path / "out"
+    watcher = make_watcher(rules, out)
+    watcher.sync()
+    source.add_tree(rules)
+    try:
+        os.rename(rules / "sub", tmp_path / "outside")
+        changed = source.read(1)
+        assert changed is None  # the directory's rules are unknown to inotify: full check
+        assert watcher.sync(changed) == (0, 1, 0)
+        assert not (out / "sub" / "b.splunk.txt").exists()
+        assert rules / "sub" not in source._dirs.values()
+        # the moved directory is no longer watched
+        (tmp_path / "outside" / "c.yml").write_text(RULE.format(title="C"))
+        assert source.read(0.2) == set()
+    finally:
+        source.close()
+
+
+def test_debounced_groups_bursts():
+    class FakeSource:
+        def __init__(self, reads):
+            self.reads = iter(reads)
+
+        def read(self, timeout):
+            return next(self.reads)
+
+    source = FakeSource([set(), {"a"}, {"b"}, set(), {"c"}, None, {"d"}, set()])
+    batches = debounced(source, 0.1)
+    assert next(batches) == {"a", "b"}
+    assert next(batches) is None  # overflow: caller rescans everything
+    assert next(batches) == {"d"}
+
+
+def test_cli_watch_once(rules, tmp_path, convert):
+    out = tmp_path / "out"
+    assert main(["watch", "-i", str(rules), "-s", "splunk", "-o", str(out), "--once", "-j", "1"]) == 0
+    assert (out / "sub" / "b.splunk.txt").read_text() == "splunk:B\n"
+
+
+def test_cli_watch_rejects_unknown_siem(rules, tmp_path):
+    assert main(["watch", "-i", str(rules), "-s", "nope", "-o", str(tmp_path / "out"), "--once"]) == 2